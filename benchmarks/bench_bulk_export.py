@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+批量ICS导出基准测试
+
+在临时目录中为多个用户保存多天日程，分别用1个进程和多个进程批量导出，对比总耗时（并行加速比），
+并核对两次导出的文件逐字节一致（同一次导出使用相同的DTSTAMP）。
+
+导出期间另有一个线程反复读取输出文件，检查每次读到的都是以END:VCALENDAR结尾的完整文件（原子写入）。
+
+用法: python benchmarks/bench_bulk_export.py [--users 16] [--days 90] [--workers 4]
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as clock, timedelta
+from pathlib import Path
+
+import click
+import pytz
+
+from pilot.core.models.config import PilotConfig
+from pilot.core.models.plan import PlanInput, PlanOutput, Task
+from pilot.core.scheduling.scheduler import PomodoroScheduler
+from pilot.core.scheduling.store import ScheduleStore
+from pilot.integrations.calendar.ics_bulk import BulkICSExporter
+
+
+def _populate(store: ScheduleStore, users: int, start: date, days: int):
+    """为每个用户保存days天的日程（每个用户的任务不同，部分日期的专注内容有调整）"""
+    config = PilotConfig()
+    scheduler = PomodoroScheduler(config)
+    plan_input = PlanInput(date=start, work_window_start=clock(9), work_window_end=clock(18), cycles=8)
+    for index in range(users):
+        tasks = [
+            Task(title=f"用户{index}任务{i}：整理需求, 写文档", est_min=100, energy="高" if i % 2 else "中", weight=8 - i)
+            for i in range(4)
+        ]
+        day = scheduler.schedule_pomodoros(start, PlanOutput(capacity_min=420, top_tasks=tasks), plan_input)
+        for offset in range(days):
+            target_date = start + timedelta(days=offset)
+            if target_date.weekday() == 6:
+                continue
+            changed = offset % len(day)
+            schedule = [
+                item.model_copy(update={'focus_content': f"{item.focus_content}（{target_date.isoformat()}）"})
+                if position == changed else item
+                for position, item in enumerate(day)
+            ]
+            store.save_day(f"user{index:03d}", target_date, schedule)
+
+
+def _watch(paths, stop: threading.Event, stats: dict):
+    """反复读取输出文件，统计读到不完整文件的次数"""
+    while not stop.is_set():
+        for path in paths:
+            try:
+                data = Path(path).read_bytes()
+            except FileNotFoundError:
+                continue
+            stats['reads'] += 1
+            if not data.endswith(b"END:VCALENDAR\r\n"):
+                stats['partial'] += 1
+
+
+@click.command()
+@click.option('--users', default=16, help='用户数')
+@click.option('--days', default=90, help='每个用户导出的天数')
+@click.option('--workers', default=os.cpu_count() or 1, help='并行进程数')
+@click.option('--fsync', is_flag=True, help='写入后fsync')
+@click.option('--compact', is_flag=True, help='使用compact配置')
+def main(users, days, workers, fsync, compact):
+    config = PilotConfig()
+    config.exports.fsync = fsync
+    if compact:
+        config.exports.ics_profile = "compact"
+    start = date(2026, 1, 5)
+    end = start + timedelta(days=days - 1)
+    now = datetime(2026, 1, 1, tzinfo=pytz.utc)
+    
+    with tempfile.TemporaryDirectory() as root:
+        store = ScheduleStore(os.path.join(root, "schedules"))
+        _populate(store, users, start, days)
+        click.echo(f"📦 {users}个用户 × {days}天，CPU {os.cpu_count()}核")
+        
+        outputs = {}
+        for count in sorted({1, workers}):
+            exporter = BulkICSExporter(config, store=store, output_dir=os.path.join(root, f"out{count}"))
+            jobs = exporter.jobs_for(start, end)
+            started = time.perf_counter()
+            results = exporter.export(jobs, workers=count, now=now)
+            elapsed = time.perf_counter() - started
+            failed = [result for result in results if not result.ok]
+            busy = sum(result.seconds for result in results)
+            size = sum(result.size for result in results)
+            click.echo(f"  {count:2d}个进程: {elapsed:6.2f} s  各文件合计 {busy:6.2f} s  "
+                       f"{len(results)}个文件 {size / 1e6:.1f} MB  失败{len(failed)}个")
+            outputs[count] = (elapsed, {result.user_id: Path(result.path).read_bytes() for result in results})
+        
+        if len(outputs) > 1:
+            serial, parallel = outputs[1], outputs[workers]
+            click.echo(f"  加速比 ×{serial[0] / parallel[0]:.2f}，输出{'一致' if serial[1] == parallel[1] else '不一致'}")
+        
+        # 原子写入：反复覆盖导出的同时读取
+        exporter = BulkICSExporter(config, store=store, output_dir=os.path.join(root, "out1"))
+        jobs = exporter.jobs_for(start, end)
+        paths = [result.path for result in exporter.export(jobs[:1], workers=1, now=now)]
+        stop = threading.Event()
+        stats = {'reads': 0, 'partial': 0}
+        watcher = threading.Thread(target=_watch, args=(paths, stop, stats))
+        watcher.start()
+        for _ in range(20):
+            exporter.export(jobs[:1], workers=1, now=now)
+        stop.set()
+        watcher.join()
+        click.echo(f"  并发读取: {stats['reads']}次，读到不完整文件{stats['partial']}次")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+ICS导出基准测试
+
+生成多天日程（默认10万个事件），对比：
+- 旧实现：每个条目构造icalendar的Event/Alarm对象，逐个to_ical()
+- 流式写入器：直接按RFC 5545写出文本
+
+并用icalendar解析流式写入器的输出，逐个核对标题、描述、起止时间（UTC）和提醒与旧实现一致。
+
+用法: python benchmarks/bench_ics.py [--events 100000] [--check 2000]
+"""
+
+import io
+import time
+from datetime import date, datetime, time as clock, timedelta
+
+import click
+import pytz
+from icalendar import Alarm, Calendar, Event
+
+from pilot.core.models.config import PilotConfig
+from pilot.core.models.plan import PlanInput, PlanOutput, Task
+from pilot.core.scheduling.scheduler import PomodoroScheduler
+from pilot.integrations.calendar.ics_writer import (
+    ICSStreamWriter, _ALARM_TEMPLATES, event_description, event_summary
+)
+
+
+def legacy_event(timezone, target_date: date, item) -> Event:
+    """旧实现：逐个构造icalendar对象"""
+    event = Event()
+    event.add('uid', 'legacy')
+    event.add('summary', event_summary(item))
+    event.add('description', event_description(item))
+    event.add('dtstart', timezone.localize(datetime.combine(target_date, item.start_time)))
+    event.add('dtend', timezone.localize(datetime.combine(target_date, item.end_time)))
+    event.add('dtstamp', datetime.now(timezone))
+    event.add('created', datetime.now(timezone))
+    event.add('last-modified', datetime.now(timezone))
+    event.add('categories', ['P.I.L.O.T.', '番茄钟', item.type.value])
+    event.add('x-pilot-version', '1.0-MVP')
+    event.add('x-pilot-type', item.type.value)
+    for minutes, text in _ALARM_TEMPLATES.get(item.type, []):
+        alarm = Alarm()
+        alarm.add('action', 'DISPLAY')
+        alarm.add('description', text.format(title=item.title))
+        alarm.add('trigger', timedelta(minutes=minutes))
+        event.add_component(alarm)
+    return event
+
+
+def _generate(count: int):
+    """调度一天的日程并逐日复制，生成count个 (日期, 条目)"""
+    config = PilotConfig()
+    scheduler = PomodoroScheduler(config)
+    tasks = [
+        Task(title=f"任务{i}：整理需求, 写文档; 评审", est_min=100, energy="高" if i % 2 else "中", weight=8 - i)
+        for i in range(4)
+    ]
+    plan_input = PlanInput(date=date(2026, 1, 5), work_window_start=clock(9), work_window_end=clock(18), cycles=8)
+    day = scheduler.schedule_pomodoros(plan_input.date, PlanOutput(capacity_min=420, top_tasks=tasks), plan_input)
+    
+    items = []
+    target_date = date(2026, 1, 1)
+    while len(items) < count:
+        stamp = target_date.isoformat()
+        for item in day:
+            items.append((target_date, item.model_copy(update={'subtask': f"{item.subtask} ({stamp})"})))
+        target_date += timedelta(days=1)
+    return items[:count]
+
+
+def _semantics(event):
+    """用于比较的语义字段"""
+    alarms = sorted(
+        (str(alarm.get('description')), alarm.decoded('trigger'))
+        for alarm in event.walk('VALARM')
+    )
+    return (
+        str(event.get('summary')),
+        str(event.get('description')),
+        event.decoded('dtstart').astimezone(pytz.utc),
+        event.decoded('dtend').astimezone(pytz.utc),
+        [str(value) for value in event.get('categories').cats],
+        str(event.get('x-pilot-type')),
+        alarms,
+    )
+
+
+@click.command()
+@click.option('--events', default=100000, help='事件数')
+@click.option('--check', default=2000, help='逐个核对语义的事件数')
+def main(events, check):
+    config = PilotConfig()
+    timezone = pytz.timezone(config.timezone)
+    dated_items = _generate(events)
+    click.echo(f"📦 {len(dated_items)}个事件")
+    
+    start = time.perf_counter()
+    legacy = io.BytesIO()
+    for target_date, item in dated_items:
+        legacy.write(legacy_event(timezone, target_date, item).to_ical())
+    legacy_elapsed = time.perf_counter() - start
+    click.echo(f"  旧实现:     {legacy_elapsed:.2f} s  {len(dated_items) / legacy_elapsed:,.0f} 事件/秒")
+    
+    start = time.perf_counter()
+    stream = io.BytesIO()
+    with ICSStreamWriter(stream, config.timezone, "bench") as writer:
+        for target_date, item in dated_items:
+            writer.write_event(target_date, item)
+    stream_elapsed = time.perf_counter() - start
+    click.echo(f"  流式写入器: {stream_elapsed:.2f} s  {len(dated_items) / stream_elapsed:,.0f} 事件/秒"
+               f"  (×{legacy_elapsed / stream_elapsed:.1f}, {stream.tell() / 1e6:.1f} MB)")
+    
+    # 语义核对
+    sample = dated_items[:check]
+    parsed = Calendar.from_ical(stream.getvalue()).walk('VEVENT')[:len(sample)]
+    mismatches = 0
+    for (target_date, item), event in zip(sample, parsed):
+        if _semantics(event) != _semantics(legacy_event(timezone, target_date, item)):
+            mismatches += 1
+    click.echo(f"  语义核对: {len(sample)}个事件，{mismatches}个不一致")
+
+
+if __name__ == '__main__':
+    main()
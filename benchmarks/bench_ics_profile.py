@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+ICS导出配置基准测试
+
+同一份多天日程分别按 full、compact 和 compact+不提醒休息（alarm_limits）导出，对比：
+- 每个事件的平均字节数和gzip后的字节数（订阅源传输的大小）
+- icalendar解析时间（三次取最短，近似日历应用的导入开销）
+
+并核对compact输出中每个事件的标题、起止时间、分类不变，任务相关内容（主任务、具体内容、专注要点）都还在描述中，
+提醒数量符合限制。
+
+用法: python benchmarks/bench_ics_profile.py [--days 60]
+"""
+
+import gzip
+import io
+import time
+from datetime import date, time as clock, timedelta
+
+import click
+from icalendar import Calendar
+
+from pilot.core.models.config import PilotConfig
+from pilot.core.models.plan import PlanInput, PlanOutput, Task
+from pilot.core.scheduling.scheduler import PomodoroScheduler
+from pilot.integrations.calendar.ics_writer import (
+    ICSStreamWriter, PROFILE_COMPACT, PROFILE_FULL, reminder_offsets, resolve_alarm_limits
+)
+
+
+def _generate(days: int):
+    """调度一天的日程并逐日复制，每天的具体内容带上日期"""
+    config = PilotConfig()
+    scheduler = PomodoroScheduler(config)
+    tasks = [
+        Task(title=f"任务{i}：整理需求, 写文档; 评审", est_min=100, energy="高" if i % 2 else "中", weight=8 - i)
+        for i in range(4)
+    ]
+    plan_input = PlanInput(date=date(2026, 1, 5), work_window_start=clock(9), work_window_end=clock(18), cycles=8)
+    day = scheduler.schedule_pomodoros(plan_input.date, PlanOutput(capacity_min=420, top_tasks=tasks), plan_input)
+    
+    items = []
+    for offset in range(days):
+        target_date = date(2026, 1, 5) + timedelta(days=offset)
+        stamp = target_date.isoformat()
+        for item in day:
+            items.append((target_date, item.model_copy(update={'subtask': f"{item.subtask} ({stamp})"} if item.subtask else {})))
+    return items
+
+
+def _export(zone: str, dated_items, profile: str, alarm_limits=None) -> bytes:
+    stream = io.BytesIO()
+    with ICSStreamWriter(stream, zone, "bench", profile=profile, alarm_limits=alarm_limits) as writer:
+        for target_date, item in dated_items:
+            writer.write_event(target_date, item, uid=f"{target_date.isoformat()}-{item.slot_id}@bench")
+    return stream.getvalue()
+
+
+def _check(calendar: Calendar, reference: Calendar, dated_items, profile: str, alarm_limits) -> int:
+    """compact输出与完整输出逐个对比，返回不一致的事件数"""
+    limits = resolve_alarm_limits(profile, alarm_limits)
+    mismatches = 0
+    for (_, item), event, full in zip(dated_items, calendar.walk('VEVENT'), reference.walk('VEVENT')):
+        description = str(event.get('description'))
+        kept = all(
+            text in description
+            for text in (item.task_title, item.subtask, item.focus_content) if text
+        )
+        expected_alarms = len(reminder_offsets(item.type)[:limits.get(item.type)])
+        same = (
+            str(event.get('summary')) == str(full.get('summary'))
+            and event.decoded('dtstart') == full.decoded('dtstart')
+            and event.decoded('dtend') == full.decoded('dtend')
+            and event.get('categories').cats == full.get('categories').cats
+            and len(event.walk('VALARM')) == expected_alarms
+        )
+        if not (kept and same):
+            mismatches += 1
+    return mismatches
+
+
+@click.command()
+@click.option('--days', default=60, help='导出的天数')
+def main(days):
+    config = PilotConfig()
+    dated_items = _generate(days)
+    count = len(dated_items)
+    click.echo(f"📦 {days}天 {count}个事件")
+    
+    variants = [
+        ("full", PROFILE_FULL, None),
+        ("compact", PROFILE_COMPACT, None),
+        ("compact+少提醒", PROFILE_COMPACT, {"short_break": 0, "long_break": 0}),
+    ]
+    reference = None
+    for label, profile, alarm_limits in variants:
+        body = _export(config.timezone, dated_items, profile, alarm_limits)
+        parse_elapsed = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            calendar = Calendar.from_ical(body)
+            parse_elapsed = min(parse_elapsed, time.perf_counter() - start)
+        zipped = len(gzip.compress(body, compresslevel=6))
+        line = (f"  {label:<16} {len(body) / count:7.0f} B/事件  gzip {zipped / count:6.0f} B/事件"
+                f"  解析 {parse_elapsed * 1e6 / count:6.0f} µs/事件")
+        if reference is None:
+            reference = calendar
+            full_size, full_parse = len(body), parse_elapsed
+        else:
+            mismatches = _check(calendar, reference, dated_items, profile, alarm_limits)
+            line += f"  (大小 ÷{full_size / len(body):.1f}, 解析 ÷{full_parse / parse_elapsed:.1f}, 不一致{mismatches}个)"
+        click.echo(line)
+
+
+if __name__ == '__main__':
+    main()
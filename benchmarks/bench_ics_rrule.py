@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+重复事件压缩基准测试
+
+生成多周的工作日日程（同一天的安排逐日复制，穿插假期、周末加班和个别时段内容变化），分别按：
+- 逐个事件导出
+- 重复时段压缩导出（RRULE/EXDATE/RDATE/RECURRENCE-ID）
+
+对比文件大小、写出时间和icalendar解析时间（近似日历应用的导入开销），
+再用dateutil展开压缩后的重复事件，逐个核对标题、描述、UTC起止时间、分类和提醒与逐个导出一致，
+并核对ICSIndex读取两个文件得到的忙碌时间相同。
+
+用法: python benchmarks/bench_ics_rrule.py [--weeks 12] [--timezone America/New_York]
+"""
+
+import io
+import time
+from collections import Counter
+from datetime import date, datetime, time as clock, timedelta
+
+import click
+import pytz
+from dateutil.rrule import WEEKLY, rrule, weekdays as rrule_weekdays
+from icalendar import Calendar
+
+from pilot.core.models.config import PilotConfig
+from pilot.core.models.plan import PlanInput, PlanOutput, Task
+from pilot.core.scheduling.scheduler import PomodoroScheduler
+from pilot.integrations.calendar.ics_reader import ICSIndex
+from pilot.integrations.calendar.ics_recurrence import compress_recurring, write_compressed
+from pilot.integrations.calendar.ics_state import event_uid
+from pilot.integrations.calendar.ics_writer import ICSStreamWriter, WEEKDAY_CODES
+
+
+def _generate(weeks: int):
+    """多周工作日日程：每10个工作日有一天假期，每3周有一个周六加班，每天换一个时段的专注内容"""
+    config = PilotConfig()
+    scheduler = PomodoroScheduler(config)
+    tasks = [
+        Task(title=f"任务{i}：整理需求, 写文档; 评审", est_min=100, energy="高" if i % 2 else "中", weight=8 - i)
+        for i in range(4)
+    ]
+    plan_input = PlanInput(date=date(2026, 1, 5), work_window_start=clock(9), work_window_end=clock(18), cycles=8)
+    day = scheduler.schedule_pomodoros(plan_input.date, PlanOutput(capacity_min=420, top_tasks=tasks), plan_input)
+    
+    items = []
+    start = date(2026, 1, 5)
+    workday = 0
+    for offset in range(weeks * 7):
+        target_date = start + timedelta(days=offset)
+        weekday = target_date.weekday()
+        if weekday == 6 or (weekday == 5 and (offset // 7) % 3 != 2):
+            continue
+        workday += 1
+        if workday % 10 == 0:
+            continue
+        changed = workday % len(day)
+        for index, item in enumerate(day):
+            if index == changed:
+                item = item.model_copy(update={'focus_content': f"{item.focus_content}（{target_date.isoformat()}调整）"})
+            items.append((target_date, item))
+    return items
+
+
+def _write_plain(zone: str, dated_items, user_id: str) -> bytes:
+    stream = io.BytesIO()
+    with ICSStreamWriter(stream, zone, "bench") as writer:
+        for target_date, item in dated_items:
+            writer.write_event(target_date, item, uid=event_uid(user_id, target_date, item))
+    return stream.getvalue()
+
+
+def _write_compressed(zone: str, dated_items, user_id: str, first_year: int, last_year: int):
+    series, singles = compress_recurring(dated_items, user_id)
+    stream = io.BytesIO()
+    with ICSStreamWriter(stream, zone, "bench") as writer:
+        write_compressed(writer, series, singles, first_year, last_year)
+    return stream.getvalue(), series, singles
+
+
+def _content(event):
+    """除时间外用于比较的语义字段"""
+    alarms = sorted(
+        (str(alarm.get('description')), alarm.decoded('trigger'))
+        for alarm in event.walk('VALARM')
+    )
+    return (
+        str(event.get('summary')),
+        str(event.get('description')),
+        tuple(str(value) for value in event.get('categories').cats),
+        str(event.get('x-pilot-type')),
+        tuple(alarms),
+    )
+
+
+def _dates(value):
+    """EXDATE/RDATE属性（单个或多个）中的全部时间"""
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value]
+    return [entry.dt for prop in values for entry in prop.dts]
+
+
+def _expand(calendar: Calendar, tz) -> Counter:
+    """把日历中的事件（含重复事件）展开为 (UTC开始, UTC结束, 内容) 的多重集合"""
+    events = calendar.walk('VEVENT')
+    overrides = {}
+    for event in events:
+        if event.get('recurrence-id') is not None:
+            overrides[(str(event.get('uid')), event.decoded('recurrence-id').astimezone(pytz.utc))] = event
+    
+    expanded = Counter()
+    for event in events:
+        if event.get('recurrence-id') is not None:
+            continue
+        start = event.decoded('dtstart')
+        end = event.decoded('dtend')
+        if event.get('rrule') is None:
+            expanded[(start.astimezone(pytz.utc), end.astimezone(pytz.utc), _content(event))] += 1
+            continue
+        
+        # 按当地时间展开，再逐个换算为UTC（跨越夏令时切换时当地时刻不变）
+        rule = event.get('rrule')
+        local_start = start.replace(tzinfo=None)
+        length = end.replace(tzinfo=None) - local_start
+        until = rule['UNTIL'][0].astimezone(tz).replace(tzinfo=None)
+        byday = [rrule_weekdays[WEEKDAY_CODES.index(code)] for code in rule['BYDAY']]
+        starts = set(rrule(WEEKLY, dtstart=local_start, byweekday=byday, until=until))
+        starts -= {moment.astimezone(tz).replace(tzinfo=None) for moment in _dates(event.get('exdate'))}
+        starts |= {moment.astimezone(tz).replace(tzinfo=None) for moment in _dates(event.get('rdate'))}
+        uid = str(event.get('uid'))
+        content = _content(event)
+        for moment in starts:
+            utc_start = tz.localize(moment).astimezone(pytz.utc)
+            override = overrides.pop((uid, utc_start), None)
+            if override is not None:
+                expanded[(
+                    override.decoded('dtstart').astimezone(pytz.utc),
+                    override.decoded('dtend').astimezone(pytz.utc),
+                    _content(override),
+                )] += 1
+            else:
+                expanded[(utc_start, tz.localize(moment + length).astimezone(pytz.utc), content)] += 1
+    if overrides:
+        raise AssertionError(f"{len(overrides)}个例外实例没有对应的重复实例")
+    return expanded
+
+
+@click.command()
+@click.option('--weeks', default=12, help='导出的周数')
+@click.option('--timezone', 'zone', default=None, help='时区（默认取配置，可用有夏令时的时区验证VTIMEZONE）')
+def main(weeks, zone):
+    config = PilotConfig()
+    zone = zone or config.timezone
+    tz = pytz.timezone(zone)
+    user_id = "bench"
+    dated_items = _generate(weeks)
+    first_day, last_day = dated_items[0][0], dated_items[-1][0]
+    click.echo(f"📦 {weeks}周 {len(dated_items)}个事件（{first_day} ~ {last_day}，{zone}）")
+    
+    start = time.perf_counter()
+    plain = _write_plain(zone, dated_items, user_id)
+    plain_write = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    compressed, series, singles = _write_compressed(zone, dated_items, user_id, first_day.year, last_day.year)
+    compressed_write = time.perf_counter() - start
+    overrides = sum(len(found.overrides) for found in series)
+    click.echo(f"  重复事件{len(series)}个（例外实例{overrides}个），单独事件{len(singles)}个")
+    
+    start = time.perf_counter()
+    plain_calendar = Calendar.from_ical(plain)
+    plain_parse = time.perf_counter() - start
+    start = time.perf_counter()
+    compressed_calendar = Calendar.from_ical(compressed)
+    compressed_parse = time.perf_counter() - start
+    
+    click.echo(f"  逐个导出: {len(plain) / 1e3:8.1f} KB  写出 {plain_write * 1e3:7.1f} ms  解析 {plain_parse * 1e3:7.1f} ms")
+    click.echo(f"  压缩导出: {len(compressed) / 1e3:8.1f} KB  写出 {compressed_write * 1e3:7.1f} ms  解析 {compressed_parse * 1e3:7.1f} ms")
+    click.echo(f"  大小 ÷{len(plain) / len(compressed):.1f}  解析时间 ÷{plain_parse / compressed_parse:.1f}")
+    
+    # 语义核对
+    expected = _expand(plain_calendar, tz)
+    actual = _expand(compressed_calendar, tz)
+    missing = sum((expected - actual).values())
+    extra = sum((actual - expected).values())
+    click.echo(f"  语义核对: {sum(expected.values())}个实例，缺少{missing}个，多出{extra}个")
+    
+    window_start = int(tz.localize(datetime.combine(first_day, clock())).timestamp())
+    window_end = int(tz.localize(datetime.combine(last_day + timedelta(days=1), clock())).timestamp())
+    plain_busy = sorted(ICSIndex.build(plain, zone).query(window_start, window_end))
+    compressed_busy = sorted(ICSIndex.build(compressed, zone).query(window_start, window_end))
+    click.echo(f"  忙碌时间核对: {len(plain_busy)}个区间，{'一致' if plain_busy == compressed_busy else '不一致'}")
+
+
+if __name__ == '__main__':
+    main()
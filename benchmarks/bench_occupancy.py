@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+占用位图基准测试
+
+生成 1000用户 × 30天 的随机会议，测量批量导入、空闲段查找和跨用户求交的耗时。
+
+用法: python benchmarks/bench_occupancy.py [--users 1000] [--days 30]
+"""
+
+import time
+from datetime import time as clock
+
+import click
+import numpy as np
+
+from pilot.core.models.plan import TimeSlot
+from pilot.core.scheduling.occupancy import OccupancyGrid
+from pilot.core.scheduling.slots import free_gaps
+
+
+def _timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    click.echo(f"  {label}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    return result
+
+
+@click.command()
+@click.option('--users', default=1000, help='用户数')
+@click.option('--days', default=30, help='天数')
+@click.option('--meetings', default=4, help='每人每天会议数')
+@click.option('--seed', default=42, help='随机种子')
+def main(users, days, meetings, seed):
+    rng = np.random.default_rng(seed)
+    count = users * days * meetings
+    user_idx = np.repeat(np.arange(users), days * meetings)
+    day_idx = np.tile(np.repeat(np.arange(days), meetings), users)
+    starts = rng.integers(9 * 60, 17 * 60, size=count) // 15 * 15
+    ends = starts + rng.choice([30, 45, 60, 90], size=count)
+    
+    click.echo(f"📊 {users}用户 × {days}天，{count}个会议")
+    grid = OccupancyGrid(users, days)
+    _timed("批量标记忙碌", lambda: grid.mark_busy_many(user_idx, day_idx, starts, ends))
+    runs = _timed("查找≥50分钟空闲段", lambda: grid.free_runs(50, window_start=9 * 60, window_end=18 * 60))
+    click.echo(f"    共 {len(runs[0])} 段")
+    _timed("每人每天50分钟整块计数", lambda: grid.free_block_counts(50, 9 * 60, 18 * 60))
+    common = _timed("全员求交后查找≥30分钟空闲段", lambda: grid.common_free_runs(30, window_start=9 * 60, window_end=18 * 60))
+    click.echo(f"    共 {len(common[0])} 段")
+    team = rng.choice(users, size=min(users, 20), replace=False)
+    _timed("20人小组共同空闲段", lambda: grid.common_free_runs(50, team, 9 * 60, 18 * 60))
+    
+    # 对照：逐人逐天用区间扫描线计算（只测前100人）
+    sample = min(users, 100)
+    
+    def baseline():
+        total = 0
+        for user in range(sample):
+            for day in range(days):
+                base = (user * days + day) * meetings
+                busy = [
+                    (int(starts[base + i]), int(ends[base + i]))
+                    for i in range(meetings)
+                ]
+                total += sum(1 for start, end in free_gaps(9 * 60, 18 * 60, busy) if end - start >= 50)
+        return total
+    
+    _timed(f"对照：逐个区间扫描（{sample}用户）", baseline)
+    
+    # 对照：通过TimeSlot模型批量导入（前100人）
+    records = [
+        (int(user_idx[i]), int(day_idx[i]), TimeSlot(
+            start=clock(int(starts[i]) // 60, int(starts[i]) % 60),
+            end=clock(min(23, int(ends[i]) // 60), int(ends[i]) % 60)
+        ))
+        for i in range(sample * days * meetings)
+    ]
+    _timed(f"从TimeSlot批量导入（{len(records)}条）", lambda: OccupancyGrid(users, days).mark_slots(records))
+
+
+if __name__ == '__main__':
+    main()
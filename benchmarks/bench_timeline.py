@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+调度时间线基准测试
+
+对比三种单日调度实现的耗时和内存分配：
+- 旧实现：每次加减时间都经过 datetime.combine，逐条构造 ScheduleItem
+- 当前实现：调度器内部使用整数分钟的 TimelineEntry，仅在返回时转换为 ScheduleItem
+- 仅内部时间线：不转换为 ScheduleItem（多天调度、批量导出等内部路径）
+
+当前实现额外包含会议避让和任务分配求解，另给出关闭分配求解器时的数据作对照。
+
+用法: python benchmarks/bench_timeline.py [--days 365]
+"""
+
+import time
+import tracemalloc
+from datetime import date, datetime, time as clock, timedelta
+
+import click
+
+from pilot.core.models.config import PilotConfig
+from pilot.core.models.plan import PlanInput, PlanOutput, Task, TimeSlot
+from pilot.core.models.schedule import ScheduleItem, PomodoroType
+from pilot.core.scheduling.scheduler import PomodoroScheduler
+from pilot.core.scheduling.slots import to_minutes
+
+
+def _add_minutes(base_time: clock, minutes: int) -> clock:
+    """旧实现的时间加法"""
+    dt = datetime.combine(date.today(), base_time)
+    dt += timedelta(minutes=minutes)
+    return dt.time()
+
+
+def legacy_schedule_day(config: PilotConfig, plan_input: PlanInput):
+    """旧实现：逐轮用datetime运算推进时间并构造ScheduleItem"""
+    schedule = []
+    current_time = plan_input.work_window_start
+    cycle_count = 0
+    while current_time < plan_input.work_window_end and cycle_count < plan_input.cycles:
+        if clock(12, 0) <= current_time < clock(14, 0):
+            schedule.append(ScheduleItem(title="午休时间", start_time=clock(12), end_time=clock(14), type=PomodoroType.LUNCH))
+            current_time = clock(14, 10)
+            continue
+        cycle_count += 1
+        focus_end = _add_minutes(current_time, config.pomodoro.work_focus_min)
+        schedule.append(ScheduleItem(
+            title=f"番茄钟 #{cycle_count}", start_time=current_time, end_time=focus_end,
+            type=PomodoroType.FOCUS, cycle_number=cycle_count
+        ))
+        current_time = focus_end
+        if cycle_count < plan_input.cycles:
+            break_end = _add_minutes(current_time, config.pomodoro.work_break_min)
+            schedule.append(ScheduleItem(
+                title="短休息", start_time=current_time, end_time=break_end, type=PomodoroType.SHORT_BREAK
+            ))
+            current_time = break_end
+    schedule.sort(key=lambda x: x.start_time)
+    # 旧实现中下游逐条计算时长
+    sum(item.duration_minutes() for item in schedule)
+    return schedule
+
+
+def _measure(label: str, days: int, func):
+    """测量每天的平均耗时和分配次数"""
+    start = time.perf_counter()
+    for day in range(days):
+        func(day)
+    elapsed = (time.perf_counter() - start) / days * 1e6
+    
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [func(day) for day in range(min(days, 50))]
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(stat.count_diff for stat in stats) / len(kept)
+    size = sum(stat.size_diff for stat in stats) / len(kept)
+    click.echo(f"  {label}: {elapsed:.1f} µs/天，保留 {blocks:.0f} 个内存块 / {size / 1024:.1f} KiB 每天，峰值 {peak / 1024:.0f} KiB")
+
+
+@click.command()
+@click.option('--days', default=365, help='调度天数')
+def main(days):
+    config = PilotConfig()
+    scheduler = PomodoroScheduler(config)
+    tasks = [
+        Task(title=f"任务{i}", est_min=100, energy="高" if i % 2 else "中", type="deep" if i % 3 == 0 else "normal", weight=8 - i)
+        for i in range(4)
+    ]
+    plan_output = PlanOutput(capacity_min=420, top_tasks=tasks)
+    base = date(2026, 1, 5)
+    inputs = [
+        PlanInput(
+            date=base + timedelta(days=day),
+            work_window_start=clock(9),
+            work_window_end=clock(18),
+            meetings=[TimeSlot(start=clock(10 + day % 5), end=clock(10 + day % 5, 30))],
+            cycles=6
+        )
+        for day in range(days)
+    ]
+    
+    click.echo(f"📊 调度 {days} 天，每天6轮")
+    _measure("旧实现（datetime运算）", days, lambda day: legacy_schedule_day(config, inputs[day]))
+    _measure("当前实现（返回ScheduleItem）", days, lambda day: scheduler.schedule_pomodoros(inputs[day].date, plan_output, inputs[day]))
+    
+    # 关闭分配求解器，与旧实现做同等工作量的对比
+    plain_config = config.model_copy(deep=True)
+    plain_config.assignment.enabled = False
+    plain_scheduler = PomodoroScheduler(plain_config)
+    _measure("当前实现（关闭分配求解器）", days, lambda day: plain_scheduler.schedule_pomodoros(inputs[day].date, plan_output, inputs[day]))
+    
+    def entries_only(day):
+        plan_input = inputs[day]
+        return scheduler._build_day_entries(
+            to_minutes(plan_input.work_window_start),
+            to_minutes(plan_input.work_window_end),
+            plan_input.meetings,
+            config.pomodoro.work_focus_min,
+            config.pomodoro.work_break_min,
+            plan_input.cycles,
+            lambda allocated: scheduler._assign_task_infos(tasks, allocated, config.pomodoro.work_focus_min)
+        )
+    
+    _measure("仅内部时间线（TimelineEntry）", days, entries_only)
+    
+    start = time.perf_counter()
+    count = sum(1 for _ in scheduler.schedule_range(base, base + timedelta(days=days - 1), PlanOutput(
+        capacity_min=420,
+        top_tasks=[task.model_copy(update={'est_min': 5000}) for task in tasks]
+    ), inputs[0]))
+    click.echo(f"  多天调度 schedule_range: {count} 条，{(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,35 +2,58 @@
 命令执行器
 """
 
+import asyncio
 import click
 from datetime import datetime, timedelta, date
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from .models.config import PilotConfig
+from .nlp.session import ChatSession
 from .planning.planner import LLMPlanner
+from .planning.templates import TemplateLibrary, load_last_plan, save_last_plan
+from .planning.replan import IncrementalReplanner
+from .planning.backlog import Backlog, BacklogCandidate
 from .scheduling.scheduler import PomodoroScheduler
-from ..integrations.llm.openai import OpenAILLM
+from .scheduling.validator import has_errors
+from .scheduling.store import ScheduleStore
+from .runtime.session import PomodoroRuntime
+from ..integrations.llm.limiter import create_llm
+from ..interfaces.llm import LLMInterface
 from ..integrations.calendar.ics_manager import ICSCalendarManager
-from .models.plan import PlanInput
+from ..integrations.calendar.ics_reader import ICSBusyImporter
+from ..integrations.calendar.google_calendar import GoogleCalendarManager
+from ..integrations.calendar.ics_state import resolve_user_id
+from .models.plan import PlanInput, PlanOutput
 from datetime import datetime, time
 
 
 class CommandExecutor:
     """命令执行器"""
     
-    def __init__(self, config: PilotConfig):
+    def __init__(self, config: PilotConfig, llm: Optional[LLMInterface] = None):
         self.config = config
-        self.llm = OpenAILLM(config)
+        # 与解析器共用同一个限流器，缺省按配置新建
+        self.llm = llm or create_llm(config)
         self.planner = LLMPlanner(config, self.llm)
         self.scheduler = PomodoroScheduler(config)
+        self.replanner = IncrementalReplanner(self.planner, self.scheduler)
         self.calendar_manager = ICSCalendarManager(config)
+        self.busy_importer = ICSBusyImporter(config.imports, config.timezone)
+        self.schedule_store = ScheduleStore(config.feed.store_dir)
+        self._google_calendar = None
+        self.template_library = TemplateLibrary(config.templates.directory)
+        self.last_plan_input = None
+        self.last_plan = None
+        # 本次命令新生成的 (计划输入, 计划)，没有生成计划时为None
+        self.turn_plan: Optional[Tuple[PlanInput, PlanOutput]] = None
     
-    def execute_command(self, parsed_params: Dict[str, Any]) -> bool:
+    def execute_command(self, parsed_params: Dict[str, Any], session: Optional[ChatSession] = None) -> bool:
         """执行解析后的命令"""
         command_type = parsed_params.get('command_type', 'plan')
+        self.turn_plan = None
         
         try:
             if command_type == 'plan':
-                return self._execute_plan_command(parsed_params)
+                return self._execute_plan_command(parsed_params, session)
             elif command_type == 'pomodoro':
                 return self._execute_pomodoro_command(parsed_params)
             elif command_type == 'inbox':
@@ -44,38 +67,121 @@ class CommandExecutor:
             click.echo(f"❌ 执行失败: {str(e)}")
             return False
     
-    def _execute_plan_command(self, params: Dict[str, Any]) -> bool:
+    def _execute_plan_command(self, params: Dict[str, Any], session: Optional[ChatSession] = None) -> bool:
         """执行计划命令"""
-        click.echo("🧠 正在生成智能计划...")
+        if session and session.has_plan and params.get('is_followup') and params.get('replan_only'):
+            # 只有会议/工作窗口/轮数变化：本地重排，不调用LLM
+            plan_input = self._build_followup_plan_input(session, params)
+            result = self.replanner.replan(session.last_plan, plan_input, previous_input=session.last_plan_input)
+            if result is None:
+                click.echo("❌ 重新规划失败")
+                return False
+            click.echo(f"⚡ 已本地重新规划 ({result.elapsed_ms}ms): {result.schedule_diff.summary()}")
+            for change in result.task_changes:
+                click.echo(f"   {change.title}: {change.before_min} → {change.after_min}分钟")
+            plan_result = result.plan
+        elif session and session.has_plan and params.get('is_followup'):
+            # 追问：基于会话记忆做增量修改
+            click.echo("✏️ 正在修改当前计划...")
+            plan_input = self._build_followup_plan_input(session, params)
+            instruction = params.get('edit_instruction') or params.get('task_content', '')
+            plan_result = self.planner.revise_plan(plan_input, session.last_plan, instruction, session.build_context())
+        else:
+            # 构建计划输入
+            plan_input = self._build_plan_input(params)
+            
+            # 工作模式下跳过周末和法定节假日，不调用LLM（allow_rest_day时照常安排）
+            workdays = self.scheduler.workdays
+            if plan_input.mode == 'work' and not workdays.is_workday(plan_input.date):
+                if not params.get('allow_rest_day'):
+                    click.echo(f"📅 {plan_input.date.isoformat()} 是休息日（{workdays.describe(plan_input.date)}），不安排工作计划")
+                    next_day = workdays.next_workday(plan_input.date)
+                    if next_day:
+                        click.echo(f"💡 下一个工作日: {next_day.isoformat()}，可指定该日期、改用学习模式或使用 --allow-rest-day")
+                    return False
+                click.echo(f"📅 {plan_input.date.isoformat()} 是休息日（{workdays.describe(plan_input.date)}），按要求照常安排")
+            
+            click.echo("🧠 正在生成智能计划...")
+            
+            # 优先使用匹配的模板在本地实例化，否则调用LLM生成
+            plan_result = self._instantiate_template(plan_input, params)
+            if plan_result is None:
+                candidates = self._select_backlog_candidates(plan_input)
+                plan_result = self.planner.generate_plan(plan_input, params.get('task_content'), candidates)
         
-        # 构建计划输入
-        plan_input = self._build_plan_input(params)
         target_date = plan_input.date
         
-        # 生成计划
-        plan_result = self.planner.generate_plan(plan_input, params.get('task_content'))
-        
         if not plan_result:
             click.echo("❌ 计划生成失败")
             return False
         
+        self.last_plan_input = plan_input
+        self.last_plan = plan_result
+        self.turn_plan = (plan_input, plan_result)
+        save_last_plan(plan_input, plan_result)
+        
         # 显示计划
         self._display_plan(plan_result)
         
         # 询问是否创建日历
         if self._prompt_calendar_choice():
             calendar_type = self._get_calendar_type()
-            self._create_calendar(target_date, plan_result, calendar_type)
+            self._create_calendar(target_date, plan_result, calendar_type, plan_input)
         
         return True
     
     def _execute_pomodoro_command(self, params: Dict[str, Any]) -> bool:
         """执行番茄钟命令"""
         click.echo("🍅 启动番茄钟模式...")
-        # TODO: 实现番茄钟执行逻辑
-        click.echo("⚠️ 番茄钟功能正在开发中")
+        
+        if self.last_plan is not None:
+            plan_input, plan_output = self.last_plan_input, self.last_plan
+        else:
+            loaded = load_last_plan()
+            if loaded is None:
+                click.echo("❌ 没有可执行的计划，请先生成今天的计划")
+                return False
+            plan_input, plan_output = loaded
+        
+        today = date.today()
+        if plan_input.date != today:
+            click.echo(f"❌ 最近的计划是 {plan_input.date.isoformat()} 的，请先生成今天的计划")
+            return False
+        
+        schedule = self.scheduler.schedule_pomodoros(today, plan_output, plan_input)
+        if not schedule:
+            click.echo("❌ 无法生成番茄钟时间表")
+            return False
+        
+        runtime = PomodoroRuntime(self.config)
+        session = runtime.add_session("local", today, schedule, on_transition=self._echo_transition, plan_input=plan_input)
+        pending = sum(1 for record in session.records.values() if record.status in ("pending", "running"))
+        if pending == 0:
+            click.echo("✅ 今天的番茄钟都已结束")
+            return True
+        
+        last_end = max(record.planned_end for record in session.records.values())
+        click.echo(f"⏱️ 剩余 {pending} 个条目，预计 {last_end.strftime('%H:%M')} 结束")
+        click.echo("💡 番茄钟运行期间会占用当前命令行，按 Ctrl+C 可随时停止，执行记录会自动保存")
+        try:
+            asyncio.run(runtime.run_until_complete())
+        except KeyboardInterrupt:
+            click.echo("\n⏹️ 番茄钟已停止")
+        finally:
+            # 中断或出错时也保存已发生的执行记录
+            if not session.finished:
+                session.stop()
+            log_path = runtime.save_log(session)
+            click.echo(f"📝 执行记录已保存: {log_path}")
         return True
     
+    def _echo_transition(self, session, record, event: str):
+        """输出番茄钟条目的开始和结束"""
+        if event == "start":
+            click.echo(f"▶️ {record.actual_start.strftime('%H:%M')} 开始 {record.title}（至 {record.planned_end.strftime('%H:%M')}）")
+        else:
+            click.echo(f"⏹️ {record.actual_end.strftime('%H:%M')} 结束 {record.title}")
+    
     def _execute_inbox_command(self, params: Dict[str, Any]) -> bool:
         """执行收集箱命令"""
         click.echo("📥 处理收集箱内容...")
@@ -90,6 +196,13 @@ class CommandExecutor:
         click.echo("⚠️ 复盘功能正在开发中")
         return True
     
+    @property
+    def google_calendar(self) -> GoogleCalendarManager:
+        """Google Calendar管理器（首次使用时才授权）"""
+        if self._google_calendar is None:
+            self._google_calendar = GoogleCalendarManager(self.config)
+        return self._google_calendar
+    
     def _build_plan_input(self, params: Dict[str, Any]) -> PlanInput:
         """构建计划输入"""
         # 处理日期
@@ -118,6 +231,23 @@ class CommandExecutor:
                     meeting_end = time.fromisoformat(meeting_end_str.strip())
                     meetings.append(TimeSlot(start=meeting_start, end=meeting_end))
         
+        # 从配置的日历文件读取工作窗口内的忙碌时段
+        if self.config.imports.busy_sources:
+            busy = self.busy_importer.busy_slots(target_date, start_time, end_time)
+            if busy:
+                click.echo(f"📆 从日历文件读取到 {len(busy)} 个忙碌时段")
+            meetings = sorted(meetings + busy, key=lambda slot: slot.start)
+        
+        # 从Google日历查询忙碌时间
+        if self.config.google_calendar.use_freebusy:
+            try:
+                busy = self.google_calendar.busy_slots(target_date, start_time, end_time)
+                if busy:
+                    click.echo(f"📆 从Google日历读取到 {len(busy)} 个忙碌时段")
+                meetings = sorted(meetings + busy, key=lambda slot: slot.start)
+            except Exception as e:
+                click.echo(f"⚠️ Google日历忙碌时间查询失败: {str(e)}")
+        
         return PlanInput(
             date=target_date,
             work_window_start=start_time,
@@ -128,6 +258,51 @@ class CommandExecutor:
             dry_run=params.get('dry_run', False)
         )
     
+    def _instantiate_template(self, plan_input: PlanInput, params: Dict[str, Any]):
+        """匹配模板并用重点任务列表实例化，无匹配时返回None"""
+        focus_tasks = params.get('focus_tasks') or []
+        if not self.config.templates.enabled or not focus_tasks:
+            return None
+        
+        matched = self.template_library.match(plan_input, self.config.templates.match_tolerance_min)
+        if not matched:
+            return None
+        
+        template, score = matched
+        click.echo(f"📐 使用计划模板: {template.name} (匹配度 {score*100:.0f}%)")
+        return template.instantiate(focus_tasks, plan_input)
+    
+    def _select_backlog_candidates(self, plan_input: PlanInput) -> Optional[List[BacklogCandidate]]:
+        """从待办池选出放得进当天容量的候选任务"""
+        if not self.config.backlog.enabled:
+            return None
+        backlog = Backlog.load(self.config.backlog)
+        if not len(backlog):
+            return None
+        
+        candidates = backlog.select(self.scheduler.free_minutes(plan_input), plan_input.date)
+        if candidates:
+            click.echo(f"📋 待办池候选任务: {', '.join(candidate.item.title for candidate in candidates)}")
+        return candidates
+    
+    def _build_followup_plan_input(self, session: ChatSession, params: Dict[str, Any]) -> PlanInput:
+        """构建追问的计划输入：沿用上一轮输入，覆盖明确给出的会议
+        
+        仅改变会议/工作窗口/轮数的追问，同时覆盖工作窗口和轮数。
+        """
+        plan_input = session.last_plan_input
+        parsed_input = self._build_plan_input({**params, 'date': plan_input.date.isoformat()})
+        updates = {}
+        if params.get('meetings'):
+            updates['meetings'] = parsed_input.meetings
+        if params.get('replan_only'):
+            if params.get('work_window'):
+                updates['work_window_start'] = parsed_input.work_window_start
+                updates['work_window_end'] = parsed_input.work_window_end
+            if params.get('cycles'):
+                updates['cycles'] = parsed_input.cycles
+        return plan_input.model_copy(update=updates) if updates else plan_input
+    
     def _display_plan(self, plan_result):
         """显示计划结果"""
         click.echo("\n" + "="*50)
@@ -183,27 +358,58 @@ class CommandExecutor:
         else:
             return 'ics'
     
-    def _create_calendar(self, target_date: date, plan_result, calendar_type: str):
+    def _create_calendar(self, target_date: date, plan_result, calendar_type: str, plan_input: Optional[PlanInput] = None):
         """创建日历"""
         try:
             # 生成番茄钟时间表
-            schedule = self.scheduler.schedule_pomodoros(target_date, plan_result)
+            schedule = self.scheduler.schedule_pomodoros(target_date, plan_result, plan_input)
             
             if not schedule:
                 click.echo("❌ 无法生成番茄钟时间表")
                 return
             
+            # 导出前校验日程，存在错误时不写入日历
+            violations = self.scheduler.find_violations(schedule, plan_input)
+            for violation in violations[:10]:
+                icon = "❌" if violation.severity == "error" else "⚠️"
+                click.echo(f"{icon} {violation.message}")
+            if len(violations) > 10:
+                click.echo(f"   ... 共 {len(violations)} 项")
+            if has_errors(violations):
+                click.echo("❌ 日程校验未通过，已取消导出")
+                return
+            
+            # 保存最终日程，供 serve-ics 订阅源使用；保存失败（如系统用户名不能作为目录名）不影响导出
+            try:
+                self.schedule_store.save_day(resolve_user_id(self.config.exports), target_date, schedule)
+            except (ValueError, OSError) as e:
+                click.echo(f"⚠️ 日程未保存到订阅源（可在配置中设置 exports.user_id）: {str(e)}")
+            
             if calendar_type == 'google':
-                click.echo("📅 创建Google Calendar...")
-                click.echo("⚠️ Google Calendar集成正在开发中")
+                click.echo("📅 同步到Google Calendar...")
+                try:
+                    result = self.google_calendar.sync_day(target_date, schedule)
+                    click.echo(f"🔁 {result.summary()}")
+                    if result.ok:
+                        click.echo("\n🎉 Google Calendar同步完成!")
+                        return
+                    click.echo(f"⚠️ {len(result.failed)}个事件同步失败，改为生成ICS文件")
+                except Exception as e:
+                    click.echo(f"❌ Google Calendar同步失败: {str(e)}")
                 # 降级到ICS文件
                 calendar_type = 'ics'
             
             if calendar_type in ['ios', 'ics']:
                 click.echo("📅 生成ICS日历文件...")
                 
-                # 生成ICS文件
-                ics_path = self.calendar_manager.export_to_ics_with_reminders(target_date, schedule)
+                # 导出过的日期只写出变化的事件（稳定UID，日历应用会更新原事件）
+                if self.calendar_manager.has_exported(target_date):
+                    ics_path = self.calendar_manager.export_changes(target_date, schedule)
+                    if ics_path is None:
+                        click.echo("✅ 日历已是最新，无需重新导入")
+                        return
+                else:
+                    ics_path = self.calendar_manager.export_to_ics_with_reminders(target_date, schedule)
                 
                 if calendar_type == 'ios':
                     # iOS/Mac自动打开
@@ -5,8 +5,10 @@
 import os
 import json
 from pathlib import Path
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from typing import Dict, Optional, List, Literal
+from pydantic import BaseModel, Field, field_validator
+
+from .schedule import PomodoroType
 
 
 class OpenAIConfig(BaseModel):
@@ -16,6 +18,7 @@ class OpenAIConfig(BaseModel):
     model: str = Field(default="gpt-4")
     max_tokens: int = Field(default=2000)
     temperature: float = Field(default=0.1)
+    max_retries: int = Field(default=2, description="SDK内部的重试次数（经限流器调用时为0，由限流器负责重试）")
     
     @property
     def effective_api_key(self) -> str:
@@ -49,12 +52,33 @@ class OpenAIConfig(BaseModel):
             return self.temperature
 
 
+class ConcurrencyConfig(BaseModel):
+    """LLM并发限流配置（AIMD自适应）"""
+    initial_limit: int = Field(default=4, description="初始并发数")
+    min_limit: int = Field(default=1, description="最小并发数")
+    max_limit: int = Field(default=32, description="最大并发数")
+    additive_increase: float = Field(default=1.0, description="每个健康窗口增加的并发数")
+    backoff_factor: float = Field(default=0.5, description="遇到429或延迟飙升时的乘性退避系数")
+    latency_threshold_ms: int = Field(default=8000, description="判定延迟飙升的阈值（毫秒）")
+    window_size: int = Field(default=10, description="每个调整窗口包含的请求数")
+    history_size: int = Field(default=200, description="保留的并发数变化历史条数")
+    throttle_retries: int = Field(default=2, description="遇到429时退避后重试的次数")
+
+
 class GoogleCalendarConfig(BaseModel):
     """Google Calendar配置"""
     calendar_id: str = Field(default="primary")
     scopes: List[str] = Field(default_factory=lambda: [
         "https://www.googleapis.com/auth/calendar"
     ])
+    credentials_path: str = Field(default="~/.pilot/google_credentials.json", description="OAuth客户端密钥文件")
+    token_path: str = Field(default="~/.pilot/google_token.json", description="授权后保存的令牌")
+    api_root: str = Field(default="", description="API根地址，留空使用Google官方地址（可指向本地替身服务）")
+    batch_size: int = Field(default=50, description="每个批量请求包含的子请求数（Google上限50）")
+    max_retries: int = Field(default=3, description="限流或服务端错误时重试的轮数")
+    timeout_seconds: int = Field(default=30)
+    use_freebusy: bool = Field(default=False, description="生成计划时是否查询Google日历的忙碌时间")
+    busy_calendars: List[str] = Field(default_factory=list, description="查询忙碌时间的日历，留空时使用calendar_id")
 
 
 class PomodoroConfig(BaseModel):
@@ -64,11 +88,126 @@ class PomodoroConfig(BaseModel):
     work_cycles: int = Field(default=6)
     study_focus_min: int = Field(default=45)
     study_break_min: int = Field(default=15)
+    long_break_min: int = Field(default=15)
+    long_break_every: int = Field(default=4, description="每隔几轮安排一次长休息")
+    lunch_start: str = Field(default="12:00")
+    lunch_end: str = Field(default="14:00")
+    lunch_buffer_min: int = Field(default=10, description="午休结束后的缓冲时间（14:10恢复工作）")
+    partial_cycle_policy: Literal["skip", "shrink"] = Field(
+        default="skip",
+        description="空闲段放不下完整专注时的处理：skip跳到下一空闲段，shrink缩短本轮专注"
+    )
+    min_partial_focus_min: int = Field(default=25, description="shrink策略下专注时长的下限")
+
+
+class WorkdayConfig(BaseModel):
+    """工作日日历配置"""
+    enabled: bool = Field(default=True, description="是否按法定节假日和调休判断工作日")
+    region: str = Field(default="CN", description="内置节假日数据的地区")
+    weekend: List[int] = Field(default_factory=lambda: [5, 6], description="周末（0=周一）")
+    override_path: str = Field(default="~/.pilot/workdays.json", description="自定义节假日数据，覆盖内置数据")
+
+
+class AssignmentConfig(BaseModel):
+    """番茄钟任务分配配置"""
+    enabled: bool = Field(default=True, description="LLM未给出映射时是否使用分配求解器")
+    preserve_task_order: bool = Field(default=False, description="按任务输入顺序安排，不做精力匹配")
+    peak_windows: List[str] = Field(
+        default_factory=lambda: ["09:00-11:30", "15:00-17:00"],
+        description="精力高峰时段，高精力和深度任务优先安排在这些时段"
+    )
+    completion_bonus: float = Field(default=0.5, description="任务全部完成时额外获得的权重比例")
+    time_budget_ms: float = Field(default=10.0, description="单日求解的时间上限，超出后改用贪心")
+
+
+class IntentConfig(BaseModel):
+    """本地意图分类配置"""
+    enabled: bool = Field(default=True, description="是否启用本地意图分类")
+    confidence_threshold: float = Field(default=0.95, description="本地路由所需的最低置信度")
+    min_samples: int = Field(default=30, description="训练所需的最少样本数")
+    model_path: str = Field(default="~/.pilot/intent_model.json")
+    log_path: str = Field(default="~/.pilot/intent_log.jsonl")
+
+
+class ChatConfig(BaseModel):
+    """交互式对话配置"""
+    memory_token_budget: int = Field(default=1200, description="每轮发送给LLM的会话上下文token预算")
+    summary_max_turns: int = Field(default=6, description="滚动摘要保留的最近轮数")
+
+
+class TemplateConfig(BaseModel):
+    """计划模板配置"""
+    enabled: bool = Field(default=True, description="生成计划前是否尝试匹配模板")
+    directory: str = Field(default="~/.pilot/templates")
+    match_tolerance_min: int = Field(default=15, description="会议与工作窗口匹配的容差（分钟）")
+
+
+class BacklogConfig(BaseModel):
+    """任务待办池配置"""
+    enabled: bool = Field(default=True, description="生成计划时是否附带待办池中的候选任务")
+    path: str = Field(default="~/.pilot/backlog.json")
+    aging_per_day: float = Field(default=0.2, description="每等待一天增加的优先级（权重单位）")
+    deadline_horizon_days: int = Field(default=3, description="截止日在几天内的任务优先入选")
+    max_candidates: int = Field(default=6, description="每天交给规划器的候选任务上限")
+
+
+class RuntimeConfig(BaseModel):
+    """番茄钟实时执行配置"""
+    tick_seconds: float = Field(default=1.0, description="时间轮刻度（秒）")
+    max_sleep_seconds: float = Field(default=30.0, description="单次睡眠上限，限定系统休眠恢复后补触发的最大延迟")
+    log_dir: str = Field(default="~/.pilot/sessions", description="实际执行记录的保存目录")
+
+
+class ImportConfig(BaseModel):
+    """日历导入配置"""
+    busy_sources: List[str] = Field(default_factory=list, description="读取忙碌时间的.ics文件路径")
+    cache_dir: str = Field(default="~/.pilot/ics_cache", description="解析索引的缓存目录")
+    include_all_day: bool = Field(default=False, description="全天事件是否算作忙碌")
 
 
 class ExportsConfig(BaseModel):
     """导出配置"""
     ics_dir: str = Field(default="exports")
+    user_id: str = Field(default="", description="生成事件UID的用户标识，留空时使用系统用户名")
+    state_path: str = Field(default="~/.pilot/ics_state.json", description="已导出事件的状态文件，用于增量导出")
+    state_retention_days: int = Field(default=60, description="状态文件保留多少天以前的导出记录")
+    compress_recurring: bool = Field(default=True, description="多天导出时把每天重复的时段写成重复事件（RRULE）")
+    recurring_min_occurrences: int = Field(default=3, description="至少出现几次才写成重复事件")
+    ics_profile: Literal["full", "compact"] = Field(
+        default="full",
+        description="事件内容：full为完整描述和提醒；compact去掉每个事件重复的提示和署名，专注只保留1个提醒"
+    )
+    alarm_limits: Dict[str, int] = Field(
+        default_factory=dict,
+        description="按类型（focus/short_break/long_break/lunch/task）限制提醒数量，0为不提醒，覆盖ics_profile的默认值"
+    )
+    fsync: bool = Field(default=False, description="导出文件替换前后是否fsync（断电不丢失，但写入更慢）")
+    bulk_workers: int = Field(default=0, description="批量导出的进程数，0为CPU核数")
+    
+    @field_validator('alarm_limits')
+    @classmethod
+    def _check_alarm_limits(cls, value: Dict[str, int]) -> Dict[str, int]:
+        """提醒类型必须是已知的条目类型，数量不能为负（配置加载时即报错）"""
+        known = [kind.value for kind in PomodoroType]
+        for name, limit in value.items():
+            if name not in known:
+                raise ValueError(f"未知的提醒类型: {name}（可选: {', '.join(known)}）")
+            if limit < 0:
+                raise ValueError(f"提醒数量不能为负: {name}={limit}")
+        return value
+
+
+class FeedConfig(BaseModel):
+    """日历订阅源配置"""
+    host: str = Field(default="127.0.0.1", description="监听地址，手机等其他设备订阅时改为0.0.0.0")
+    port: int = Field(default=8765)
+    store_dir: str = Field(default="~/.pilot/schedules", description="按用户和日期保存日程的目录")
+    token: str = Field(default="", description="订阅地址需要携带的?token=，留空时不校验")
+    past_days: int = Field(default=7, description="未指定范围时包含过去几天")
+    future_days: int = Field(default=30, description="未指定范围时包含未来几天")
+    max_range_days: int = Field(default=366, description="单个订阅源最多包含的天数")
+    cache_entries: int = Field(default=256, description="缓存的订阅源数量（按用户和日期范围）")
+    max_age_seconds: int = Field(default=300, description="Cache-Control的max-age")
 
 
 class PilotConfig(BaseModel):
@@ -76,9 +215,19 @@ class PilotConfig(BaseModel):
     version: str = Field(default="1.0.0-mvp")
     timezone: str = Field(default="Asia/Shanghai")
     openai: OpenAIConfig = Field(default_factory=OpenAIConfig)
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
     google_calendar: GoogleCalendarConfig = Field(default_factory=GoogleCalendarConfig)
     pomodoro: PomodoroConfig = Field(default_factory=PomodoroConfig)
+    assignment: AssignmentConfig = Field(default_factory=AssignmentConfig)
+    workdays: WorkdayConfig = Field(default_factory=WorkdayConfig)
     exports: ExportsConfig = Field(default_factory=ExportsConfig)
+    imports: ImportConfig = Field(default_factory=ImportConfig)
+    feed: FeedConfig = Field(default_factory=FeedConfig)
+    intent: IntentConfig = Field(default_factory=IntentConfig)
+    chat: ChatConfig = Field(default_factory=ChatConfig)
+    templates: TemplateConfig = Field(default_factory=TemplateConfig)
+    runtime: RuntimeConfig = Field(default_factory=RuntimeConfig)
+    backlog: BacklogConfig = Field(default_factory=BacklogConfig)
     
     @classmethod
     def load_from_file(cls, config_path: Optional[Path] = None) -> "PilotConfig":
@@ -2,7 +2,7 @@
 计划相关数据模型
 """
 
-from datetime import date, time, datetime, timedelta
+from datetime import date, time
 from typing import List, Optional, Literal
 from pydantic import BaseModel, Field
 
@@ -14,11 +14,10 @@ class TimeSlot(BaseModel):
     
     def duration_minutes(self) -> int:
         """计算时长（分钟）"""
-        start_dt = datetime.combine(date.today(), self.start)
-        end_dt = datetime.combine(date.today(), self.end)
-        if end_dt < start_dt:  # 跨天情况
-            end_dt += timedelta(days=1)
-        return int((end_dt - start_dt).total_seconds() / 60)
+        minutes = (self.end.hour * 60 + self.end.minute) - (self.start.hour * 60 + self.start.minute)
+        if minutes < 0:  # 跨天情况
+            minutes += 24 * 60
+        return minutes
 
 
 class Task(BaseModel):
@@ -30,12 +30,11 @@ class ScheduleItem(BaseModel):
     subtask: str = ""  # 具体的子任务或任务内容
     focus_content: str = ""  # 专注内容描述
     cycle_number: int = 0  # 番茄钟循环编号
+    slot_id: str = ""  # 稳定的时段标识（如 focus-3、break-3、lunch），用于增量对比
     
     def duration_minutes(self) -> int:
         """时长（分钟）"""
-        start_dt = datetime.combine(datetime.today().date(), self.start_time)
-        end_dt = datetime.combine(datetime.today().date(), self.end_time)
-        return int((end_dt - start_dt).total_seconds() / 60)
+        return (self.end_time.hour * 60 + self.end_time.minute) - (self.start_time.hour * 60 + self.start_time.minute)
 
 
 class CalendarEvent(BaseModel):
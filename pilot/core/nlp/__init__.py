@@ -3,7 +3,12 @@
 """
 
 from .parser import CommandParser
+from .intent import IntentClassifier, IntentLog
+from .session import ChatSession
 
 __all__ = [
     'CommandParser',
+    'IntentClassifier',
+    'IntentLog',
+    'ChatSession',
 ]
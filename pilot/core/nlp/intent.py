@@ -0,0 +1,326 @@
+"""
+本地意图分类器
+
+基于字符n-gram的多项式朴素贝叶斯，从历史日志（用户输入 → command_type）训练，
+置信度足够高时直接本地路由命令，避免一次LLM调用。
+
+朴素贝叶斯的softmax分数普遍过于自信（n-gram之间并不独立），训练时在留出集上拟合温度系数，
+预测时先除以温度再归一化，使置信度接近实际准确率。
+"""
+
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+
+# 模型文件格式版本，结构不兼容时递增
+MODEL_FORMAT_VERSION = 1
+
+# 温度系数的候选值（对数均匀分布）
+_TEMPERATURE_GRID = [round(10 ** (i / 20), 3) for i in range(0, 41)]
+
+_DIGIT_PATTERN = re.compile(r'\d')
+_SPACE_PATTERN = re.compile(r'\s+')
+
+
+def _normalize(text: str) -> str:
+    """文本归一化：小写、数字统一为0、合并空白"""
+    text = _DIGIT_PATTERN.sub('0', text.lower())
+    return _SPACE_PATTERN.sub(' ', text).strip()
+
+
+def extract_ngrams(text: str, ngram_range: Tuple[int, int] = (1, 3)) -> Counter:
+    """提取字符n-gram计数"""
+    padded = f"^{_normalize(text)}$"
+    counts = Counter()
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        for i in range(len(padded) - n + 1):
+            counts[padded[i:i + n]] += 1
+    return counts
+
+
+class IntentClassifier:
+    """字符n-gram朴素贝叶斯意图分类器"""
+    
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 3), alpha: float = 1.0):
+        self.ngram_range = tuple(ngram_range)
+        self.alpha = alpha
+        self.version = 0
+        self.trained_at: Optional[str] = None
+        self.metrics: Dict[str, Any] = {}
+        self.temperature = 1.0
+        self.class_counts: Dict[str, int] = {}
+        self.feature_counts: Dict[str, Dict[str, int]] = {}
+        self._log_prior: Dict[str, float] = {}
+        self._log_likelihood: Dict[str, Dict[str, float]] = {}
+        self._log_unseen: Dict[str, float] = {}
+        self._vocab: set = set()
+    
+    @property
+    def labels(self) -> List[str]:
+        """已知的命令类型"""
+        return sorted(self.class_counts)
+    
+    @property
+    def sample_count(self) -> int:
+        """训练样本数"""
+        return sum(self.class_counts.values())
+    
+    def fit(self, samples: List[Tuple[str, str]]) -> "IntentClassifier":
+        """训练模型
+        
+        Args:
+            samples: (用户输入, command_type) 列表
+        """
+        self.class_counts = {}
+        self.feature_counts = {}
+        for text, label in samples:
+            self.class_counts[label] = self.class_counts.get(label, 0) + 1
+            features = self.feature_counts.setdefault(label, {})
+            for gram, count in extract_ngrams(text, self.ngram_range).items():
+                features[gram] = features.get(gram, 0) + count
+        
+        self.trained_at = datetime.now().isoformat(timespec='seconds')
+        self._build_tables()
+        return self
+    
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """预测各命令类型的概率（已按温度系数校准）"""
+        scores = self._scores(text)
+        if not scores:
+            return {}
+        return _softmax(scores, self.temperature)
+    
+    def calibrate(self, samples: List[Tuple[str, str]]) -> float:
+        """在留出样本上选取使负对数似然最小的温度系数，返回选中的温度"""
+        scored = [(self._scores(text), label) for text, label in samples if label in self.class_counts]
+        if not scored:
+            return self.temperature
+        
+        def nll(temperature: float) -> float:
+            return -sum(math.log(max(_softmax(scores, temperature)[label], 1e-12)) for scores, label in scored)
+        
+        self.temperature = min(_TEMPERATURE_GRID, key=nll)
+        return self.temperature
+    
+    def _scores(self, text: str) -> Dict[str, float]:
+        """各命令类型的对数后验（未归一化）"""
+        if not self._log_prior:
+            return {}
+        
+        grams = extract_ngrams(text, self.ngram_range)
+        scores = {}
+        for label, log_prior in self._log_prior.items():
+            likelihood = self._log_likelihood[label]
+            unseen = self._log_unseen[label]
+            score = log_prior
+            for gram, count in grams.items():
+                # 词表外的n-gram对所有类别一视同仁，直接忽略
+                if gram in self._vocab:
+                    score += count * likelihood.get(gram, unseen)
+            scores[label] = score
+        return scores
+    
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """预测命令类型及置信度"""
+        proba = self.predict_proba(text)
+        if not proba:
+            return None, 0.0
+        label = max(proba, key=proba.get)
+        return label, proba[label]
+    
+    def evaluate(self, samples: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """评估准确率与单次预测延迟"""
+        if not samples:
+            return {'samples': 0, 'accuracy': 0.0}
+        
+        correct = 0
+        per_class: Dict[str, List[int]] = {}
+        latencies = []
+        for text, label in samples:
+            start = time.perf_counter()
+            predicted, _ = self.predict(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+            
+            stats = per_class.setdefault(label, [0, 0])
+            stats[1] += 1
+            if predicted == label:
+                correct += 1
+                stats[0] += 1
+        
+        latencies.sort()
+        return {
+            'samples': len(samples),
+            'accuracy': round(correct / len(samples), 4),
+            'per_class_accuracy': {
+                label: round(hit / total, 4) for label, (hit, total) in sorted(per_class.items())
+            },
+            'latency_ms_p50': round(latencies[len(latencies) // 2], 3),
+            'latency_ms_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典"""
+        return {
+            'format_version': MODEL_FORMAT_VERSION,
+            'version': self.version,
+            'trained_at': self.trained_at,
+            'ngram_range': list(self.ngram_range),
+            'alpha': self.alpha,
+            'temperature': self.temperature,
+            'class_counts': self.class_counts,
+            'feature_counts': self.feature_counts,
+            'metrics': self.metrics,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IntentClassifier":
+        """从字典恢复模型"""
+        if data.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"不支持的意图模型格式版本: {data.get('format_version')}")
+        
+        classifier = cls(ngram_range=tuple(data['ngram_range']), alpha=data['alpha'])
+        classifier.version = data.get('version', 0)
+        classifier.trained_at = data.get('trained_at')
+        classifier.metrics = data.get('metrics', {})
+        classifier.temperature = data.get('temperature', 1.0)
+        classifier.class_counts = data['class_counts']
+        classifier.feature_counts = data['feature_counts']
+        classifier._build_tables()
+        return classifier
+    
+    def save(self, path: Path):
+        """保存模型文件"""
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional["IntentClassifier"]:
+        """加载模型文件，不存在或格式不兼容时返回None"""
+        path = Path(path).expanduser()
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"⚠️ 意图模型加载失败: {str(e)}")
+            return None
+    
+    def _build_tables(self):
+        """预计算对数概率表"""
+        total = self.sample_count
+        self._vocab = set()
+        for features in self.feature_counts.values():
+            self._vocab.update(features)
+        vocab_size = max(1, len(self._vocab))
+        
+        self._log_prior = {}
+        self._log_likelihood = {}
+        self._log_unseen = {}
+        for label, count in self.class_counts.items():
+            features = self.feature_counts.get(label, {})
+            denominator = sum(features.values()) + self.alpha * vocab_size
+            self._log_prior[label] = math.log(count / total)
+            self._log_unseen[label] = math.log(self.alpha / denominator)
+            self._log_likelihood[label] = {
+                gram: math.log((value + self.alpha) / denominator) for gram, value in features.items()
+            }
+
+
+def _softmax(scores: Dict[str, float], temperature: float = 1.0) -> Dict[str, float]:
+    """按温度缩放后做softmax归一化"""
+    max_score = max(scores.values())
+    exp_scores = {label: math.exp((score - max_score) / temperature) for label, score in scores.items()}
+    total = sum(exp_scores.values())
+    return {label: value / total for label, value in exp_scores.items()}
+
+
+class IntentLog:
+    """意图训练日志（JSONL，每行一条 用户输入 → command_type）
+    
+    LLM解析的记录作为训练样本；本地路由的记录带 source=local 和置信度，只用于审计，
+    不参与训练（否则分类器会用自己的预测结果训练自己）。
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path).expanduser()
+    
+    def append(self, user_input: str, command_type: str, source: str = "llm", confidence: Optional[float] = None):
+        """追加一条记录"""
+        if not user_input or not command_type:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            'input': user_input,
+            'command_type': command_type,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        }
+        if source != "llm":
+            record['source'] = source
+        if confidence is not None:
+            record['confidence'] = round(confidence, 4)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
+    def load(self, include_local: bool = False) -> List[Tuple[str, str]]:
+        """读取训练样本（默认不含本地路由的记录）"""
+        if not self.path.exists():
+            return []
+        
+        samples = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('source', 'llm') != 'llm' and not include_local:
+                    continue
+                if record.get('input') and record.get('command_type'):
+                    samples.append((record['input'], record['command_type']))
+        return samples
+
+
+def train_intent_model(
+    samples: List[Tuple[str, str]],
+    test_ratio: float = 0.2,
+    previous: Optional[IntentClassifier] = None,
+    seed: int = 42
+) -> IntentClassifier:
+    """训练意图模型：先在留出集上评估，再用全部样本训练最终模型"""
+    shuffled = list(samples)
+    random.Random(seed).shuffle(shuffled)
+    test_size = int(len(shuffled) * test_ratio)
+    test_set, train_set = shuffled[:test_size], shuffled[test_size:]
+    
+    metrics: Dict[str, Any] = {'train_samples': len(train_set)}
+    temperature = 1.0
+    if test_set:
+        holdout = IntentClassifier().fit(train_set)
+        metrics['holdout'] = holdout.evaluate(test_set)
+        temperature = holdout.calibrate(test_set)
+        metrics['temperature'] = temperature
+    
+    start = time.perf_counter()
+    classifier = IntentClassifier().fit(shuffled)
+    classifier.temperature = temperature
+    metrics['train_time_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    metrics['total_samples'] = len(shuffled)
+    metrics['labels'] = dict(Counter(label for _, label in shuffled))
+    
+    classifier.version = (previous.version if previous else 0) + 1
+    classifier.metrics = metrics
+    return classifier
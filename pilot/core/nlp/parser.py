@@ -2,26 +2,135 @@
 命令解析器
 """
 
-from datetime import datetime
-from typing import Optional, Dict, Any
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List
 
 from ...interfaces.llm import LLMInterface
+from .intent import IntentClassifier, IntentLog
+
+
+_TIME_RANGE_PATTERN = re.compile(r'(\d{1,2}:\d{2})\s*[-–—~至到]\s*(\d{1,2}:\d{2})')
+_CYCLES_PATTERN = re.compile(r'(\d+)\s*(?:轮|个番茄|个?cycles?)', re.IGNORECASE)
+_MEETING_KEYWORDS = ('会议', 'meeting')
+_WINDOW_KEYWORDS = ('工作时间', '工作窗口', 'work window')
+_INBOX_PREFIX_PATTERN = re.compile(r'^.*?(?:收集箱|inbox)\s*[:：]\s*', re.IGNORECASE)
+_ISO_DATE_PATTERN = re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})')
+_MONTH_DAY_PATTERN = re.compile(r'(\d{1,2})月(\d{1,2})[日号]')
+_WEEKDAY_PATTERN = re.compile(r'(下+)?(?:周|星期|礼拜)([一二三四五六日天])')
+_RELATIVE_DAYS = (('大后天', 3), ('后天', 2), ('明天', 1), ('明日', 1), ('今天', 0), ('今日', 0))
+_WEEKDAY_NUMBERS = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6}
+_POMODORO_START_PATTERN = re.compile(r'(?:从|在)?\s*(\d{1,2}:\d{2})\s*(?:开始|起|start)', re.IGNORECASE)
+_FOCUS_TASKS_PATTERN = re.compile(r'重点(?:推进|任务|完成|处理|做)?\s*[:：]?\s*([^,，。；;\n]+)')
+_FOCUS_SPLIT_PATTERN = re.compile(r'\s*(?:[、/]|以及|和|及)\s*')
+_CALENDAR_KEYWORDS = (('google', ('google', '谷歌')), ('ics', ('ics', 'ical', '日历文件', '苹果日历')))
 
 
 class CommandParser:
     """自然语言命令解析器"""
     
-    def __init__(self, llm: LLMInterface):
+    def __init__(
+        self,
+        llm: LLMInterface,
+        classifier: Optional[IntentClassifier] = None,
+        intent_log: Optional[IntentLog] = None,
+        confidence_threshold: float = 0.95
+    ):
         self.llm = llm
+        self.classifier = classifier
+        self.intent_log = intent_log
+        self.confidence_threshold = confidence_threshold
     
-    def parse_command(self, user_input: str) -> Optional[Dict[str, Any]]:
-        """解析用户自然语言输入"""
-        parsed_data = self.llm.parse_command(user_input)
+    def parse_command(self, user_input: str, context: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """解析用户自然语言输入
+        
+        Args:
+            user_input: 用户输入
+            context: 会话上下文，存在时由LLM判断是否为对已有计划的追问
+        """
+        # 本地分类器足够自信时直接路由，无需调用LLM；
+        # 有会话上下文时追问识别依赖LLM，不走本地路由
+        parsed_data = None if context else self._parse_locally(user_input)
+        
+        if parsed_data is None:
+            parsed_data = self.llm.parse_command(user_input, context)
+            if parsed_data and self.intent_log:
+                self.intent_log.append(user_input, parsed_data.get('command_type', ''))
+        elif self.intent_log:
+            # 本地路由的结果只记录备查，不作为训练样本
+            self.intent_log.append(
+                user_input, parsed_data['command_type'], source='local', confidence=parsed_data['confidence']
+            )
         
         if parsed_data:
             return self._convert_to_cli_params(parsed_data)
         return None
     
+    def _parse_locally(self, user_input: str, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """使用本地意图分类器解析，置信度不足时返回None
+        
+        命令类型由分类器给出，日期、时间段、轮数、起始时间、日历和重点任务用规则提取，
+        提取不到的字段与LLM解析时一样取默认值。
+        """
+        if not self.classifier:
+            return None
+        
+        command_type, confidence = self.classifier.predict(user_input)
+        if command_type is None or confidence < self.confidence_threshold:
+            return None
+        
+        parsed_data = {
+            'command_type': command_type,
+            'date': _extract_date(user_input, today or date.today()),
+            'task_content': user_input,
+            'confidence': confidence,
+            'intent_source': 'local',
+        }
+        
+        lowered = user_input.lower()
+        meetings = []
+        range_spans = []
+        for match in _TIME_RANGE_PATTERN.finditer(user_input):
+            range_spans.append(match.span())
+            time_range = f"{match.group(1).zfill(5)}-{match.group(2).zfill(5)}"
+            prefix = lowered[:match.start()]
+            if any(keyword in prefix for keyword in _WINDOW_KEYWORDS) and not meetings \
+                    and not any(keyword in prefix for keyword in _MEETING_KEYWORDS):
+                parsed_data['work_window'] = time_range
+            else:
+                meetings.append(time_range)
+        if meetings:
+            parsed_data['meetings'] = ','.join(meetings)
+        
+        cycles_match = _CYCLES_PATTERN.search(user_input)
+        if cycles_match:
+            parsed_data['cycles'] = int(cycles_match.group(1))
+        
+        if '学习' in user_input or 'study' in lowered:
+            parsed_data['mode'] = 'study'
+        
+        if '加班' in user_input:
+            parsed_data['allow_rest_day'] = True
+        
+        for match in _POMODORO_START_PATTERN.finditer(user_input):
+            if not any(start <= match.start(1) < end for start, end in range_spans):
+                parsed_data['pomodoro_start'] = match.group(1).zfill(5)
+                break
+        
+        for calendar, keywords in _CALENDAR_KEYWORDS:
+            if any(keyword in lowered for keyword in keywords):
+                parsed_data['calendar'] = calendar
+                break
+        
+        focus_tasks = _extract_focus_tasks(user_input)
+        if focus_tasks:
+            parsed_data['focus_tasks'] = focus_tasks
+        
+        if command_type == 'inbox':
+            parsed_data['inbox_content'] = _INBOX_PREFIX_PATTERN.sub('', user_input, count=1)
+        
+        return parsed_data
+    
     def _convert_to_cli_params(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
         """将解析结果转换为CLI参数格式"""
         params = {}
@@ -63,5 +172,53 @@ class CommandParser:
         params['focus_tasks'] = parsed_data.get('focus_tasks', [])
         params['inbox_content'] = parsed_data.get('inbox_content', '')
         params['confidence'] = parsed_data.get('confidence', 0.0)
+        params['intent_source'] = parsed_data.get('intent_source', 'llm')
+        params['is_followup'] = bool(parsed_data.get('is_followup', False))
+        params['replan_only'] = bool(parsed_data.get('replan_only', False))
+        params['allow_rest_day'] = bool(parsed_data.get('allow_rest_day', False))
+        params['edit_instruction'] = parsed_data.get('edit_instruction', '')
         
         return params
+
+
+def _extract_date(user_input: str, today: date) -> str:
+    """从输入中提取日期：今天/明天/后天、(下)周X、YYYY-MM-DD、M月D日，未提及时返回TODAY"""
+    match = _ISO_DATE_PATTERN.search(user_input)
+    if match:
+        try:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3))).isoformat()
+        except ValueError:
+            pass
+    
+    match = _MONTH_DAY_PATTERN.search(user_input)
+    if match:
+        try:
+            target = date(today.year, int(match.group(1)), int(match.group(2)))
+            # 没写年份且日期已过时指明年
+            if target < today:
+                target = target.replace(year=today.year + 1)
+            return target.isoformat()
+        except ValueError:
+            pass
+    
+    match = _WEEKDAY_PATTERN.search(user_input)
+    if match:
+        weekday = _WEEKDAY_NUMBERS[match.group(2)]
+        if match.group(1):
+            # 下周X：下一个自然周（周一开始）中的那一天
+            monday = today - timedelta(days=today.weekday()) + timedelta(weeks=len(match.group(1)))
+            return (monday + timedelta(days=weekday)).isoformat()
+        return (today + timedelta(days=(weekday - today.weekday()) % 7)).isoformat()
+    
+    for keyword, offset in _RELATIVE_DAYS:
+        if keyword in user_input:
+            return 'TODAY' if offset == 0 else (today + timedelta(days=offset)).isoformat()
+    return 'TODAY'
+
+
+def _extract_focus_tasks(user_input: str) -> List[str]:
+    """提取"重点：A、B"形式的重点任务列表"""
+    match = _FOCUS_TASKS_PATTERN.search(user_input)
+    if not match:
+        return []
+    return [task for task in _FOCUS_SPLIT_PATTERN.split(match.group(1).strip()) if task]
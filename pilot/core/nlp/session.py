@@ -0,0 +1,140 @@
+"""
+交互式对话的会话记忆
+
+保存上一轮解析参数与计划结果，向LLM只发送紧凑的结构化状态和滚动摘要，
+并控制在token预算以内，使追问（如"把项目B挪到下午"）变成小的增量请求。
+"""
+
+import json
+import re
+from collections import Counter, deque
+from typing import Optional, Dict, Any, List
+
+from ..models.config import ChatConfig
+from ..models.plan import PlanInput, PlanOutput
+
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符按1个计，其余按4个字符1个计"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class ChatSession:
+    """交互模式的有界会话记忆"""
+    
+    def __init__(self, config: Optional[ChatConfig] = None):
+        self.config = config or ChatConfig()
+        self.last_params: Dict[str, Any] = {}
+        self.last_plan_input: Optional[PlanInput] = None
+        self.last_plan: Optional[PlanOutput] = None
+        self._recent_turns = deque(maxlen=self.config.summary_max_turns)
+        self._earlier_turns = Counter()
+    
+    @property
+    def has_plan(self) -> bool:
+        """会话中是否已有计划"""
+        return self.last_plan is not None and self.last_plan_input is not None
+    
+    def record_turn(
+        self,
+        user_input: str,
+        params: Dict[str, Any],
+        plan_input: Optional[PlanInput] = None,
+        plan: Optional[PlanOutput] = None
+    ):
+        """记录一轮对话结果"""
+        command_type = params.get('command_type', 'plan')
+        self.last_params = params
+        if plan is not None and plan_input is not None:
+            self.last_plan_input = plan_input
+            self.last_plan = plan
+        
+        if len(self._recent_turns) == self._recent_turns.maxlen:
+            # 被挤出的旧轮次只保留按命令类型的计数
+            self._earlier_turns[self._recent_turns[0][0]] += 1
+        
+        outcome = f"{len(plan.top_tasks)}个任务" if plan is not None else "已执行"
+        self._recent_turns.append((command_type, f"{command_type}: {user_input[:60]} → {outcome}"))
+    
+    def compact_state(self) -> Dict[str, Any]:
+        """当前计划的紧凑结构化状态"""
+        if not self.has_plan:
+            return {}
+        
+        plan_input = self.last_plan_input
+        state = {
+            'date': plan_input.date.isoformat(),
+            'work_window': f"{plan_input.work_window_start.strftime('%H:%M')}-{plan_input.work_window_end.strftime('%H:%M')}",
+            'meetings': [f"{m.start.strftime('%H:%M')}-{m.end.strftime('%H:%M')}" for m in plan_input.meetings],
+            'mode': plan_input.mode,
+            'cycles': plan_input.cycles,
+            'tasks': [],
+        }
+        for task in self.last_plan.top_tasks:
+            compact_task = {'title': task.title, 'est_min': task.est_min, 'weight': task.weight}
+            if task.scheduled_start and task.scheduled_end:
+                compact_task['time'] = f"{task.scheduled_start.strftime('%H:%M')}-{task.scheduled_end.strftime('%H:%M')}"
+            compact_task['type'] = task.type
+            state['tasks'].append(compact_task)
+        return state
+    
+    def summary_lines(self) -> List[str]:
+        """滚动摘要"""
+        lines = []
+        if self._earlier_turns:
+            counts = ', '.join(f"{name}×{count}" for name, count in self._earlier_turns.items())
+            lines.append(f"更早的对话: {counts}")
+        lines.extend(line for _, line in self._recent_turns)
+        return lines
+    
+    def build_context(self, token_budget: Optional[int] = None) -> Optional[str]:
+        """构建发送给LLM的会话上下文，超出预算时逐级裁剪"""
+        if not self._recent_turns and not self.has_plan:
+            return None
+        
+        budget = token_budget or self.config.memory_token_budget
+        state = self.compact_state()
+        summary = self.summary_lines()
+        
+        context = self._dump(state, summary)
+        # 1. 先丢弃最旧的摘要行
+        while estimate_tokens(context) > budget and summary:
+            summary.pop(0)
+            context = self._dump(state, summary)
+        
+        # 2. 再去掉任务的次要字段
+        if estimate_tokens(context) > budget and state.get('tasks'):
+            state['tasks'] = [
+                {key: value for key, value in task.items() if key in ('title', 'time')}
+                for task in state['tasks']
+            ]
+            context = self._dump(state, summary)
+        
+        # 3. 最后截掉靠后的任务
+        while estimate_tokens(context) > budget and state.get('tasks'):
+            state['tasks'].pop()
+            context = self._dump(state, summary)
+        
+        return context
+    
+    def reset(self):
+        """清空会话记忆"""
+        self.last_params = {}
+        self.last_plan_input = None
+        self.last_plan = None
+        self._recent_turns.clear()
+        self._earlier_turns.clear()
+    
+    @staticmethod
+    def _dump(state: Dict[str, Any], summary: List[str]) -> str:
+        """序列化为紧凑JSON"""
+        payload = {}
+        if state:
+            payload['plan'] = state
+        if summary:
+            payload['history'] = summary
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
@@ -5,7 +5,17 @@
 """
 
 from .planner import LLMPlanner
+from .templates import PlanTemplate, TemplateLibrary
+from .replan import IncrementalReplanner
+from .apportion import apportion
+from .backlog import Backlog, BacklogItem
 
 __all__ = [
     'LLMPlanner',
+    'PlanTemplate',
+    'TemplateLibrary',
+    'IncrementalReplanner',
+    'apportion',
+    'Backlog',
+    'BacklogItem',
 ]
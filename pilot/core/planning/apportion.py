@@ -0,0 +1,115 @@
+"""
+按权重分摊容量
+
+以整轮专注（番茄钟）为单位，把可用容量按权重分给任务：
+1. 注水法求比例系数λ，使 Σ clamp(λ·wᵢ, minᵢ, maxᵢ) = 总量（按断点排序扫描，O(n log n)）；
+2. 取整后按最大余数法（Hamilton）补齐剩余单位，保证总数守恒且不越过上下限。
+容量连下限都不够时，按权重从高到低优先满足下限。
+"""
+
+import math
+from typing import List, Optional, Sequence, Union
+
+
+Bounds = Union[int, Sequence[int]]
+
+
+def _expand(bounds: Optional[Bounds], count: int, default: int) -> List[int]:
+    """把标量或序列形式的上下限展开为列表"""
+    if bounds is None:
+        return [default] * count
+    if isinstance(bounds, int):
+        return [bounds] * count
+    return list(bounds)
+
+
+def _solve_ratio(weights: Sequence[float], lower: List[int], upper: List[int], total: int) -> float:
+    """求λ使 Σ clamp(λ·wᵢ, lowerᵢ, upperᵢ) = total（要求 Σlower ≤ total ≤ Σupper）"""
+    # 每个正权重任务在 λ ∈ [lower/w, upper/w] 区间内线性增长
+    events = []
+    for weight, low, high in zip(weights, lower, upper):
+        if weight > 0:
+            events.append((low / weight, weight))
+            events.append((high / weight, -weight))
+    events.sort()
+    
+    value = float(sum(lower))  # 当前λ处的 Σ clamp
+    slope = 0.0
+    ratio = 0.0
+    for point, delta in events:
+        reached = value + slope * (point - ratio)
+        if slope > 0 and reached >= total:
+            return ratio + (total - value) / slope
+        value, ratio = reached, point
+        slope += delta
+    return ratio
+
+
+def apportion(
+    weights: Sequence[float],
+    total: int,
+    min_units: Optional[Bounds] = None,
+    max_units: Optional[Bounds] = None
+) -> List[int]:
+    """按权重把total个单位分给各任务
+    
+    Args:
+        weights: 各任务权重（非负）
+        total: 可分配的总单位数
+        min_units: 每个任务的下限（标量或序列），缺省为0
+        max_units: 每个任务的上限（标量或序列），缺省不限
+    Returns:
+        各任务分到的单位数；容量介于上下限总和之间时总数恰为total
+    """
+    count = len(weights)
+    if count == 0 or total <= 0:
+        return [0] * count
+    
+    lower = _expand(min_units, count, 0)
+    upper = [max(high, low) for high, low in zip(_expand(max_units, count, total), lower)]
+    
+    # 下限都满足不了：按权重从高到低依次满足下限
+    if sum(lower) > total:
+        allocation = [0] * count
+        remaining = total
+        for index in sorted(range(count), key=lambda i: (-weights[i], i)):
+            if lower[index] <= remaining:
+                allocation[index] = lower[index]
+                remaining -= lower[index]
+        return allocation
+    
+    # 上限总和都不到容量：全部取上限，多余容量不分配
+    if sum(upper) <= total:
+        return upper
+    
+    ratio = _solve_ratio(weights, lower, upper, total)
+    quotas = [min(high, max(low, ratio * weight)) for weight, low, high in zip(weights, lower, upper)]
+    allocation = [min(high, int(math.floor(quota + 1e-9))) for quota, high in zip(quotas, upper)]
+    
+    # 最大余数法补齐，余数相同时权重高者、靠前者优先
+    remainder = total - sum(allocation)
+    if remainder > 0:
+        candidates = sorted(
+            (index for index in range(count) if allocation[index] < upper[index]),
+            key=lambda i: (-(quotas[i] - allocation[i]), -weights[i], i)
+        )
+        for index in candidates[:remainder]:
+            allocation[index] += 1
+        remainder -= min(remainder, len(candidates))
+        # 正权重任务全部到达上限仍有剩余时，依次填满零权重任务
+        for index in range(count):
+            if remainder <= 0:
+                break
+            extra = min(upper[index] - allocation[index], remainder)
+            allocation[index] += extra
+            remainder -= extra
+    elif remainder < 0:
+        # 浮点误差导致多分时，从余数最小者收回
+        candidates = sorted(
+            (index for index in range(count) if allocation[index] > lower[index]),
+            key=lambda i: (quotas[i] - allocation[i], weights[i], -i)
+        )
+        for index in candidates[:-remainder]:
+            allocation[index] -= 1
+    
+    return allocation
@@ -0,0 +1,218 @@
+"""
+任务待办池
+
+长期任务保存在本地（~/.pilot/backlog.json），每天只把优先级最高、放得进当天容量的前K个交给LLM规划，
+不必每次重新描述全部任务。
+
+优先级 = 权重 + 老化速度 × 已等待天数。展开后为 (权重 - 老化速度 × 创建日序号) + 老化速度 × 今天序号，
+后一项对所有任务相同，所以排序只取决于与日期无关的静态键，可以用bisect维护有序索引，插入删除无需重排，
+老化也不需要每天更新。临近截止的任务另有按截止日期排序的索引，选择时优先取出。
+选择只扫描两个索引的前缀，上万条任务时也在亚毫秒级。
+"""
+
+import bisect
+import json
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..models.config import BacklogConfig
+from ..models.plan import Task
+from ...utils.atomic import atomic_write
+
+
+class BacklogItem(BaseModel):
+    """待办任务"""
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex[:8])
+    title: str
+    weight: int = Field(default=5, description="任务权重（1-10）")
+    type: Literal["deep", "normal", "light"] = "normal"
+    energy: Literal["高", "中", "低", "High", "Medium", "Low"] = "中"
+    deadline: Optional[date] = None
+    remaining_min: int = Field(default=50, description="剩余预计耗时（分钟）")
+    created: date = Field(default_factory=date.today, description="加入待办池的日期，用于计算老化")
+    subtasks: List[str] = Field(default_factory=list)
+    
+    def to_task(self, est_min: Optional[int] = None) -> Task:
+        """转换为计划任务"""
+        return Task(
+            title=self.title,
+            est_min=est_min or self.remaining_min,
+            energy=self.energy,
+            type=self.type,
+            weight=self.weight,
+            subtasks=list(self.subtasks)
+        )
+
+
+class BacklogCandidate(BaseModel):
+    """交给规划器的候选任务"""
+    item: BacklogItem
+    priority: float
+    planned_min: int = Field(description="当天计划投入的分钟数（不超过剩余耗时和剩余容量）")
+    urgent: bool = Field(default=False, description="是否因临近截止而优先入选")
+
+
+class Backlog:
+    """任务待办池（带老化的有序优先队列）"""
+    
+    def __init__(self, config: Optional[BacklogConfig] = None, path: Optional[Path] = None):
+        self.config = config or BacklogConfig()
+        self.path = Path(path or self.config.path).expanduser()
+        self._items: Dict[str, BacklogItem] = {}
+        # 按静态键降序（存负值以便bisect升序维护）
+        self._by_priority: List[Tuple[float, str]] = []
+        # 有截止日期的任务按截止日升序
+        self._by_deadline: List[Tuple[int, str]] = []
+    
+    @classmethod
+    def load(cls, config: Optional[BacklogConfig] = None, path: Optional[Path] = None) -> "Backlog":
+        """从文件加载待办池，文件不存在时返回空待办池"""
+        backlog = cls(config, path)
+        if backlog.path.exists():
+            try:
+                with open(backlog.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for record in data.get('items', []):
+                    item = BacklogItem.model_validate(record)
+                    backlog._items[item.id] = item
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 待办池读取失败: {str(e)}")
+        backlog._rebuild_index()
+        return backlog
+    
+    def save(self):
+        """写回文件"""
+        data = json.dumps(
+            {'items': [item.model_dump(mode='json') for item in self._items.values()]},
+            ensure_ascii=False, indent=2
+        )
+        with atomic_write(self.path) as f:
+            f.write(data.encode('utf-8'))
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def get(self, item_id: str) -> Optional[BacklogItem]:
+        """按id获取任务"""
+        return self._items.get(item_id)
+    
+    def add(self, item: BacklogItem) -> BacklogItem:
+        """加入任务（同id的任务会被替换）"""
+        if item.id in self._items:
+            self._unindex(self._items[item.id])
+        self._items[item.id] = item
+        self._index(item)
+        return item
+    
+    def remove(self, item_id: str) -> Optional[BacklogItem]:
+        """移除任务"""
+        item = self._items.pop(item_id, None)
+        if item is not None:
+            self._unindex(item)
+        return item
+    
+    def update(self, item_id: str, **fields) -> Optional[BacklogItem]:
+        """修改任务字段"""
+        item = self._items.get(item_id)
+        if item is None:
+            return None
+        return self.add(item.model_copy(update=fields))
+    
+    def record_progress(self, item_id: str, minutes: int) -> Optional[BacklogItem]:
+        """记录投入的时间；剩余耗时归零时移出待办池并返回None"""
+        item = self._items.get(item_id)
+        if item is None:
+            return None
+        remaining = item.remaining_min - minutes
+        if remaining <= 0:
+            self.remove(item_id)
+            return None
+        return self.update(item_id, remaining_min=remaining)
+    
+    def priority(self, item: BacklogItem, today: date) -> float:
+        """任务在today的优先级"""
+        return self._static_key(item) + self.config.aging_per_day * today.toordinal()
+    
+    def ranked(self, today: Optional[date] = None) -> List[Tuple[BacklogItem, float]]:
+        """按优先级降序列出全部任务"""
+        today = today or date.today()
+        return [(self._items[item_id], self.priority(self._items[item_id], today)) for _, item_id in self._by_priority]
+    
+    def select(
+        self,
+        capacity_min: int,
+        today: Optional[date] = None,
+        limit: Optional[int] = None,
+        min_chunk_min: int = 25
+    ) -> List[BacklogCandidate]:
+        """选出当天交给规划器的前K个候选任务
+        
+        先取截止日在 deadline_horizon_days 天内（含已过期）的任务，再按老化后的优先级依次选取，
+        每个任务计入 min(剩余耗时, 剩余容量) 分钟，直到容量不足min_chunk_min或达到limit。
+        """
+        today = today or date.today()
+        limit = limit or self.config.max_candidates
+        candidates: List[BacklogCandidate] = []
+        chosen = set()
+        capacity = capacity_min
+        
+        def take(item_id: str, urgent: bool) -> bool:
+            nonlocal capacity
+            item = self._items[item_id]
+            planned = min(item.remaining_min, capacity)
+            if planned < min(min_chunk_min, item.remaining_min):
+                return False
+            candidates.append(BacklogCandidate(
+                item=item,
+                priority=self.priority(item, today),
+                planned_min=planned,
+                urgent=urgent
+            ))
+            chosen.add(item_id)
+            capacity -= planned
+            return True
+        
+        horizon = today.toordinal() + self.config.deadline_horizon_days
+        end = bisect.bisect_right(self._by_deadline, (horizon, chr(0x10FFFF)))
+        for _, item_id in self._by_deadline[:end]:
+            if len(candidates) >= limit or capacity < min_chunk_min:
+                break
+            take(item_id, urgent=True)
+        
+        for _, item_id in self._by_priority:
+            if len(candidates) >= limit or capacity < min_chunk_min:
+                break
+            if item_id not in chosen:
+                take(item_id, urgent=False)
+        
+        return candidates
+    
+    def _static_key(self, item: BacklogItem) -> float:
+        """与日期无关的排序键：权重 - 老化速度 × 创建日序号"""
+        return item.weight - self.config.aging_per_day * item.created.toordinal()
+    
+    def _index(self, item: BacklogItem):
+        bisect.insort(self._by_priority, (-self._static_key(item), item.id))
+        if item.deadline is not None:
+            bisect.insort(self._by_deadline, (item.deadline.toordinal(), item.id))
+    
+    def _unindex(self, item: BacklogItem):
+        key = (-self._static_key(item), item.id)
+        index = bisect.bisect_left(self._by_priority, key)
+        if index < len(self._by_priority) and self._by_priority[index] == key:
+            del self._by_priority[index]
+        if item.deadline is not None:
+            key = (item.deadline.toordinal(), item.id)
+            index = bisect.bisect_left(self._by_deadline, key)
+            if index < len(self._by_deadline) and self._by_deadline[index] == key:
+                del self._by_deadline[index]
+    
+    def _rebuild_index(self):
+        self._by_priority = sorted((-self._static_key(item), item.id) for item in self._items.values())
+        self._by_deadline = sorted(
+            (item.deadline.toordinal(), item.id) for item in self._items.values() if item.deadline is not None
+        )
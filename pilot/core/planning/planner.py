@@ -3,14 +3,22 @@ LLM驱动的计划生成器
 """
 
 import json
+import math
 import re
-from typing import Optional
+from typing import Optional, Dict, Any, List
 from datetime import datetime, time
 
 from ...interfaces.planner import PlannerInterface
 from ...interfaces.llm import LLMInterface
 from ..models.plan import PlanInput, PlanOutput, Task, TimeSlot, TimeBlock, PomodoroTaskMapping
 from ..models.config import PilotConfig
+from .apportion import apportion
+from .backlog import BacklogCandidate
+
+
+# 单个任务的时间范围（分钟）
+TASK_MIN_MINUTES = 25
+TASK_MAX_MINUTES = 150
 
 
 class LLMPlanner(PlannerInterface):
@@ -21,20 +29,24 @@ class LLMPlanner(PlannerInterface):
         self.llm = llm
         self.system_prompt = config.get_system_prompt()
     
-    def generate_plan(self, plan_input: PlanInput, custom_tasks: str = None) -> Optional[PlanOutput]:
-        """生成计划"""
+    def generate_plan(
+        self,
+        plan_input: PlanInput,
+        custom_tasks: str = None,
+        candidates: Optional[List[BacklogCandidate]] = None
+    ) -> Optional[PlanOutput]:
+        """生成计划
+        
+        candidates为待办池选出的候选任务，与custom_tasks一起交给LLM安排。
+        """
         if not self.validate_input(plan_input):
             return None
         
         try:
-            user_prompt = self._build_user_prompt(plan_input, custom_tasks)
+            user_prompt = self._build_user_prompt(plan_input, custom_tasks, candidates)
             
             # 计算可用时间
-            work_start = datetime.combine(plan_input.date, plan_input.work_window_start)
-            work_end = datetime.combine(plan_input.date, plan_input.work_window_end)
-            total_minutes = int((work_end - work_start).total_seconds() / 60)
-            meeting_minutes = sum(meeting.duration_minutes() for meeting in plan_input.meetings)
-            available_minutes = total_minutes - meeting_minutes
+            available_minutes = self._calculate_available_minutes(plan_input)
             
             # 调用LLM API
             messages = [
@@ -59,7 +71,7 @@ class LLMPlanner(PlannerInterface):
             
             if plan_data:
                 # 后处理：确保任务时间分配符合权重比例
-                plan_data = self._adjust_task_time_by_weight(plan_data, available_minutes)
+                plan_data = self._adjust_task_time_by_weight(plan_data, available_minutes, plan_input.mode)
                 return self._convert_to_plan_output(plan_data)
             else:
                 print(f"❌ JSON解析失败，原始响应：\n{response}")
@@ -69,6 +81,54 @@ class LLMPlanner(PlannerInterface):
             print(f"❌ 计划生成失败: {str(e)}")
             return None
     
+    def revise_plan(
+        self,
+        plan_input: PlanInput,
+        previous_plan: PlanOutput,
+        instruction: str,
+        context: Optional[str] = None
+    ) -> Optional[PlanOutput]:
+        """基于会话状态增量修改已有计划
+        
+        只向LLM发送紧凑的会话状态和修改要求，LLM返回增量修改，
+        在本地合并到上一版计划中，避免整份计划重新生成。
+        """
+        if not self.validate_input(plan_input):
+            return None
+        
+        try:
+            user_prompt = f"会话状态: {context or '{}'}\n\n修改要求: {instruction}"
+            messages = [
+                {"role": "system", "content": self._get_revision_prompt()},
+                {"role": "user", "content": user_prompt}
+            ]
+            
+            response = self.llm.chat_completion(
+                messages=messages,
+                model=self.config.openai.effective_model,
+                max_tokens=min(800, self.config.openai.effective_max_tokens),
+                temperature=self.config.openai.effective_temperature,
+                response_format={"type": "json_object"}
+            )
+            
+            if not response:
+                print("❌ LLM调用失败")
+                return None
+            
+            delta = self._parse_json_response(response)
+            if delta is None:
+                print(f"❌ JSON解析失败，原始响应：\n{response}")
+                return None
+            
+            plan_data = self._apply_plan_delta(
+                previous_plan, delta, self._calculate_available_minutes(plan_input), plan_input.mode
+            )
+            return self._convert_to_plan_output(plan_data)
+        
+        except Exception as e:
+            print(f"❌ 计划修改失败: {str(e)}")
+            return None
+    
     def validate_input(self, plan_input: PlanInput) -> bool:
         """验证输入参数"""
         if plan_input.work_window_start >= plan_input.work_window_end:
@@ -83,7 +143,103 @@ class LLMPlanner(PlannerInterface):
         
         return True
     
-    def _build_user_prompt(self, plan_input: PlanInput, custom_tasks: str = None) -> str:
+    def _calculate_available_minutes(self, plan_input: PlanInput) -> int:
+        """计算去除会议后的可用时间（分钟）"""
+        work_start = datetime.combine(plan_input.date, plan_input.work_window_start)
+        work_end = datetime.combine(plan_input.date, plan_input.work_window_end)
+        total_minutes = int((work_end - work_start).total_seconds() / 60)
+        meeting_minutes = sum(meeting.duration_minutes() for meeting in plan_input.meetings)
+        return total_minutes - meeting_minutes
+    
+    def _get_revision_prompt(self) -> str:
+        """获取增量修改提示词"""
+        return """You revise an existing daily plan for P.I.L.O.T. The user message contains the current plan state (compact JSON) and an edit request.
+Return ONLY the changes as strict JSON, never the whole plan:
+
+{
+  "update_tasks": [{"title": "existing_task_title", "scheduled_start": "HH:MM", "scheduled_end": "HH:MM", "weight": 1_to_10}],
+  "add_tasks": [{"title": "task_title", "energy": "High|Medium|Low", "type": "deep|normal|light", "weight": 1_to_10, "scheduled_start": "HH:MM", "scheduled_end": "HH:MM", "subtasks": []}],
+  "remove_tasks": ["task_title"],
+  "order": ["task_title_in_new_order"],
+  "risks": ["risk"]
+}
+
+Omit keys that do not change. Keep task titles exactly as in the state. Respect meetings and the 12:00-14:00 lunch break."""
+    
+    def _apply_plan_delta(
+        self,
+        previous_plan: PlanOutput,
+        delta: Dict[str, Any],
+        available_minutes: int,
+        mode: str = "work"
+    ) -> dict:
+        """将LLM返回的增量修改合并到上一版计划"""
+        plan_data = previous_plan.model_dump(mode='json')
+        tasks = plan_data.get('top_tasks', [])
+        tasks_by_title = {task['title']: task for task in tasks}
+        structure_changed = False
+        retimed = set()
+        
+        for update in delta.get('update_tasks', []):
+            task = tasks_by_title.get(update.get('title'))
+            if task is None:
+                continue
+            for key in ('scheduled_start', 'scheduled_end', 'weight', 'est_min', 'energy', 'type', 'subtasks'):
+                if key in update and update[key] is not None:
+                    if key == 'weight' and update[key] != task.get('weight'):
+                        structure_changed = True
+                    if key in ('scheduled_start', 'scheduled_end'):
+                        retimed.add(task['title'])
+                    task[key] = update[key]
+        
+        removed = set(delta.get('remove_tasks', []))
+        if removed:
+            tasks = [task for task in tasks if task['title'] not in removed]
+            structure_changed = True
+        
+        for new_task in delta.get('add_tasks', []):
+            if new_task.get('title') and new_task['title'] not in tasks_by_title:
+                new_task.setdefault('est_min', 50)
+                new_task.setdefault('energy', '中')
+                tasks.append(new_task)
+                retimed.add(new_task['title'])
+                structure_changed = True
+        
+        order = delta.get('order')
+        if order:
+            position = {title: index for index, title in enumerate(order)}
+            tasks.sort(key=lambda task: position.get(task['title'], len(position)))
+            structure_changed = True
+        
+        plan_data['top_tasks'] = tasks
+        if 'risks' in delta:
+            plan_data['risks'] = delta['risks']
+        
+        # 更新时间块：时间变化或被删除的任务，用任务自身时间替换对应时间块
+        stale_titles = retimed | removed
+        blocks = [
+            block for block in plan_data.get('time_blocks', [])
+            if not any(title in block['label'] for title in stale_titles)
+        ]
+        for task in tasks:
+            if task['title'] in retimed and task.get('scheduled_start') and task.get('scheduled_end'):
+                blocks.append({'start': task['scheduled_start'], 'end': task['scheduled_end'], 'label': task['title']})
+        blocks.sort(key=lambda block: time.fromisoformat(block['start']))
+        plan_data['time_blocks'] = blocks
+        
+        if structure_changed:
+            # 任务集合或权重变化后，旧的番茄钟映射失效，交由调度器重新分配
+            plan_data['pomodoro_task_mapping'] = []
+            plan_data = self._adjust_task_time_by_weight(plan_data, available_minutes, mode)
+        
+        return plan_data
+    
+    def _build_user_prompt(
+        self,
+        plan_input: PlanInput,
+        custom_tasks: str = None,
+        candidates: Optional[List[BacklogCandidate]] = None
+    ) -> str:
         """构建用户提示词"""
         # 计算可用容量
         work_start = datetime.combine(plan_input.date, plan_input.work_window_start)
@@ -104,6 +260,16 @@ class LLMPlanner(PlannerInterface):
         tasks_text = ""
         if custom_tasks:
             tasks_text = f"今日具体任务:\n{custom_tasks}\n\n"
+        if candidates:
+            lines = []
+            for candidate in candidates:
+                item = candidate.item
+                deadline = f"，截止{item.deadline.isoformat()}" if item.deadline else ""
+                lines.append(
+                    f"- {item.title}（权重{item.weight}，{item.type}，精力{item.energy}，"
+                    f"剩余{item.remaining_min}分钟，今日建议{candidate.planned_min}分钟{deadline}）"
+                )
+            tasks_text += "待办池候选任务（已按优先级排序，按需选用，可与上面的任务合并安排）:\n" + "\n".join(lines) + "\n\n"
         
         prompt = f"""请为以下工作日生成时间规划：
 
@@ -223,8 +389,12 @@ class LLMPlanner(PlannerInterface):
             risks=plan_data.get('risks', [])
         )
     
-    def _adjust_task_time_by_weight(self, plan_data: dict, available_minutes: int) -> dict:
-        """根据权重调整任务时间分配"""
+    def _adjust_task_time_by_weight(self, plan_data: dict, available_minutes: int, mode: str = "work") -> dict:
+        """根据权重调整任务时间分配
+        
+        以当前模式的专注时长为单位分摊；容量不足以给每个任务至少一个单位时，
+        权重最低的任务分不到时间，从计划中移除并记入风险。
+        """
         tasks = plan_data.get('top_tasks', [])
         if not tasks:
             return plan_data
@@ -250,14 +420,32 @@ class LLMPlanner(PlannerInterface):
         # 预留一些缓冲时间(10%)用于任务间隙和意外情况
         effective_work_time = int(available_minutes * 0.9)
         
-        # 根据权重比例分配时间
-        for task in tasks:
-            weight_ratio = task['weight'] / total_weight
-            allocated_time = int(effective_work_time * weight_ratio)
-            
-            # 确保任务时间至少25分钟，最多150分钟
-            allocated_time = max(25, min(150, allocated_time))
-            task['est_min'] = allocated_time
+        # 以整轮专注为单位按权重分摊，任务时间保持在25-150分钟对应的轮数内且总数守恒
+        focus_min = self.config.pomodoro.work_focus_min if mode == 'work' else self.config.pomodoro.study_focus_min
+        min_units = max(1, math.ceil(TASK_MIN_MINUTES / focus_min))
+        max_units = max(min_units, TASK_MAX_MINUTES // focus_min)
+        units = apportion(
+            [task['weight'] for task in tasks],
+            effective_work_time // focus_min,
+            min_units,
+            max_units
+        )
+        for task, task_units in zip(tasks, units):
+            task['est_min'] = task_units * focus_min
+        
+        dropped = [task['title'] for task in tasks if task['est_min'] <= 0]
+        if dropped:
+            print(f"⚠️ 可用时间不足，以下任务未安排: {', '.join(dropped)}")
+            tasks = [task for task in tasks if task['est_min'] > 0]
+            plan_data['pomodoro_task_mapping'] = [
+                mapping for mapping in plan_data.get('pomodoro_task_mapping', [])
+                if mapping.get('task_title') not in dropped
+            ]
+            plan_data['time_blocks'] = [
+                block for block in plan_data.get('time_blocks', [])
+                if not any(title in block.get('label', '') for title in dropped)
+            ]
+            plan_data['risks'] = list(plan_data.get('risks', [])) + [f"可用时间不足，未安排: {', '.join(dropped)}"]
         
         # 重新计算时间块，确保时间分配一致
         plan_data['top_tasks'] = tasks
@@ -0,0 +1,104 @@
+"""
+增量重新规划
+
+会议、工作窗口或轮数变化时，复用上一版计划中LLM给出的任务语义
+（标题、权重、子任务），只在本地重新分配时间并重新调度番茄钟。
+"""
+
+import time as timer
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from ..models.plan import PlanInput, PlanOutput
+from ..models.schedule import ScheduleItem
+from ..scheduling.scheduler import PomodoroScheduler
+from ..scheduling.diff import ScheduleDiff, diff_schedules
+from .planner import LLMPlanner
+
+
+class TaskTimeChange(BaseModel):
+    """任务时间分配变化"""
+    title: str
+    before_min: int
+    after_min: int
+
+
+class ReplanResult(BaseModel):
+    """增量重新规划结果"""
+    plan: PlanOutput
+    schedule: List[ScheduleItem] = Field(default_factory=list)
+    schedule_diff: ScheduleDiff = Field(default_factory=ScheduleDiff)
+    task_changes: List[TaskTimeChange] = Field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+
+class IncrementalReplanner:
+    """增量重新规划器（不调用LLM）"""
+    
+    def __init__(self, planner: LLMPlanner, scheduler: PomodoroScheduler):
+        self.planner = planner
+        self.scheduler = scheduler
+    
+    def replan(
+        self,
+        previous_plan: PlanOutput,
+        plan_input: PlanInput,
+        previous_schedule: Optional[List[ScheduleItem]] = None,
+        previous_input: Optional[PlanInput] = None
+    ) -> Optional[ReplanResult]:
+        """基于上一版计划和变化后的计划输入重新规划
+        
+        Args:
+            previous_plan: 上一版计划
+            plan_input: 变化后的计划输入（会议、工作窗口、轮数）
+            previous_schedule: 上一版番茄钟时间表，缺省时按previous_input重新计算
+            previous_input: 上一版计划输入，未提供previous_schedule时必填（否则抛出ValueError）
+        """
+        if previous_schedule is None and previous_input is None:
+            # 用新输入重算的"上一版"时间表已经包含了变化，差异会被掩盖
+            raise ValueError("未提供上一版时间表时必须提供上一版计划输入(previous_input)")
+        if not self.planner.validate_input(plan_input):
+            return None
+        
+        start = timer.perf_counter()
+        
+        if previous_schedule is None:
+            previous_schedule = self.scheduler.schedule_pomodoros(previous_input.date, previous_plan, previous_input)
+        
+        plan_data = previous_plan.model_dump(mode='json')
+        available_minutes = self.planner._calculate_available_minutes(plan_input)
+        plan_data['capacity_min'] = available_minutes
+        plan_data['meetings'] = [meeting.model_dump(mode='json') for meeting in plan_input.meetings]
+        
+        # 与新会议冲突的时间块不再有效
+        plan_data['time_blocks'] = [
+            block for block in plan_data.get('time_blocks', [])
+            if not any(
+                block['start'] < meeting['end'] and meeting['start'] < block['end']
+                for meeting in plan_data['meetings']
+            )
+        ]
+        
+        # 轮数变化时旧映射无法一一对应，交给调度器按任务语义重新分配
+        if len(plan_data.get('pomodoro_task_mapping', [])) != plan_input.cycles:
+            plan_data['pomodoro_task_mapping'] = []
+        
+        plan_data = self.planner._adjust_task_time_by_weight(plan_data, available_minutes, plan_input.mode)
+        plan = self.planner._convert_to_plan_output(plan_data)
+        schedule = self.scheduler.schedule_pomodoros(plan_input.date, plan, plan_input)
+        
+        previous_minutes = {task.title: task.est_min for task in previous_plan.top_tasks}
+        task_changes = [
+            TaskTimeChange(title=task.title, before_min=previous_minutes[task.title], after_min=task.est_min)
+            for task in plan.top_tasks
+            if task.title in previous_minutes and previous_minutes[task.title] != task.est_min
+        ]
+        
+        return ReplanResult(
+            plan=plan,
+            schedule=schedule,
+            schedule_diff=diff_schedules(previous_schedule, schedule),
+            task_changes=task_changes,
+            elapsed_ms=round((timer.perf_counter() - start) * 1000, 2)
+        )
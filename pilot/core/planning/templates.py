@@ -0,0 +1,379 @@
+"""
+计划模板库
+
+把一次生成的计划（任务角色、时间块、番茄钟映射）参数化保存为模板，
+之后按星期与会议模式匹配，在本地为新日期和任务列表实例化，无需调用LLM。
+"""
+
+import json
+import re
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..models.plan import PlanInput, PlanOutput, Task, TimeSlot, TimeBlock, PomodoroTaskMapping
+
+
+_NAME_PATTERN = re.compile(r'^[\w\-]+$')
+
+
+def is_valid_template_name(name: str) -> bool:
+    """模板名称是否合法（只能包含字母、数字、下划线和连字符）"""
+    return bool(name) and bool(_NAME_PATTERN.match(name))
+
+
+class TemplateTaskRole(BaseModel):
+    """任务角色（按计划中的任务顺序）"""
+    index: int
+    type: str = "normal"
+    energy: str = "中"
+    weight: int = 5
+    est_min: int = 50
+    scheduled_start: Optional[time] = None
+    scheduled_end: Optional[time] = None
+
+
+class TemplateSlot(BaseModel):
+    """时间块槽位，role为空表示与任务无关的固定时间块"""
+    start: time
+    end: time
+    role: Optional[int] = None
+    label: str = ""
+
+
+class TemplateMapping(BaseModel):
+    """番茄钟到任务角色的映射"""
+    pomodoro_number: int
+    role: Optional[int] = None
+    part: int = 1
+    label: str = ""
+
+
+class PlanTemplate(BaseModel):
+    """计划模板"""
+    name: str
+    weekdays: List[int] = Field(default_factory=list, description="适用的星期（0=周一）")
+    work_window_start: time
+    work_window_end: time
+    meetings: List[TimeSlot] = Field(default_factory=list)
+    mode: str = "work"
+    cycles: int = 4
+    roles: List[TemplateTaskRole] = Field(default_factory=list)
+    slots: List[TemplateSlot] = Field(default_factory=list)
+    mapping: List[TemplateMapping] = Field(default_factory=list)
+    risks: List[str] = Field(default_factory=list)
+    created_at: str = ""
+    
+    @classmethod
+    def capture(
+        cls,
+        name: str,
+        plan_input: PlanInput,
+        plan_output: PlanOutput,
+        weekdays: Optional[List[int]] = None
+    ) -> "PlanTemplate":
+        """从计划输入输出捕获模板"""
+        titles = [task.title for task in plan_output.top_tasks]
+        
+        roles = [
+            TemplateTaskRole(
+                index=index,
+                type=task.type,
+                energy=task.energy,
+                weight=task.weight,
+                est_min=task.est_min,
+                scheduled_start=task.scheduled_start,
+                scheduled_end=task.scheduled_end
+            )
+            for index, task in enumerate(plan_output.top_tasks)
+        ]
+        
+        slots = []
+        for block in plan_output.time_blocks:
+            role = _find_role(block.label, titles)
+            slots.append(TemplateSlot(
+                start=block.start,
+                end=block.end,
+                role=role,
+                label="" if role is not None else block.label
+            ))
+        
+        mapping = []
+        parts = {}
+        for item in plan_output.pomodoro_task_mapping:
+            role = _find_role(item.task_title, titles)
+            if role is not None:
+                parts[role] = parts.get(role, 0) + 1
+            mapping.append(TemplateMapping(
+                pomodoro_number=item.pomodoro_number,
+                role=role,
+                part=parts.get(role, 1),
+                label="" if role is not None else item.task_title
+            ))
+        
+        return cls(
+            name=name,
+            weekdays=weekdays if weekdays is not None else [plan_input.date.weekday()],
+            work_window_start=plan_input.work_window_start,
+            work_window_end=plan_input.work_window_end,
+            meetings=plan_input.meetings,
+            mode=plan_input.mode,
+            cycles=plan_input.cycles,
+            roles=roles,
+            slots=slots,
+            mapping=mapping,
+            risks=plan_output.risks,
+            created_at=datetime.now().isoformat(timespec='seconds')
+        )
+    
+    def match_score(self, plan_input: PlanInput, tolerance_min: int = 15) -> float:
+        """计算模板与计划输入的匹配度（0表示不匹配）"""
+        if self.weekdays and plan_input.date.weekday() not in self.weekdays:
+            return 0.0
+        if self.mode != plan_input.mode:
+            return 0.0
+        if len(self.meetings) != len(plan_input.meetings):
+            return 0.0
+        
+        def minutes(value: time) -> int:
+            return value.hour * 60 + value.minute
+        
+        # 会议按开始时间配对，每一对都必须在容差范围内
+        ours = sorted(self.meetings, key=lambda m: m.start)
+        theirs = sorted(plan_input.meetings, key=lambda m: m.start)
+        drift = 0
+        for a, b in zip(ours, theirs):
+            start_diff = abs(minutes(a.start) - minutes(b.start))
+            end_diff = abs(minutes(a.end) - minutes(b.end))
+            if start_diff > tolerance_min or end_diff > tolerance_min:
+                return 0.0
+            drift += start_diff + end_diff
+        
+        window_drift = abs(minutes(self.work_window_start) - minutes(plan_input.work_window_start)) + \
+            abs(minutes(self.work_window_end) - minutes(plan_input.work_window_end))
+        if window_drift > 2 * tolerance_min:
+            return 0.0
+        
+        max_drift = max(1, 2 * tolerance_min * (len(ours) + 1))
+        return 1.0 - (drift + window_drift) / max_drift
+    
+    def instantiate(self, task_titles: List[str], plan_input: Optional[PlanInput] = None) -> PlanOutput:
+        """用新的任务列表实例化模板，给出计划输入时沿用其实际会议
+        
+        实际会议在容差内偏移时，与模板会议重叠的固定时间块随会议平移，
+        任务时间块裁掉与平移后会议重叠的部分。
+        """
+        titles = list(task_titles)
+        role_titles = {role.index: titles[role.index] for role in self.roles if role.index < len(titles)}
+        
+        tasks = []
+        for role in self.roles:
+            if role.index not in role_titles:
+                continue
+            tasks.append(Task(
+                title=role_titles[role.index],
+                est_min=role.est_min,
+                energy=role.energy,
+                scheduled_start=role.scheduled_start,
+                scheduled_end=role.scheduled_end,
+                type=role.type,
+                weight=role.weight
+            ))
+        # 任务数多于模板角色时，多出的任务按默认角色追加
+        for title in titles[len(self.roles):]:
+            tasks.append(Task(title=title, est_min=50, energy="中"))
+        
+        meeting_pairs = self._meeting_pairs(plan_input)
+        fixed_blocks = []
+        for slot in self.slots:
+            if slot.role is None:
+                start, end = _shift_slot(slot.start, slot.end, meeting_pairs)
+                fixed_blocks.append(TimeBlock(start=start, end=end, label=slot.label))
+        moved = [(pair[1].start, pair[1].end) for pair in meeting_pairs if pair[0].start != pair[1].start]
+        
+        time_blocks = []
+        for slot in self.slots:
+            if slot.role is None:
+                time_blocks.append(fixed_blocks.pop(0))
+            elif slot.role in role_titles:
+                start, end = _clip_slot(slot.start, slot.end, moved)
+                if start < end:
+                    time_blocks.append(TimeBlock(start=start, end=end, label=role_titles[slot.role]))
+        
+        mappings = []
+        for item in self.mapping:
+            if item.role is None:
+                title = item.label
+                subtask = item.label
+            elif item.role in role_titles:
+                title = role_titles[item.role]
+                subtask = f"{title} - 第{item.part}部分"
+            else:
+                continue
+            mappings.append(PomodoroTaskMapping(
+                pomodoro_number=item.pomodoro_number,
+                task_title=title,
+                subtask=subtask,
+                focus_content=f"专注完成{subtask}"
+            ))
+        
+        meetings = plan_input.meetings if plan_input else self.meetings
+        return PlanOutput(
+            capacity_min=self._capacity_minutes(plan_input),
+            meetings=meetings,
+            top_tasks=tasks,
+            time_blocks=time_blocks,
+            pomodoro_task_mapping=mappings,
+            risks=self.risks
+        )
+    
+    def _meeting_pairs(self, plan_input: Optional[PlanInput]) -> List[Tuple[TimeSlot, TimeSlot]]:
+        """按开始时间把模板会议与实际会议配对（数量不同时不配对）"""
+        if not plan_input or len(plan_input.meetings) != len(self.meetings):
+            return []
+        return list(zip(
+            sorted(self.meetings, key=lambda m: m.start),
+            sorted(plan_input.meetings, key=lambda m: m.start)
+        ))
+    
+    def _capacity_minutes(self, plan_input: Optional[PlanInput] = None) -> int:
+        """工作窗口去除会议后的可用时间"""
+        if plan_input:
+            window = TimeSlot(start=plan_input.work_window_start, end=plan_input.work_window_end)
+            meetings = plan_input.meetings
+        else:
+            window = TimeSlot(start=self.work_window_start, end=self.work_window_end)
+            meetings = self.meetings
+        return window.duration_minutes() - sum(meeting.duration_minutes() for meeting in meetings)
+
+
+def _shift_time(value: time, minutes: int) -> time:
+    """把时刻平移若干分钟（限制在当天内）"""
+    shifted = datetime.combine(date.min, value) + timedelta(minutes=minutes)
+    if shifted.date() != date.min:
+        return time.max.replace(microsecond=0) if minutes > 0 else time.min
+    return shifted.time()
+
+
+def _minutes_between(a: time, b: time) -> int:
+    """b - a（分钟）"""
+    return (b.hour * 60 + b.minute) - (a.hour * 60 + a.minute)
+
+
+def _shift_slot(start: time, end: time, meeting_pairs: List[Tuple[TimeSlot, TimeSlot]]) -> Tuple[time, time]:
+    """固定时间块与模板会议重叠时，随配对的实际会议平移（与会议完全一致时直接取实际会议时间）"""
+    for ours, theirs in meeting_pairs:
+        if start == ours.start and end == ours.end:
+            return theirs.start, theirs.end
+        if start < ours.end and ours.start < end:
+            offset = _minutes_between(ours.start, theirs.start)
+            return _shift_time(start, offset), _shift_time(end, offset)
+    return start, end
+
+
+def _clip_slot(start: time, end: time, meetings: List[Tuple[time, time]]) -> Tuple[time, time]:
+    """裁掉任务时间块与会议重叠的部分（保留会议前或会议后较长的一段）"""
+    for meeting_start, meeting_end in meetings:
+        if start < meeting_end and meeting_start < end:
+            if _minutes_between(start, meeting_start) >= _minutes_between(meeting_end, end):
+                end = meeting_start
+            else:
+                start = meeting_end
+    return start, end
+
+
+def _find_role(label: str, titles: List[str]) -> Optional[int]:
+    """根据标签中包含的任务标题找到任务角色（优先匹配最长标题）"""
+    best = None
+    for index, title in enumerate(titles):
+        if title and title in label and (best is None or len(title) > len(titles[best])):
+            best = index
+    return best
+
+
+class TemplateLibrary:
+    """模板库（每个模板一个JSON文件）"""
+    
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory or Path.home() / ".pilot" / "templates").expanduser()
+    
+    def list_templates(self) -> List[PlanTemplate]:
+        """列出全部模板"""
+        if not self.directory.exists():
+            return []
+        
+        templates = []
+        for path in sorted(self.directory.glob('*.json')):
+            template = self._load(path)
+            if template:
+                templates.append(template)
+        return templates
+    
+    def get(self, name: str) -> Optional[PlanTemplate]:
+        """获取指定模板"""
+        return self._load(self._path(name))
+    
+    def save(self, template: PlanTemplate) -> Path:
+        """保存模板"""
+        path = self._path(template.name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(template.model_dump(mode='json'), f, indent=2, ensure_ascii=False)
+        return path
+    
+    def delete(self, name: str) -> bool:
+        """删除模板"""
+        path = self._path(name)
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
+    
+    def match(self, plan_input: PlanInput, tolerance_min: int = 15) -> Optional[Tuple[PlanTemplate, float]]:
+        """找到与计划输入最匹配的模板"""
+        best = None
+        for template in self.list_templates():
+            score = template.match_score(plan_input, tolerance_min)
+            if score > 0 and (best is None or score > best[1]):
+                best = (template, score)
+        return best
+    
+    def _path(self, name: str) -> Path:
+        """模板文件路径"""
+        if not is_valid_template_name(name):
+            raise ValueError(f"模板名称只能包含字母、数字、下划线和连字符: {name}")
+        return self.directory / f"{name}.json"
+    
+    def _load(self, path: Path) -> Optional[PlanTemplate]:
+        """加载模板文件"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return PlanTemplate.model_validate(json.load(f))
+        except (ValueError, json.JSONDecodeError) as e:
+            print(f"⚠️ 模板加载失败 {path.name}: {str(e)}")
+            return None
+
+
+def save_last_plan(plan_input: PlanInput, plan_output: PlanOutput, path: Optional[Path] = None):
+    """保存最近一次生成的计划，供模板捕获使用"""
+    path = Path(path or Path.home() / ".pilot" / "last_plan.json").expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'plan_input': plan_input.model_dump(mode='json'),
+            'plan_output': plan_output.model_dump(mode='json'),
+        }, f, ensure_ascii=False)
+
+
+def load_last_plan(path: Optional[Path] = None) -> Optional[Tuple[PlanInput, PlanOutput]]:
+    """读取最近一次生成的计划"""
+    path = Path(path or Path.home() / ".pilot" / "last_plan.json").expanduser()
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return PlanInput.model_validate(data['plan_input']), PlanOutput.model_validate(data['plan_output'])
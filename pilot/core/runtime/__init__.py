@@ -0,0 +1,16 @@
+"""
+番茄钟执行模块
+
+按日程实时推进专注与休息，记录实际开始和结束时间。
+"""
+
+from .timer_wheel import TimerWheel, TimerHandle
+from .session import PomodoroSession, PomodoroRuntime, SlotRecord
+
+__all__ = [
+    'TimerWheel',
+    'TimerHandle',
+    'PomodoroSession',
+    'PomodoroRuntime',
+    'SlotRecord',
+]
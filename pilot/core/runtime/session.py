@@ -0,0 +1,283 @@
+"""
+番茄钟实时执行
+
+按日程在真实时间中推进专注、休息等条目：每个条目的开始和结束登记为时间轮上的定时器，
+到点时记录实际开始/结束时间并通知调用方。多个用户的会话共用一个时间轮和一个驱动协程，
+空闲时不占用CPU。专注超时、跳过或插入事项时调用增量重排，只替换受影响条目的定时器。
+"""
+
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, Optional
+
+import pytz
+from pydantic import BaseModel
+
+from ..models.config import PilotConfig
+from ..models.plan import PlanInput
+from ..models.schedule import ScheduleItem, PomodoroType
+from ..scheduling.diff import item_key
+from ..scheduling.reschedule import Rescheduler, RescheduleResult, ScheduleChange
+from .timer_wheel import TimerHandle, TimerWheel
+
+
+class SlotRecord(BaseModel):
+    """单个条目的执行记录"""
+    slot_id: str
+    title: str
+    type: PomodoroType
+    planned_start: datetime
+    planned_end: datetime
+    actual_start: Optional[datetime] = None
+    actual_end: Optional[datetime] = None
+    status: Literal["pending", "running", "done", "missed", "skipped", "interrupted"] = "pending"
+
+
+# 条目状态变化回调：(会话, 记录, 事件)，事件为 start / end
+TransitionCallback = Callable[["PomodoroSession", SlotRecord, str], None]
+
+
+class PomodoroSession:
+    """单个用户一天的番茄钟执行会话"""
+    
+    def __init__(
+        self,
+        session_id: str,
+        target_date: date,
+        schedule: List[ScheduleItem],
+        wheel: TimerWheel,
+        timezone: str = "Asia/Shanghai",
+        on_transition: Optional[TransitionCallback] = None,
+        rescheduler: Optional[Rescheduler] = None,
+        plan_input: Optional[PlanInput] = None
+    ):
+        self.session_id = session_id
+        self.target_date = target_date
+        self.schedule = list(schedule)
+        self.wheel = wheel
+        self.timezone = pytz.timezone(timezone)
+        self.on_transition = on_transition
+        self.rescheduler = rescheduler
+        self.plan_input = plan_input
+        self.records: Dict[str, SlotRecord] = {}
+        self._timers: Dict[str, List[TimerHandle]] = {}
+        self._done = asyncio.Event()
+    
+    @property
+    def finished(self) -> bool:
+        """所有条目是否都已结束"""
+        return self._done.is_set()
+    
+    def now(self) -> datetime:
+        """会话时区的当前时间（取自时间轮的时钟）"""
+        return datetime.fromtimestamp(self.wheel.clock(), tz=self.timezone)
+    
+    def start(self):
+        """为所有条目登记定时器；已结束的条目记为错过，进行中的条目立即开始"""
+        self._load(self.schedule)
+        self._check_done()
+    
+    def stop(self):
+        """停止会话：取消全部定时器，进行中的条目记为中断"""
+        for handles in self._timers.values():
+            for handle in handles:
+                handle.cancel()
+        self._timers.clear()
+        now = self.now()
+        for record in self.records.values():
+            if record.status == "running":
+                record.actual_end = now
+                record.status = "interrupted"
+        self._done.set()
+    
+    async def wait(self):
+        """等待会话结束"""
+        await self._done.wait()
+    
+    def apply_change(self, change: ScheduleChange) -> RescheduleResult:
+        """专注超时、跳过或插入事项：增量重排当前时刻之后的日程并替换受影响的定时器"""
+        if self.rescheduler is None:
+            raise ValueError("会话未配置重排器")
+        
+        now = self.now()
+        plan_input = self.plan_input
+        result = self.rescheduler.apply(
+            self.schedule,
+            now.time().replace(second=0, microsecond=0),
+            change,
+            mode=plan_input.mode if plan_input is not None else 'work',
+            window_end=plan_input.work_window_end if plan_input is not None else None,
+            meetings=plan_input.meetings if plan_input is not None else None
+        )
+        
+        if change.kind == "skip" and change.slot_id:
+            skipped = [change.slot_id]
+            if change.slot_id.startswith("focus-"):
+                skipped.append("break-" + change.slot_id[len("focus-"):])
+            for key in skipped:
+                record = self.records.get(key)
+                if record is not None and record.status in ("pending", "running"):
+                    self._cancel(key)
+                    record.actual_end = now if record.status == "running" else None
+                    record.status = "skipped"
+        
+        # 新增、变更的条目重新登记，删除的条目取消定时器
+        for item in result.diff.removed + result.dropped:
+            key = item_key(item)
+            record = self.records.get(key)
+            if record is not None and record.status == "pending":
+                self._cancel(key)
+                record.status = "skipped"
+        self.schedule = result.schedule
+        self._load(result.diff.added + [change_item.after for change_item in result.diff.changed])
+        self._check_done()
+        return result
+    
+    def _load(self, items: List[ScheduleItem]):
+        """为条目建立记录并登记开始/结束定时器"""
+        now = self.wheel.clock()
+        for item in items:
+            key = item_key(item)
+            start, end = self._to_datetimes(item)
+            record = self.records.get(key)
+            if record is None:
+                record = SlotRecord(slot_id=key, title=item.title, type=item.type, planned_start=start, planned_end=end)
+                self.records[key] = record
+            elif record.status in ("done", "missed", "skipped", "interrupted"):
+                continue
+            else:
+                record.title = item.title
+                record.planned_start, record.planned_end = start, end
+            
+            self._cancel(key)
+            end_ts = end.timestamp()
+            if record.status == "pending" and end_ts <= now:
+                record.status = "missed"
+                continue
+            handles = []
+            if record.status == "pending":
+                handles.append(self.wheel.call_at(start.timestamp(), self._begin, key))
+            handles.append(self.wheel.call_at(end_ts, self._finish, key))
+            self._timers[key] = handles
+    
+    def _to_datetimes(self, item: ScheduleItem):
+        """条目的计划起止时间（跨午夜的结束时间顺延一天）"""
+        start = self.timezone.localize(datetime.combine(self.target_date, item.start_time))
+        end_day = self.target_date + timedelta(days=1) if item.end_time < item.start_time else self.target_date
+        end = self.timezone.localize(datetime.combine(end_day, item.end_time))
+        return start, end
+    
+    def _cancel(self, key: str):
+        for handle in self._timers.pop(key, []):
+            handle.cancel()
+    
+    def _begin(self, key: str):
+        record = self.records[key]
+        if record.status != "pending":
+            return
+        record.status = "running"
+        record.actual_start = self.now()
+        self._notify(record, "start")
+    
+    def _finish(self, key: str):
+        record = self.records[key]
+        if record.status != "running":
+            return
+        record.status = "done"
+        record.actual_end = self.now()
+        self._timers.pop(key, None)
+        self._notify(record, "end")
+        self._check_done()
+    
+    def _notify(self, record: SlotRecord, event: str):
+        if self.on_transition is not None:
+            self.on_transition(self, record, event)
+    
+    def _check_done(self):
+        if all(record.status not in ("pending", "running") for record in self.records.values()):
+            self._done.set()
+    
+    def to_log(self) -> dict:
+        """执行记录（可序列化为JSON）"""
+        return {
+            'session_id': self.session_id,
+            'date': self.target_date.isoformat(),
+            'records': [
+                record.model_dump(mode='json')
+                for record in sorted(self.records.values(), key=lambda record: record.planned_start)
+            ],
+        }
+
+
+class PomodoroRuntime:
+    """番茄钟执行引擎：多个会话共用一个时间轮"""
+    
+    def __init__(self, config: PilotConfig, clock: Callable[[], float] = time.time):
+        self.config = config
+        self.wheel = TimerWheel(
+            tick_seconds=config.runtime.tick_seconds,
+            clock=clock,
+            max_sleep_seconds=config.runtime.max_sleep_seconds
+        )
+        self.rescheduler = Rescheduler(config)
+        self.sessions: Dict[str, PomodoroSession] = {}
+    
+    def add_session(
+        self,
+        session_id: str,
+        target_date: date,
+        schedule: List[ScheduleItem],
+        on_transition: Optional[TransitionCallback] = None,
+        plan_input: Optional[PlanInput] = None
+    ) -> PomodoroSession:
+        """添加并启动一个会话（同一session_id的旧会话会先停止）"""
+        self.remove_session(session_id)
+        session = PomodoroSession(
+            session_id,
+            target_date,
+            schedule,
+            self.wheel,
+            timezone=self.config.timezone,
+            on_transition=on_transition,
+            rescheduler=self.rescheduler,
+            plan_input=plan_input
+        )
+        self.sessions[session_id] = session
+        session.start()
+        return session
+    
+    def remove_session(self, session_id: str) -> Optional[PomodoroSession]:
+        """停止并移除会话"""
+        session = self.sessions.pop(session_id, None)
+        if session is not None and not session.finished:
+            session.stop()
+        return session
+    
+    async def run(self):
+        """运行时间轮，直到调用close"""
+        await self.wheel.run()
+    
+    async def run_until_complete(self):
+        """运行直到所有会话结束"""
+        driver = asyncio.ensure_future(self.wheel.run())
+        try:
+            await asyncio.gather(*(session.wait() for session in list(self.sessions.values())))
+        finally:
+            self.wheel.close()
+            await driver
+    
+    def close(self):
+        """停止时间轮"""
+        self.wheel.close()
+    
+    def save_log(self, session: PomodoroSession, directory: Optional[Path] = None) -> Path:
+        """保存会话的实际执行记录"""
+        directory = Path(directory or self.config.runtime.log_dir).expanduser()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{session.target_date.isoformat()}_{session.session_id}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(session.to_log(), f, ensure_ascii=False, indent=2)
+        return path
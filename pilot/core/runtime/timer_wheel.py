@@ -0,0 +1,211 @@
+"""
+分层时间轮
+
+所有定时器按绝对的墙上时间登记在多层时间轮中（每层64格，逐层放大64倍），
+登记、取消都是O(1)，推进时只在层边界把上层的格子下放到下层。
+驱动协程每次醒来都按当前时钟计算应到达的刻度并补齐之间的所有刻度，
+睡眠多久不影响触发时间，因此不会累积漂移；系统休眠恢复后也会立即补触发错过的定时器。
+没有待触发的定时器时协程一直等待，不做轮询。
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, List, Optional
+
+
+# 每层格数（2的幂，便于位运算）
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+
+
+class TimerHandle:
+    """定时器句柄"""
+    
+    __slots__ = ('deadline', 'tick', 'callback', 'args', 'cancelled')
+    
+    def __init__(self, deadline: float, tick: int, callback: Callable[..., Any], args: tuple):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+    
+    def cancel(self):
+        """取消定时器（惰性删除，推进到所在格子时丢弃）"""
+        self.cancelled = True
+
+
+class TimerWheel:
+    """分层时间轮"""
+    
+    def __init__(
+        self,
+        tick_seconds: float = 1.0,
+        levels: int = 4,
+        clock: Callable[[], float] = time.time,
+        max_sleep_seconds: float = 30.0
+    ):
+        """
+        Args:
+            tick_seconds: 刻度精度（秒）
+            levels: 层数，覆盖范围为 64^levels 个刻度（1秒刻度、4层约194天），更远的定时器暂存在溢出列表
+            clock: 墙上时钟，返回epoch秒
+            max_sleep_seconds: 单次睡眠上限；事件循环的单调时钟在系统休眠期间可能停走，
+                以此限定休眠恢复后发现错过定时器的最大延迟
+        """
+        self.tick_seconds = tick_seconds
+        self.levels = levels
+        self.clock = clock
+        self.max_sleep_seconds = max_sleep_seconds
+        self.current_tick = self._to_tick(clock())
+        self._wheels: List[List[List[TimerHandle]]] = [
+            [[] for _ in range(WHEEL_SIZE)] for _ in range(levels)
+        ]
+        self._overflow: List[TimerHandle] = []
+        self._pending = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sleep_until: Optional[float] = None
+        self._closed = False
+    
+    def __len__(self) -> int:
+        """尚未触发的定时器数量（含已取消但未清理的）"""
+        return self._pending
+    
+    def _to_tick(self, timestamp: float) -> int:
+        return int(timestamp // self.tick_seconds)
+    
+    def call_at(self, deadline: float, callback: Callable[..., Any], *args) -> TimerHandle:
+        """在墙上时间deadline（epoch秒）调用callback(*args)"""
+        # 向上取整，保证不会早于deadline触发
+        tick = -int(-deadline // self.tick_seconds)
+        handle = TimerHandle(deadline, tick, callback, args)
+        self._insert(handle)
+        self._pending += 1
+        
+        # 比当前睡眠目标更早的定时器需要唤醒驱动协程
+        if self._wakeup is not None and (self._sleep_until is None or deadline < self._sleep_until):
+            self._wakeup.set()
+        return handle
+    
+    def call_later(self, delay: float, callback: Callable[..., Any], *args) -> TimerHandle:
+        """delay秒后调用callback(*args)"""
+        return self.call_at(self.clock() + delay, callback, *args)
+    
+    def _insert(self, handle: TimerHandle, cascading: bool = False):
+        """按距当前刻度的远近放入对应层的格子"""
+        delta = handle.tick - self.current_tick
+        if delta <= 0:
+            # 已到期：下放时当前刻度的格子尚未处理，直接放入；否则放到下一刻度触发
+            tick = self.current_tick if cascading else self.current_tick + 1
+            self._wheels[0][tick & WHEEL_MASK].append(handle)
+            return
+        for level in range(self.levels):
+            if delta < 1 << (WHEEL_BITS * (level + 1)):
+                self._wheels[level][(handle.tick >> (WHEEL_BITS * level)) & WHEEL_MASK].append(handle)
+                return
+        self._overflow.append(handle)
+    
+    def advance(self, now: Optional[float] = None) -> int:
+        """推进到now对应的刻度，依次触发其间到期的定时器，返回触发数量"""
+        target = self._to_tick(self.clock() if now is None else now)
+        fired = 0
+        while self.current_tick < target:
+            if self._pending == 0:
+                # 没有定时器时直接跳到目标刻度
+                self.current_tick = target
+                break
+            self.current_tick += 1
+            tick = self.current_tick
+            
+            # 到达层边界时把上层对应格子下放
+            for level in range(1, self.levels):
+                if tick & ((1 << (WHEEL_BITS * level)) - 1):
+                    break
+                self._cascade(level, (tick >> (WHEEL_BITS * level)) & WHEEL_MASK)
+            else:
+                if self._overflow and not tick & ((1 << (WHEEL_BITS * self.levels)) - 1):
+                    overflow, self._overflow = self._overflow, []
+                    for handle in overflow:
+                        self._insert(handle, cascading=True)
+            
+            bucket = self._wheels[0][tick & WHEEL_MASK]
+            if not bucket:
+                continue
+            self._wheels[0][tick & WHEEL_MASK] = []
+            for handle in bucket:
+                if handle.tick > tick:
+                    # 同一格子中一圈之后才到期的定时器
+                    self._wheels[0][tick & WHEEL_MASK].append(handle)
+                    continue
+                self._pending -= 1
+                if handle.cancelled:
+                    continue
+                fired += 1
+                try:
+                    handle.callback(*handle.args)
+                except Exception as e:
+                    print(f"⚠️ 定时回调执行失败: {str(e)}")
+        return fired
+    
+    def _cascade(self, level: int, index: int):
+        """把上层一个格子中的定时器重新放入下层"""
+        bucket = self._wheels[level][index]
+        if not bucket:
+            return
+        self._wheels[level][index] = []
+        for handle in bucket:
+            if handle.cancelled:
+                self._pending -= 1
+                continue
+            self._insert(handle, cascading=True)
+    
+    def next_deadline(self) -> Optional[float]:
+        """下一次需要醒来的墙上时间（最近的非空格子或层边界），没有定时器时返回None"""
+        if self._pending == 0:
+            return None
+        
+        best: Optional[int] = None
+        for level in range(self.levels):
+            shift = WHEEL_BITS * level
+            base = self.current_tick >> shift
+            for offset in range(1, WHEEL_SIZE + 1):
+                slot = base + offset
+                if self._wheels[level][slot & WHEEL_MASK]:
+                    tick = slot << shift
+                    if best is None or tick < best:
+                        best = tick
+                    break
+            if best is not None and best <= (base + 1) << shift:
+                break
+        
+        if best is None:
+            # 只剩溢出定时器：在最高层的下一个边界醒来重新分配
+            span = 1 << (WHEEL_BITS * self.levels)
+            best = (self.current_tick // span + 1) * span
+        return best * self.tick_seconds
+    
+    async def run(self):
+        """驱动协程：按最近的到期时间睡眠，醒来后按实际时钟补齐所有刻度"""
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        while not self._closed:
+            self.advance()
+            deadline = self.next_deadline()
+            self._sleep_until = deadline
+            timeout = self.max_sleep_seconds
+            if deadline is not None:
+                timeout = min(timeout, max(0.0, deadline - self.clock()))
+            
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._sleep_until = None
+    
+    def close(self):
+        """停止驱动协程"""
+        self._closed = True
+        if self._wakeup is not None:
+            self._wakeup.set()
@@ -3,7 +3,31 @@
 """
 
 from .scheduler import PomodoroScheduler
+from .diff import ScheduleDiff, diff_schedules
+from .slots import SlotAllocator, merge_intervals, free_gaps
+from .assignment import TaskAssigner
+from .occupancy import OccupancyGrid
+from .reschedule import ScheduleChange, RescheduleResult
+from .team import TeamMember, TeamSlotFinder
+from .timeline import TimelineEntry
+from .validator import ScheduleValidator, ScheduleViolation
+from .store import ScheduleStore
 
 __all__ = [
     'PomodoroScheduler',
+    'ScheduleDiff',
+    'diff_schedules',
+    'SlotAllocator',
+    'merge_intervals',
+    'free_gaps',
+    'TaskAssigner',
+    'OccupancyGrid',
+    'ScheduleChange',
+    'RescheduleResult',
+    'TeamMember',
+    'TeamSlotFinder',
+    'TimelineEntry',
+    'ScheduleValidator',
+    'ScheduleViolation',
+    'ScheduleStore',
 ]
@@ -0,0 +1,224 @@
+"""
+番茄钟任务分配
+
+把任务拆成番茄钟单位后分配到已排好的专注循环上：
+1. 容量不足时用分组背包DP选择每个任务安排几个番茄钟，最大化加权完成度；
+2. 再按精力匹配放置——高精力/深度任务优先落在精力高峰时段（排序不等式，O(n log n)）。
+DP超出时间上限时退化为按单位权重贪心选择。
+"""
+
+import time as timer
+from datetime import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..models.config import AssignmentConfig
+from ..models.plan import Task
+from .slots import Interval, to_minutes
+
+
+# 精力等级得分
+ENERGY_SCORES = {"高": 3, "High": 3, "中": 2, "Medium": 2, "低": 1, "Low": 1}
+
+# 任务类型对精力需求的修正
+TYPE_BONUS = {"deep": 1.0, "normal": 0.0, "light": -0.5}
+
+
+def parse_windows(windows: Sequence[str]) -> List[Interval]:
+    """解析 "HH:MM-HH:MM" 形式的时段列表"""
+    parsed = []
+    for window in windows:
+        start, _, end = window.partition('-')
+        parsed.append((to_minutes(time.fromisoformat(start.strip())), to_minutes(time.fromisoformat(end.strip()))))
+    return parsed
+
+
+def task_energy_score(task: Task) -> float:
+    """任务对精力的需求得分"""
+    return ENERGY_SCORES.get(task.energy, 2) + TYPE_BONUS.get(task.type, 0.0)
+
+
+class AssignmentResult:
+    """分配结果"""
+    
+    __slots__ = ('slot_tasks', 'allocation', 'value', 'solver', 'elapsed_ms')
+    
+    def __init__(self, slot_tasks: List[Optional[int]], allocation: List[int], value: float, solver: str, elapsed_ms: float):
+        self.slot_tasks = slot_tasks  # 每个时段对应的任务下标，None表示空闲
+        self.allocation = allocation  # 每个任务分到的番茄钟数
+        self.value = value
+        self.solver = solver
+        self.elapsed_ms = elapsed_ms
+
+
+class TaskAssigner:
+    """任务到番茄钟的分配求解器"""
+    
+    def __init__(self, config: AssignmentConfig, focus_min: int):
+        self.config = config
+        self.focus_min = focus_min
+        self.peak_windows = parse_windows(config.peak_windows)
+    
+    def demand(self, task: Task) -> int:
+        """任务需要的番茄钟数量"""
+        return max(1, round(task.est_min / self.focus_min))
+    
+    def slot_peak_score(self, slot: Interval) -> float:
+        """时段与精力高峰的重叠比例（0-1）"""
+        start, end = slot
+        if end <= start:
+            return 0.0
+        overlap = sum(max(0, min(end, peak_end) - max(start, peak_start)) for peak_start, peak_end in self.peak_windows)
+        return min(1.0, overlap / (end - start))
+    
+    def assign(
+        self,
+        tasks: List[Task],
+        slots: List[Interval],
+        remaining: Optional[List[int]] = None,
+        time_budget_ms: Optional[float] = None
+    ) -> AssignmentResult:
+        """把任务分配到专注时段
+        
+        Args:
+            tasks: 任务列表（输入顺序即用户给出的优先顺序）
+            slots: 专注时段（当天分钟数区间），按时间顺序
+            remaining: 每个任务尚未安排的番茄钟数，缺省为全部需求
+            time_budget_ms: 求解时间上限，缺省使用配置值
+        """
+        start = timer.perf_counter()
+        budget = self.config.time_budget_ms if time_budget_ms is None else time_budget_ms
+        deadline = start + budget / 1000
+        
+        if remaining is None:
+            remaining = [self.demand(task) for task in tasks]
+        totals = [self.demand(task) for task in tasks]
+        
+        allocation = self._select_dp(tasks, remaining, totals, len(slots), deadline)
+        solver = "dp"
+        if allocation is None:
+            allocation = self._select_greedy(tasks, remaining, totals, len(slots))
+            solver = "greedy"
+        
+        slot_tasks = self._place(tasks, slots, allocation)
+        value = sum(self._value(task, count, total) for task, count, total in zip(tasks, allocation, totals))
+        
+        return AssignmentResult(
+            slot_tasks=slot_tasks,
+            allocation=allocation,
+            value=round(value, 4),
+            solver=solver,
+            elapsed_ms=round((timer.perf_counter() - start) * 1000, 3)
+        )
+    
+    def _value(self, task: Task, count: int, total: int) -> float:
+        """安排count个番茄钟带来的加权完成度"""
+        if count <= 0:
+            return 0.0
+        value = task.weight * count / total
+        if count >= total:
+            value += task.weight * self.config.completion_bonus
+        return value
+    
+    def _select_dp(
+        self,
+        tasks: List[Task],
+        remaining: List[int],
+        totals: List[int],
+        capacity: int,
+        deadline: float
+    ) -> Optional[List[int]]:
+        """分组背包：每个任务选0..remaining个番茄钟，总数不超过容量；超时返回None"""
+        if sum(remaining) <= capacity:
+            return list(remaining)
+        
+        done = [total - left for total, left in zip(totals, remaining)]
+        negative = float('-inf')
+        best = [0.0] + [negative] * capacity
+        choices: List[List[int]] = []
+        
+        for index, task in enumerate(tasks):
+            base = self._value(task, done[index], totals[index])
+            gains = [self._value(task, done[index] + count, totals[index]) - base for count in range(remaining[index] + 1)]
+            
+            next_best = [negative] * (capacity + 1)
+            choice = [0] * (capacity + 1)
+            for used in range(capacity + 1):
+                # 单个任务的容量循环也可能很长，每行检查一次时间上限
+                if timer.perf_counter() > deadline:
+                    return None
+                for count in range(min(remaining[index], used) + 1):
+                    previous = best[used - count]
+                    if previous == negative:
+                        continue
+                    candidate = previous + gains[count]
+                    # 同分时偏向输入顺序靠前的任务多分配
+                    if candidate > next_best[used] + 1e-9:
+                        next_best[used] = candidate
+                        choice[used] = count
+            best = next_best
+            choices.append(choice)
+        
+        # 回溯
+        used = max(range(capacity + 1), key=lambda c: (best[c], -c))
+        allocation = [0] * len(tasks)
+        for index in range(len(tasks) - 1, -1, -1):
+            count = choices[index][used]
+            allocation[index] = count
+            used -= count
+        return allocation
+    
+    def _select_greedy(self, tasks: List[Task], remaining: List[int], totals: List[int], capacity: int) -> List[int]:
+        """按单位番茄钟价值（含完成奖励）从高到低贪心选择"""
+        allocation = [0] * len(tasks)
+        done = [total - left for total, left in zip(totals, remaining)]
+        
+        def unit_value(index: int) -> float:
+            # 安排全部剩余番茄钟时的平均增益，完成奖励摊到每个番茄钟上
+            count = remaining[index]
+            if count <= 0:
+                return 0.0
+            gain = self._value(tasks[index], done[index] + count, totals[index]) - \
+                self._value(tasks[index], done[index], totals[index])
+            return gain / count
+        
+        order = sorted(range(len(tasks)), key=lambda index: (-unit_value(index), index))
+        for index in order:
+            if capacity <= 0:
+                break
+            count = min(remaining[index], capacity)
+            allocation[index] = count
+            capacity -= count
+        return allocation
+    
+    def _place(self, tasks: List[Task], slots: List[Interval], allocation: List[int]) -> List[Optional[int]]:
+        """把选中的番茄钟放到具体时段"""
+        slot_tasks: List[Optional[int]] = [None] * len(slots)
+        units = [index for index, count in enumerate(allocation) for _ in range(count)]
+        
+        if self.config.preserve_task_order:
+            for position, index in enumerate(units):
+                slot_tasks[position] = index
+            return slot_tasks
+        
+        # 排序不等式：精力需求高的单位配给高峰得分高的时段，同分时保持输入顺序和时间顺序
+        units.sort(key=lambda index: (-task_energy_score(tasks[index]), index))
+        ranked_slots = sorted(range(len(slots)), key=lambda position: (-self.slot_peak_score(slots[position]), position))
+        for position, index in zip(ranked_slots, units):
+            slot_tasks[position] = index
+        return slot_tasks
+
+
+def number_parts(slot_tasks: List[Optional[int]], done: Optional[Dict[int, int]] = None) -> List[Optional[Tuple[int, int]]]:
+    """按时间顺序为每个时段标注 (任务下标, 第几部分)
+    
+    done给出每个任务此前已完成的番茄钟数，部分编号在其基础上递增。
+    """
+    counters = dict(done or {})
+    parts: List[Optional[Tuple[int, int]]] = []
+    for index in slot_tasks:
+        if index is None:
+            parts.append(None)
+            continue
+        counters[index] = counters.get(index, 0) + 1
+        parts.append((index, counters[index]))
+    return parts
@@ -0,0 +1,70 @@
+"""
+日程差异对比
+
+按稳定的时段标识（slot_id）对比新旧日程，得到新增、删除和变更的条目，
+供增量重排和日历增量更新使用。
+"""
+
+from typing import List, Dict
+
+from pydantic import BaseModel, Field
+
+from ..models.schedule import ScheduleItem
+
+
+class ItemChange(BaseModel):
+    """单个日程条目的变更"""
+    slot_id: str
+    before: ScheduleItem
+    after: ScheduleItem
+    fields: List[str] = Field(default_factory=list, description="发生变化的字段")
+
+
+class ScheduleDiff(BaseModel):
+    """日程差异"""
+    added: List[ScheduleItem] = Field(default_factory=list)
+    removed: List[ScheduleItem] = Field(default_factory=list)
+    changed: List[ItemChange] = Field(default_factory=list)
+    unchanged: int = 0
+    
+    @property
+    def is_empty(self) -> bool:
+        """是否没有任何变化"""
+        return not (self.added or self.removed or self.changed)
+    
+    def summary(self) -> str:
+        """简短的差异摘要"""
+        return f"新增{len(self.added)} / 删除{len(self.removed)} / 变更{len(self.changed)} / 不变{self.unchanged}"
+
+
+# 参与对比的字段
+_COMPARED_FIELDS = (
+    'start_time', 'end_time', 'title', 'type', 'task_title', 'subtask', 'focus_content', 'cycle_number', 'location'
+)
+
+
+def item_key(item: ScheduleItem) -> str:
+    """条目的稳定标识，缺少slot_id时退化为类型+开始时间"""
+    return item.slot_id or f"{item.type.value}@{item.start_time.strftime('%H:%M')}"
+
+
+def diff_schedules(old: List[ScheduleItem], new: List[ScheduleItem]) -> ScheduleDiff:
+    """对比新旧日程"""
+    old_by_key: Dict[str, ScheduleItem] = {item_key(item): item for item in old}
+    diff = ScheduleDiff()
+    
+    for item in new:
+        key = item_key(item)
+        previous = old_by_key.pop(key, None)
+        if previous is None:
+            diff.added.append(item)
+            continue
+        
+        fields = [name for name in _COMPARED_FIELDS if getattr(previous, name) != getattr(item, name)]
+        if fields:
+            diff.changed.append(ItemChange(slot_id=key, before=previous, after=item, fields=fields))
+        else:
+            diff.unchanged += 1
+    
+    diff.removed.extend(old_by_key.values())
+    return diff
@@ -0,0 +1,204 @@
+"""
+分钟级占用位图
+
+用NumPy按 用户 × 天 × 1440分钟 存储占用情况，每分钟1位（每天180字节），
+批量标记忙碌、查找不短于K分钟的空闲段、跨用户求交集均为向量化操作，
+用于团队层面在成百上千人、多天范围内查找空闲时段。
+"""
+
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .slots import DAY_MINUTES, to_minutes
+
+
+# 每天占用的字节数
+DAY_BYTES = DAY_MINUTES // 8
+
+# 批量处理时每块的用户数，限制中间数组的内存占用
+CHUNK_USERS = 128
+
+
+def _slot_bounds(slot) -> Tuple[int, int]:
+    """取TimeSlot或ScheduleItem的起止分钟"""
+    if hasattr(slot, 'start_time'):
+        return to_minutes(slot.start_time), to_minutes(slot.end_time)
+    return to_minutes(slot.start), to_minutes(slot.end)
+
+
+def _free_runs(busy_bits: np.ndarray, min_length: int, window_start: int, window_end: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """在若干行打包位图中查找空闲段
+    
+    Args:
+        busy_bits: 形状 (N, 180) 的打包忙碌位图
+    Returns:
+        (行号, 开始分钟, 结束分钟)，按行号、开始时间排序
+    """
+    free = np.unpackbits(busy_bits, axis=-1, count=DAY_MINUTES)[:, window_start:window_end] == 0
+    # 前后补0后做差分：+1为空闲段开始，-1为空闲段结束
+    padded = np.zeros((free.shape[0], free.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = free
+    edges = np.diff(padded, axis=-1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    keep = (ends - starts) >= min_length
+    return rows[keep], starts[keep] + window_start, ends[keep] + window_start
+
+
+class OccupancyGrid:
+    """用户 × 天 × 分钟 的占用位图"""
+    
+    def __init__(self, users: int, days: int):
+        self.users = users
+        self.days = days
+        self.bits = np.zeros((users, days, DAY_BYTES), dtype=np.uint8)
+    
+    def mark_busy(self, user: int, day: int, start: int, end: int):
+        """标记单个忙碌区间（当天分钟数，左闭右开）
+        
+        end < start 表示跨午夜，拆成当天 [start, 24:00) 和次日 [00:00, end)。
+        只改动涉及的一天的位图，不经过批量路径。
+        """
+        if end < start:
+            self.mark_busy(user, day, start, DAY_MINUTES)
+            if day + 1 < self.days:
+                self.mark_busy(user, day + 1, 0, end)
+            return
+        
+        start, end = max(0, start), min(DAY_MINUTES, end)
+        if end <= start:
+            return
+        minutes = np.unpackbits(self.bits[user, day], count=DAY_MINUTES)
+        minutes[start:end] = 1
+        self.bits[user, day] = np.packbits(minutes)
+    
+    def mark_busy_many(
+        self,
+        users: Sequence[int],
+        days: Sequence[int],
+        starts: Sequence[int],
+        ends: Sequence[int]
+    ):
+        """批量标记忙碌区间
+        
+        四个数组一一对应；按用户分块，把所有区间展开成分钟下标后一次性置位再打包。
+        end < start 的跨午夜区间拆成当天到24:00和次日从00:00两段（最后一天的次日部分丢弃）。
+        """
+        users = np.asarray(users, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        
+        overnight = ends < starts
+        if overnight.any():
+            next_day = overnight & (days + 1 < self.days)
+            users = np.concatenate([users, users[next_day]])
+            days = np.concatenate([days, days[next_day] + 1])
+            starts = np.concatenate([starts, np.zeros(int(next_day.sum()), dtype=np.int64)])
+            ends = np.concatenate([np.where(overnight, DAY_MINUTES, ends), ends[next_day]])
+        
+        starts = np.clip(starts, 0, DAY_MINUTES)
+        ends = np.clip(ends, 0, DAY_MINUTES)
+        valid = ends > starts
+        users, days, starts, ends = users[valid], days[valid], starts[valid], ends[valid]
+        if users.size == 0:
+            return
+        
+        for chunk_start in range(0, self.users, CHUNK_USERS):
+            chunk_end = min(self.users, chunk_start + CHUNK_USERS)
+            selected = (users >= chunk_start) & (users < chunk_end)
+            if not selected.any():
+                continue
+            
+            lengths = ends[selected] - starts[selected]
+            offsets = ((users[selected] - chunk_start) * self.days + days[selected]) * DAY_MINUTES + starts[selected]
+            # 每个区间展开为 offset, offset+1, ..., offset+length-1
+            shifts = np.repeat(offsets - np.cumsum(lengths) + lengths, lengths)
+            minutes = np.arange(shifts.size, dtype=np.int64) + shifts
+            
+            busy = np.zeros((chunk_end - chunk_start) * self.days * DAY_MINUTES, dtype=bool)
+            busy[minutes] = True
+            self.bits[chunk_start:chunk_end] |= np.packbits(
+                busy.reshape(chunk_end - chunk_start, self.days, DAY_MINUTES), axis=-1
+            )
+    
+    def mark_slots(self, records: Iterable[Tuple[int, int, object]]):
+        """批量导入会议或日程条目
+        
+        Args:
+            records: (用户下标, 天下标, TimeSlot或ScheduleItem) 序列
+        """
+        users, days, starts, ends = [], [], [], []
+        for user, day, slot in records:
+            start, end = _slot_bounds(slot)
+            users.append(user)
+            days.append(day)
+            starts.append(start)
+            ends.append(end)
+        self.mark_busy_many(users, days, starts, ends)
+    
+    def is_free(self, user: int, day: int, start: int, end: int) -> bool:
+        """某用户某天的区间是否完全空闲"""
+        minutes = np.unpackbits(self.bits[user, day], count=DAY_MINUTES)
+        return not minutes[start:end].any()
+    
+    def free_runs(
+        self,
+        min_length: int,
+        users: Optional[Sequence[int]] = None,
+        window_start: int = 0,
+        window_end: int = DAY_MINUTES
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """查找工作窗口内不短于min_length分钟的空闲段
+        
+        Returns:
+            (用户下标, 天下标, 开始分钟, 结束分钟) 四个等长数组
+        """
+        user_index = np.arange(self.users) if users is None else np.asarray(users, dtype=np.int64)
+        result = ([], [], [], [])
+        for chunk_start in range(0, len(user_index), CHUNK_USERS):
+            chunk = user_index[chunk_start:chunk_start + CHUNK_USERS]
+            rows, starts, ends = _free_runs(
+                self.bits[chunk].reshape(-1, DAY_BYTES), min_length, window_start, window_end
+            )
+            result[0].append(chunk[rows // self.days])
+            result[1].append(rows % self.days)
+            result[2].append(starts)
+            result[3].append(ends)
+        
+        if not result[0]:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty, empty
+        return tuple(np.concatenate(part) for part in result)
+    
+    def free_block_counts(
+        self,
+        block_length: int,
+        window_start: int = 0,
+        window_end: int = DAY_MINUTES
+    ) -> np.ndarray:
+        """每个用户每天可放下的block_length分钟整块数量，形状 (users, days)"""
+        users, days, starts, ends = self.free_runs(block_length, window_start=window_start, window_end=window_end)
+        counts = np.zeros((self.users, self.days), dtype=np.int64)
+        np.add.at(counts, (users, days), (ends - starts) // block_length)
+        return counts
+    
+    def intersect(self, users: Optional[Sequence[int]] = None) -> np.ndarray:
+        """多个用户的合并忙碌位图（任一人忙即为忙），形状 (days, 180)"""
+        selected = self.bits if users is None else self.bits[np.asarray(users, dtype=np.int64)]
+        return np.bitwise_or.reduce(selected, axis=0)
+    
+    def common_free_runs(
+        self,
+        min_length: int,
+        users: Optional[Sequence[int]] = None,
+        window_start: int = 0,
+        window_end: int = DAY_MINUTES
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """所有指定用户都空闲且不短于min_length分钟的时段
+        
+        Returns:
+            (天下标, 开始分钟, 结束分钟)
+        """
+        return _free_runs(self.intersect(users), min_length, window_start, window_end)
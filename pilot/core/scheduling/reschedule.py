@@ -0,0 +1,160 @@
+"""
+日内增量重排
+
+专注超时、跳过某轮或临时插入事项时，保留当前时刻之前已开始的条目，
+只重新排列之后的番茄钟，并返回与原日程的最小差异，供日历只更新受影响的事件。
+"""
+
+from datetime import time
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from ..models.config import PilotConfig
+from ..models.plan import TimeSlot
+from ..models.schedule import ScheduleItem, PomodoroType
+from .diff import ScheduleDiff, diff_schedules
+from .slots import SlotAllocator, free_gaps, to_minutes
+from .timeline import TimelineEntry, from_items, to_items
+
+
+class ScheduleChange(BaseModel):
+    """日程变化"""
+    kind: Literal["overrun", "skip", "insert"] = Field(description="超时 / 跳过 / 插入")
+    slot_id: str = Field(default="", description="超时或跳过的条目标识")
+    minutes: int = Field(default=0, description="超时分钟数")
+    start: Optional[time] = Field(default=None, description="插入事项的开始时间")
+    end: Optional[time] = Field(default=None, description="插入事项的结束时间")
+    title: str = Field(default="", description="插入事项的标题")
+
+
+class RescheduleResult(BaseModel):
+    """增量重排结果"""
+    schedule: List[ScheduleItem] = Field(default_factory=list)
+    diff: ScheduleDiff = Field(default_factory=ScheduleDiff)
+    dropped: List[ScheduleItem] = Field(default_factory=list, description="工作窗口内已放不下的专注条目")
+
+
+class Rescheduler:
+    """日内增量重排器"""
+    
+    def __init__(self, config: PilotConfig):
+        self.config = config
+    
+    def apply(
+        self,
+        schedule: List[ScheduleItem],
+        now: time,
+        change: ScheduleChange,
+        mode: str = "work",
+        window_end: Optional[time] = None,
+        meetings: Optional[List[TimeSlot]] = None
+    ) -> RescheduleResult:
+        """在now之后重排日程
+        
+        Args:
+            schedule: 当前日程（按时间排序）
+            now: 当前时间，之前开始的条目视为已完成或进行中，保持不动
+            change: 日程变化
+            mode: 工作/学习模式，决定专注和休息时长
+            window_end: 工作窗口结束时间，缺省为原日程的最晚结束时间（不向后延长）
+            meetings: 仍需避开的会议
+        """
+        now_min = to_minutes(now)
+        entries = from_items(schedule)
+        end_min = to_minutes(window_end) if window_end else max((entry.end for entry in entries), default=now_min)
+        
+        # 插入事项：作为固定条目加入，截断与之重叠的进行中条目
+        inserted = None
+        if change.kind == "insert" and change.start and change.end:
+            inserted = TimelineEntry(
+                to_minutes(change.start),
+                to_minutes(change.end),
+                PomodoroType.TASK,
+                change.title or "临时事项",
+                slot_id=f"insert-{change.start.strftime('%H%M')}"
+            )
+            entries = [
+                entry.moved(entry.start, inserted.start)
+                if entry.start < inserted.start < entry.end and entry.start < now_min else entry
+                for entry in entries
+            ]
+        
+        # 跳过：去掉该轮专注及其后的休息
+        if change.kind == "skip" and change.slot_id:
+            skipped = {change.slot_id}
+            if change.slot_id.startswith("focus-"):
+                skipped.add("break-" + change.slot_id[len("focus-"):])
+            entries = [entry for entry in entries if entry.slot_id not in skipped]
+        
+        # 超时：延长该条目
+        if change.kind == "overrun" and change.slot_id:
+            for index, entry in enumerate(entries):
+                if entry.slot_id == change.slot_id:
+                    entries[index] = entry.moved(entry.start, entry.end + change.minutes)
+                    now_min = max(now_min, entry.start + 1)
+        
+        # 已开始的条目保持不动；固定条目（午休、插入事项）不参与重排
+        prefix = [entry for entry in entries if entry.start < now_min]
+        fixed = [
+            entry for entry in entries
+            if entry.start >= now_min and entry.kind in (PomodoroType.LUNCH, PomodoroType.TASK)
+        ]
+        if inserted is not None:
+            fixed.append(inserted)
+        pending = [entry for entry in entries if entry.start >= now_min and entry.kind == PomodoroType.FOCUS]
+        
+        cursor = max([now_min] + [entry.end for entry in prefix])
+        busy = [(entry.start, entry.end) for entry in fixed]
+        busy += [(to_minutes(meeting.start), to_minutes(meeting.end)) for meeting in meetings or []]
+        lunch = next((entry for entry in fixed if entry.kind == PomodoroType.LUNCH), None)
+        if lunch is not None:
+            busy.append((lunch.start, lunch.end + self.config.pomodoro.lunch_buffer_min))
+        
+        if mode == 'work':
+            focus_min, break_min = self.config.pomodoro.work_focus_min, self.config.pomodoro.work_break_min
+        else:
+            focus_min, break_min = self.config.pomodoro.study_focus_min, self.config.pomodoro.study_break_min
+        
+        rebuilt: List[TimelineEntry] = []
+        
+        # 进行中的专注结束后先补上它的休息
+        last = max(prefix, key=lambda entry: entry.end, default=None)
+        if last is not None and last.kind == PomodoroType.FOCUS and pending:
+            original_break = next((entry for entry in entries if entry.slot_id == f"break-{last.cycle_number}"), None)
+            if original_break is not None and original_break.start >= now_min:
+                gap = next((gap for gap in free_gaps(cursor, end_min, busy) if gap[0] == cursor), None)
+                if gap is not None:
+                    break_end = min(gap[1], cursor + original_break.duration)
+                    rebuilt.append(original_break.moved(cursor, break_end))
+                    cursor = break_end
+        
+        allocator = SlotAllocator(
+            focus_min=focus_min,
+            break_min=break_min,
+            long_break_min=self.config.pomodoro.long_break_min,
+            long_break_every=self.config.pomodoro.long_break_every,
+            partial_policy=self.config.pomodoro.partial_cycle_policy,
+            min_partial_focus_min=self.config.pomodoro.min_partial_focus_min
+        )
+        first_cycle = pending[0].cycle_number if pending else 1
+        allocated = allocator.allocate(free_gaps(cursor, end_min, busy), len(pending), first_cycle)
+        
+        # 剩余专注按原顺序落到新时段，沿用原轮次编号和slot_id
+        for entry, cycle in zip(pending, allocated):
+            rebuilt.append(entry.moved(cycle.focus_start, cycle.focus_end))
+            if cycle.break_type is not None:
+                rebuilt.append(TimelineEntry(
+                    cycle.break_start,
+                    cycle.break_end,
+                    cycle.break_type,
+                    "长休息" if cycle.break_type == PomodoroType.LONG_BREAK else "短休息",
+                    slot_id=f"break-{entry.cycle_number}"
+                ))
+        
+        new_schedule = to_items(prefix + fixed + rebuilt)
+        return RescheduleResult(
+            schedule=new_schedule,
+            diff=diff_schedules(schedule, new_schedule),
+            dropped=[entry.to_item() for entry in pending[len(allocated):]]
+        )
@@ -2,172 +2,364 @@
 番茄钟调度器
 """
 
-from datetime import datetime, date, time, timedelta
-from typing import List, Tuple
+from datetime import date, time, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
 from ..models.config import PilotConfig
-from ..models.plan import PlanOutput, Task, TimeSlot
+from ..models.plan import PlanInput, PlanOutput, Task, TimeSlot
 from ..models.schedule import ScheduleItem, PomodoroType
+from ...interfaces.scheduler import SchedulerInterface
+from .slots import AllocatedCycle, SlotAllocator, free_gaps, to_minutes
+from .assignment import TaskAssigner, number_parts
+from .reschedule import Rescheduler, ScheduleChange, RescheduleResult
+from .timeline import TimelineEntry, to_items
+from .validator import ScheduleValidator, ScheduleViolation, has_errors
+from .workdays import WorkdayCalendar
 
 
-class PomodoroScheduler:
+# 所有任务安排完后剩余专注循环的默认内容
+REVIEW_TASK_INFO = {
+    'task_title': "任务复习与优化",
+    'subtask': "回顾和完善已完成的工作",
+    'focus_content': "检查工作质量，优化细节，处理遗留问题"
+}
+
+
+class PomodoroScheduler(SchedulerInterface):
     """番茄钟调度器"""
     
     def __init__(self, config: PilotConfig):
         self.config = config
+        self._workdays: Optional[WorkdayCalendar] = None
     
-    def schedule_pomodoros(self, target_date: date, plan_output: PlanOutput) -> List[ScheduleItem]:
-        """基于计划输出生成番茄钟时间表"""
+    @property
+    def workdays(self) -> WorkdayCalendar:
+        """工作日日历（首次使用时加载）"""
+        if self._workdays is None:
+            self._workdays = WorkdayCalendar.from_config(self.config.workdays)
+        return self._workdays
+    
+    def schedule_pomodoros(
+        self,
+        target_date: date,
+        plan_output: PlanOutput,
+        plan_input: Optional[PlanInput] = None,
+        blackouts: Optional[List[TimeSlot]] = None
+    ) -> List[ScheduleItem]:
+        """基于计划输出生成番茄钟时间表
+        
+        给出plan_input时使用其工作窗口、模式、轮数和会议，否则从任务时间推断工作窗口。
+        专注循环只会排在避开会议、午休和blackouts之后的空闲段中。
+        """
         schedule = []
         
         # 获取工作时间窗口（从第一个任务推断）
         if not plan_output.top_tasks:
             return schedule
         
-        # 从计划中提取工作窗口
-        earliest_start = min(task.scheduled_start for task in plan_output.top_tasks if task.scheduled_start)
-        latest_end = max(task.scheduled_end for task in plan_output.top_tasks if task.scheduled_end)
-        
-        if not earliest_start or not latest_end:
-            return schedule
+        if plan_input is not None:
+            earliest_start = plan_input.work_window_start
+            latest_end = plan_input.work_window_end
+        else:
+            # 从计划中提取工作窗口
+            starts = [task.scheduled_start for task in plan_output.top_tasks if task.scheduled_start]
+            ends = [task.scheduled_end for task in plan_output.top_tasks if task.scheduled_end]
+            if not starts or not ends:
+                return schedule
+            earliest_start = min(starts)
+            latest_end = max(ends)
         
         # 获取番茄钟配置
-        mode = getattr(plan_output, 'mode', 'work')
-        if mode == 'work':
-            focus_min = self.config.pomodoro.work_focus_min
-            break_min = self.config.pomodoro.work_break_min
-            cycles = self.config.pomodoro.work_cycles
-        else:
-            focus_min = self.config.pomodoro.study_focus_min
-            break_min = self.config.pomodoro.study_break_min
-            cycles = 4  # 学习模式默认4轮
+        mode = plan_input.mode if plan_input is not None else getattr(plan_output, 'mode', 'work')
+        focus_min, break_min, cycles = self._get_mode_settings(mode)
+        if plan_input is not None:
+            cycles = plan_input.cycles
         
         # 获取任务映射（如果LLM提供了的话）
         task_mappings = plan_output.pomodoro_task_mapping if hasattr(plan_output, 'pomodoro_task_mapping') else []
         
-        # 如果没有任务映射，则按顺序自动分配任务
-        if not task_mappings:
-            task_mappings = self._auto_generate_task_mappings(plan_output.top_tasks, cycles)
+        if task_mappings:
+            task_infos = lambda allocated: {
+                cycle.cycle_number: self._get_task_info_for_cycle(cycle.cycle_number, task_mappings)
+                for cycle in allocated
+            }
+        elif self.config.assignment.enabled:
+            # 按精力和权重求解任务到专注时段的分配
+            task_infos = lambda allocated: self._assign_task_infos(plan_output.top_tasks, allocated, focus_min)
+        else:
+            # 按顺序自动分配任务
+            task_mappings = self._auto_generate_task_mappings(plan_output.top_tasks, cycles, focus_min)
+            task_infos = lambda allocated: {
+                cycle.cycle_number: self._get_task_info_for_cycle(cycle.cycle_number, task_mappings)
+                for cycle in allocated
+            }
         
-        # 生成番茄钟时间表
-        current_time = earliest_start
-        cycle_count = 0
-        task_mapping_index = 0
+        meetings = plan_input.meetings if plan_input is not None else plan_output.meetings
+        entries = self._build_day_entries(
+            to_minutes(earliest_start),
+            to_minutes(latest_end),
+            list(meetings) + list(blackouts or []),
+            focus_min,
+            break_min,
+            cycles,
+            task_infos
+        )
         
-        while current_time < latest_end and cycle_count < cycles:
-            # 检查是否在午休时间
-            if self._is_lunch_time(current_time):
-                # 添加午休时间
-                lunch_start = time(12, 0)
-                lunch_end = time(14, 0)
-                
-                if current_time <= lunch_start:
-                    schedule.append(ScheduleItem(
-                        title="午休时间",
-                        start_time=lunch_start,
-                        end_time=lunch_end,
-                        type=PomodoroType.LUNCH
-                    ))
-                    current_time = time(14, 10)  # 14:10恢复工作
-                    continue
+        return to_items(entries)
+    
+    def schedule_range(
+        self,
+        start_date: date,
+        end_date: date,
+        plan_output: PlanOutput,
+        plan_input: Optional[PlanInput] = None,
+        meetings_by_date: Optional[Dict[date, List[TimeSlot]]] = None,
+        is_workday: Optional[Callable[[date], bool]] = None
+    ) -> Iterator[Tuple[date, ScheduleItem]]:
+        """跨多天调度计划中的任务，按时间顺序逐条产出 (日期, 日程条目)
+        
+        每个任务按预计时间折算为若干番茄钟，每天由分配求解器按权重和精力选择当天安排的部分，
+        排不完的番茄钟顺延到下一个工作日；所有任务排完后停止。生成器按天惰性计算，适合流式写出一个月甚至一个季度的日程。
+        
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            plan_output: 计划输出，提供任务列表
+            plan_input: 提供每天的工作窗口、模式和轮数；其会议仅作用于plan_input.date当天
+            meetings_by_date: 按日期给出的会议，优先于plan_input中的会议
+            is_workday: 判断某天是否安排番茄钟，缺省时工作模式按工作日日历跳过周末、节假日（含调休补班）、学习模式每天都排
+        """
+        if not plan_output.top_tasks or end_date < start_date:
+            return
+        
+        mode = plan_input.mode if plan_input is not None else getattr(plan_output, 'mode', 'work')
+        focus_min, break_min, cycles = self._get_mode_settings(mode)
+        if plan_input is not None:
+            cycles = plan_input.cycles
+            window_start = to_minutes(plan_input.work_window_start)
+            window_end = to_minutes(plan_input.work_window_end)
+        else:
+            starts = [task.scheduled_start for task in plan_output.top_tasks if task.scheduled_start]
+            ends = [task.scheduled_end for task in plan_output.top_tasks if task.scheduled_end]
+            if not starts or not ends:
+                return
+            window_start = to_minutes(min(starts))
+            window_end = to_minutes(max(ends))
+        
+        if is_workday is None:
+            is_workday = self.workdays.is_workday if mode == 'work' else (lambda day: True)
+        
+        # 每个任务已安排的番茄钟数，跨天累计
+        tasks = plan_output.top_tasks
+        totals = [max(1, round(task.est_min / focus_min)) for task in tasks]
+        done = [0] * len(tasks)
+        
+        current = start_date
+        while current <= end_date and sum(done) < sum(totals):
+            if is_workday(current):
+                if meetings_by_date is not None and current in meetings_by_date:
+                    meetings = meetings_by_date[current]
+                elif plan_input is not None and plan_input.date == current:
+                    meetings = plan_input.meetings
                 else:
-                    current_time = time(14, 10)
-                    continue
+                    meetings = []
+                
+                day_cycles = min(cycles, sum(totals) - sum(done))
+                entries = self._build_day_entries(
+                    window_start, window_end, meetings, focus_min, break_min, day_cycles,
+                    lambda allocated: self._assign_task_infos(tasks, allocated, focus_min, done)
+                )
+                
+                for entry in sorted(entries, key=lambda entry: entry.start):
+                    yield current, entry.to_item()
             
-            # 添加番茄钟
-            cycle_count += 1
-            focus_end = self._add_minutes(current_time, focus_min)
+            current += timedelta(days=1)
+    
+    def reschedule(
+        self,
+        schedule: List[ScheduleItem],
+        now: time,
+        change: ScheduleChange,
+        plan_input: Optional[PlanInput] = None
+    ) -> RescheduleResult:
+        """专注超时、跳过或插入事项后，只重排当前时刻之后的番茄钟
+        
+        已开始的条目保持不变，剩余专注沿用原slot_id，返回新日程及与原日程的差异。
+        """
+        return Rescheduler(self.config).apply(
+            schedule,
+            now,
+            change,
+            mode=plan_input.mode if plan_input is not None else 'work',
+            window_end=plan_input.work_window_end if plan_input is not None else None,
+            meetings=plan_input.meetings if plan_input is not None else None
+        )
+    
+    def free_minutes(self, plan_input: PlanInput) -> int:
+        """工作窗口内去除会议和午休后的可用分钟数"""
+        lunch_start, lunch_end = self._get_lunch_interval()
+        busy = [(to_minutes(meeting.start), to_minutes(meeting.end)) for meeting in plan_input.meetings]
+        busy.append((lunch_start, lunch_end + self.config.pomodoro.lunch_buffer_min))
+        gaps = free_gaps(to_minutes(plan_input.work_window_start), to_minutes(plan_input.work_window_end), busy)
+        return sum(end - start for start, end in gaps)
+    
+    def validate_schedule(self, schedule: List[ScheduleItem], plan_input: Optional[PlanInput] = None) -> bool:
+        """日程是否没有错误级别的违规（重叠、超出工作窗口、与会议交叉、缺少休息等）"""
+        return not has_errors(self.find_violations(schedule, plan_input))
+    
+    def find_violations(
+        self,
+        schedule: List[ScheduleItem],
+        plan_input: Optional[PlanInput] = None,
+        blackouts: Optional[List[TimeSlot]] = None
+    ) -> List[ScheduleViolation]:
+        """列出日程的全部违规项，blackouts与会议一样不允许专注交叉"""
+        meetings = None
+        if blackouts:
+            meetings = list(plan_input.meetings if plan_input is not None else []) + list(blackouts)
+        return ScheduleValidator().validate(
+            schedule,
+            plan_input,
+            meetings=meetings,
+            day=plan_input.date if plan_input is not None else None
+        )
+    
+    def _get_mode_settings(self, mode: str) -> Tuple[int, int, int]:
+        """模式对应的专注时长、休息时长和默认轮数"""
+        if mode == 'work':
+            return (
+                self.config.pomodoro.work_focus_min,
+                self.config.pomodoro.work_break_min,
+                self.config.pomodoro.work_cycles
+            )
+        # 学习模式默认4轮
+        return self.config.pomodoro.study_focus_min, self.config.pomodoro.study_break_min, 4
+    
+    def _build_day_entries(
+        self,
+        window_start: int,
+        window_end: int,
+        busy_slots: List[TimeSlot],
+        focus_min: int,
+        break_min: int,
+        cycles: int,
+        task_infos: Callable[[List[AllocatedCycle]], Dict[int, dict]]
+    ) -> List[TimelineEntry]:
+        """生成单日的番茄钟时间线条目（未排序）
+        
+        专注循环只会排在避开busy_slots和午休之后的空闲段中；
+        task_infos根据分配好的循环返回 {轮次: 任务信息}。
+        """
+        schedule = []
+        
+        # 汇总不可用时段：会议、午休及额外的屏蔽时段
+        lunch_start, lunch_end = self._get_lunch_interval()
+        busy = [(to_minutes(slot.start), to_minutes(slot.end)) for slot in busy_slots]
+        busy.append((lunch_start, lunch_end + self.config.pomodoro.lunch_buffer_min))
+        gaps = free_gaps(window_start, window_end, busy)
+                
+        # 把专注/休息循环装入空闲段
+        allocator = SlotAllocator(
+            focus_min=focus_min,
+            break_min=break_min,
+            long_break_min=self.config.pomodoro.long_break_min,
+            long_break_every=self.config.pomodoro.long_break_every,
+            partial_policy=self.config.pomodoro.partial_cycle_policy,
+            min_partial_focus_min=self.config.pomodoro.min_partial_focus_min
+        )
             
+        allocated = allocator.allocate(gaps, cycles)
+        infos = task_infos(allocated)
+        
+        for cycle in allocated:
             # 获取对应的任务信息
-            task_info = self._get_task_info_for_cycle(cycle_count, task_mappings)
+            task_info = infos.get(cycle.cycle_number) or REVIEW_TASK_INFO
             
-            schedule.append(ScheduleItem(
-                title=f"番茄钟 #{cycle_count}",
-                start_time=current_time,
-                end_time=focus_end,
-                type=PomodoroType.FOCUS,
+            schedule.append(TimelineEntry(
+                cycle.focus_start,
+                cycle.focus_end,
+                PomodoroType.FOCUS,
+                f"番茄钟 #{cycle.cycle_number}",
+                slot_id=f"focus-{cycle.cycle_number}",
+                cycle_number=cycle.cycle_number,
                 task_title=task_info['task_title'],
                 subtask=task_info['subtask'],
-                focus_content=task_info['focus_content'],
-                cycle_number=cycle_count
+                focus_content=task_info['focus_content']
             ))
             
-            current_time = focus_end
-            
-            # 添加休息时间（除了最后一轮）
-            if cycle_count < cycles:
-                if cycle_count % 4 == 0:  # 每4轮一个长休息
-                    break_duration = 15
-                    break_type = PomodoroType.LONG_BREAK
-                    break_title = "长休息"
-                else:
-                    break_duration = break_min
-                    break_type = PomodoroType.SHORT_BREAK
-                    break_title = "短休息"
-                
-                break_end = self._add_minutes(current_time, break_duration)
-                
-                schedule.append(ScheduleItem(
-                    title=break_title,
-                    start_time=current_time,
-                    end_time=break_end,
-                    type=break_type
+            if cycle.break_type is not None:
+                schedule.append(TimelineEntry(
+                    cycle.break_start,
+                    cycle.break_end,
+                    cycle.break_type,
+                    "长休息" if cycle.break_type == PomodoroType.LONG_BREAK else "短休息",
+                    slot_id=f"break-{cycle.cycle_number}"
                 ))
                 
-                current_time = break_end
-        
-        # 按时间排序
-        schedule.sort(key=lambda x: x.start_time)
+        # 午休与工作窗口有交集时加入午休条目
+        if lunch_start < window_end and window_start < lunch_end:
+            schedule.append(TimelineEntry(lunch_start, lunch_end, PomodoroType.LUNCH, "午休时间", slot_id="lunch"))
         
         return schedule
     
-    def _is_lunch_time(self, current_time: time) -> bool:
-        """检查是否在午休时间"""
-        lunch_start = time(12, 0)
-        lunch_end = time(14, 0)
-        return lunch_start <= current_time < lunch_end
-    
-    def _add_minutes(self, base_time: time, minutes: int) -> time:
-        """为时间对象添加分钟"""
-        dt = datetime.combine(date.today(), base_time)
-        dt += timedelta(minutes=minutes)
-        return dt.time()
-    
-    def _get_free_time_slots(self, work_start: time, work_end: time, meetings: List[TimeSlot]) -> List[Tuple[time, time]]:
-        """获取空闲时间段"""
-        slots = []
-        
-        # 添加午休时间到会议列表
-        lunch_break = TimeSlot(start=time(12, 0), end=time(14, 0))
-        all_meetings = meetings + [lunch_break]
+    def _assign_task_infos(
+        self,
+        tasks: List[Task],
+        allocated: List[AllocatedCycle],
+        focus_min: int,
+        done: Optional[List[int]] = None
+    ) -> Dict[int, dict]:
+        """求解任务到专注循环的分配并生成任务信息
         
-        # 按开始时间排序
-        all_meetings.sort(key=lambda x: x.start)
+        done给出每个任务此前已安排的番茄钟数，会被原地累加，用于多天顺延。
+        """
+        assigner = TaskAssigner(self.config.assignment, focus_min)
+        totals = [assigner.demand(task) for task in tasks]
+        previous = done if done is not None else [0] * len(tasks)
+        remaining = [max(0, total - count) for total, count in zip(totals, previous)]
         
-        current_time = work_start
-        
-        for meeting in all_meetings:
-            if current_time < meeting.start:
-                slots.append((current_time, meeting.start))
-            current_time = max(current_time, meeting.end)
+        if self.config.assignment.enabled:
+            slots = [(cycle.focus_start, cycle.focus_end) for cycle in allocated]
+            slot_tasks = assigner.assign(tasks, slots, remaining).slot_tasks
+        else:
+            # 不使用求解器时按输入顺序依次填充
+            slot_tasks = [index for index, count in enumerate(remaining) for _ in range(count)][:len(allocated)]
+            slot_tasks += [None] * (len(allocated) - len(slot_tasks))
         
-        # 添加最后一个时间段
-        if current_time < work_end:
-            slots.append((current_time, work_end))
+        infos = {}
+        parts = number_parts(slot_tasks, dict(enumerate(previous)))
+        for cycle, part in zip(allocated, parts):
+            if part is None:
+                continue
+            index, number = part
+            subtask, focus_content = self._describe_task_part(tasks[index], number, totals[index])
+            infos[cycle.cycle_number] = {
+                'task_title': tasks[index].title,
+                'subtask': subtask,
+                'focus_content': focus_content
+            }
+            if done is not None:
+                done[index] += 1
         
-        return slots
+        return infos
     
-    def _auto_generate_task_mappings(self, tasks: List[Task], cycles: int) -> List[dict]:
+    def _get_lunch_interval(self) -> Tuple[int, int]:
+        """午休时段（当天分钟数）"""
+        lunch_start = time.fromisoformat(self.config.pomodoro.lunch_start)
+        lunch_end = time.fromisoformat(self.config.pomodoro.lunch_end)
+        return to_minutes(lunch_start), to_minutes(lunch_end)
+    
+    def _auto_generate_task_mappings(self, tasks: List[Task], cycles: int, focus_min: int) -> List[dict]:
         """自动生成任务映射"""
         from ..models.plan import PomodoroTaskMapping
         
         mappings = []
         
         # 保持任务原有顺序，不重新排序，因为用户已指定重点顺序
-        # 计算每个任务需要的番茄钟数量（每个番茄钟50分钟）
+        # 计算每个任务需要的番茄钟数量（按当前模式的专注时长）
         task_pomodoro_allocation = []
         for task in tasks:
             # 根据任务预计时间计算需要的番茄钟数量
-            pomodoro_count = max(1, round(task.est_min / 50))
+            pomodoro_count = max(1, round(task.est_min / focus_min))
             task_pomodoro_allocation.append({
                 'task': task,
                 'pomodoro_count': pomodoro_count,
@@ -183,29 +375,9 @@ class PomodoroScheduler:
                 current_task = task_info['task']
                 
                 # 根据任务时长和当前番茄钟生成子任务描述
-                if task_info['pomodoro_count'] == 1:
-                    # 单个番茄钟的任务
-                    subtask = current_task.title
-                    focus_content = f"完成整个任务：{current_task.title}"
-                elif task_info['pomodoro_count'] == 2:
-                    # 两个番茄钟的任务
-                    if current_task_pomodoro == 1:
-                        subtask = f"{current_task.title} - 第一阶段"
-                        focus_content = f"开始{current_task.title}的前半部分工作"
-                    else:
-                        subtask = f"{current_task.title} - 第二阶段"
-                        focus_content = f"完成{current_task.title}的后半部分工作"
-                else:
-                    # 多个番茄钟的任务
-                    subtask = f"{current_task.title} - 第{current_task_pomodoro}部分"
-                    focus_content = f"专注完成{current_task.title}的第{current_task_pomodoro}部分内容"
-                
-                # 处理子任务列表
-                if current_task.subtasks and len(current_task.subtasks) > 0:
-                    # 如果有预定义的子任务，按番茄钟顺序分配
-                    subtask_index = min(current_task_pomodoro - 1, len(current_task.subtasks) - 1)
-                    subtask = current_task.subtasks[subtask_index]
-                    focus_content = f"专注于：{subtask}"
+                subtask, focus_content = self._describe_task_part(
+                    current_task, current_task_pomodoro, task_info['pomodoro_count']
+                )
                 
                 mappings.append({
                     'pomodoro_number': cycle,
@@ -225,15 +397,38 @@ class PomodoroScheduler:
                     
             else:
                 # 所有主要任务都分配完了，使用剩余时间进行复习和优化
-                mappings.append({
-                    'pomodoro_number': cycle,
-                    'task_title': "任务复习与优化",
-                    'subtask': "回顾和完善已完成的工作",
-                    'focus_content': "检查工作质量，优化细节，处理遗留问题"
-                })
+                mappings.append({'pomodoro_number': cycle, **REVIEW_TASK_INFO})
         
         return mappings
     
+    def _describe_task_part(self, task: Task, part: int, total: int) -> Tuple[str, str]:
+        """生成任务第part个番茄钟（共total个）的子任务描述和专注要点"""
+        if total == 1:
+            # 单个番茄钟的任务
+            subtask = task.title
+            focus_content = f"完成整个任务：{task.title}"
+        elif total == 2:
+            # 两个番茄钟的任务
+            if part == 1:
+                subtask = f"{task.title} - 第一阶段"
+                focus_content = f"开始{task.title}的前半部分工作"
+            else:
+                subtask = f"{task.title} - 第二阶段"
+                focus_content = f"完成{task.title}的后半部分工作"
+        else:
+            # 多个番茄钟的任务
+            subtask = f"{task.title} - 第{part}部分"
+            focus_content = f"专注完成{task.title}的第{part}部分内容"
+        
+        # 处理子任务列表
+        if task.subtasks and len(task.subtasks) > 0:
+            # 如果有预定义的子任务，按番茄钟顺序分配
+            subtask_index = min(part - 1, len(task.subtasks) - 1)
+            subtask = task.subtasks[subtask_index]
+            focus_content = f"专注于：{subtask}"
+        
+        return subtask, focus_content
+    
     def _get_task_info_for_cycle(self, cycle_number: int, task_mappings: List) -> dict:
         """获取指定番茄钟循环的任务信息"""
         # 查找对应的任务映射
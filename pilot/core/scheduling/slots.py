@@ -0,0 +1,139 @@
+"""
+空闲时段分配
+
+扫描线合并会议、午休及其他不可用时段（O(n log n)），
+再把专注/休息循环依次装入剩余的空闲段。
+"""
+
+from datetime import time
+from typing import Iterable, List, Optional, Tuple
+
+from ..models.schedule import PomodoroType
+
+
+# 一天的分钟数
+DAY_MINUTES = 24 * 60
+
+Interval = Tuple[int, int]
+
+
+def to_minutes(value: time) -> int:
+    """时间转换为当天分钟数"""
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(minutes: int) -> time:
+    """当天分钟数转换为时间（超出当天的部分截断到23:59）"""
+    minutes = max(0, min(DAY_MINUTES - 1, minutes))
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """扫描线合并重叠或相邻的区间"""
+    merged: List[Interval] = []
+    for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_gaps(window_start: int, window_end: int, busy: Iterable[Interval]) -> List[Interval]:
+    """计算工作窗口内去除不可用时段后的空闲段"""
+    gaps = []
+    cursor = window_start
+    for start, end in merge_intervals(busy):
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
+
+
+class AllocatedCycle:
+    """分配结果：一轮专注及其后的休息"""
+    
+    __slots__ = ('cycle_number', 'focus_start', 'focus_end', 'break_start', 'break_end', 'break_type')
+    
+    def __init__(self, cycle_number: int, focus_start: int, focus_end: int):
+        self.cycle_number = cycle_number
+        self.focus_start = focus_start
+        self.focus_end = focus_end
+        self.break_start: Optional[int] = None
+        self.break_end: Optional[int] = None
+        self.break_type: Optional[PomodoroType] = None
+
+
+class SlotAllocator:
+    """把专注/休息循环装入空闲段"""
+    
+    def __init__(
+        self,
+        focus_min: int,
+        break_min: int,
+        long_break_min: int = 15,
+        long_break_every: int = 4,
+        partial_policy: str = "skip",
+        min_partial_focus_min: int = 25
+    ):
+        self.focus_min = focus_min
+        self.break_min = break_min
+        self.long_break_min = long_break_min
+        self.long_break_every = long_break_every
+        self.partial_policy = partial_policy
+        self.min_partial_focus_min = min(min_partial_focus_min, focus_min)
+    
+    def allocate(self, gaps: List[Interval], cycles: int, first_cycle: int = 1) -> List[AllocatedCycle]:
+        """按顺序分配专注循环
+        
+        每轮专注必须完整落在一个空闲段内（shrink策略下可缩短），
+        休息紧随专注，遇到空闲段结束则截断——不可用时段本身即可视为休息。
+        """
+        allocated: List[AllocatedCycle] = []
+        last_cycle = first_cycle + cycles - 1
+        gap_index = 0
+        cursor = gaps[0][0] if gaps else 0
+        cycle_number = first_cycle
+        
+        while cycle_number <= last_cycle and gap_index < len(gaps):
+            gap_start, gap_end = gaps[gap_index]
+            cursor = max(cursor, gap_start)
+            remaining = gap_end - cursor
+            
+            if remaining >= self.focus_min:
+                focus_len = self.focus_min
+            elif self.partial_policy == "shrink" and remaining >= self.min_partial_focus_min:
+                focus_len = remaining
+            else:
+                gap_index += 1
+                continue
+            
+            cycle = AllocatedCycle(cycle_number, cursor, cursor + focus_len)
+            cursor = cycle.focus_end
+            
+            if cycle_number < last_cycle and cursor < gap_end:
+                if self.long_break_every and cycle_number % self.long_break_every == 0:
+                    break_len, break_type = self.long_break_min, PomodoroType.LONG_BREAK
+                else:
+                    break_len, break_type = self.break_min, PomodoroType.SHORT_BREAK
+                cycle.break_start = cursor
+                cycle.break_end = min(gap_end, cursor + break_len)
+                cycle.break_type = break_type
+                cursor = cycle.break_end
+            
+            allocated.append(cycle)
+            cycle_number += 1
+        
+        # 空闲时间不足以排满所有轮数时，最后一轮之后不再安排休息
+        if allocated and allocated[-1].break_type is not None:
+            last = allocated[-1]
+            last.break_start = last.break_end = last.break_type = None
+        
+        return allocated
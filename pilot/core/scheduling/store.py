@@ -0,0 +1,121 @@
+"""
+日程存储
+
+每个用户每天的最终日程保存为一个JSON文件（~/.pilot/schedules/<用户>/<日期>.json），供日历订阅源等按日期范围读取。
+写入用atomic_write原子替换，目录的修改时间随之变化，读取方只需stat用户目录即可判断内容是否更新。
+"""
+
+import json
+import os
+import re
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from ...utils.atomic import atomic_write
+from ..models.schedule import ScheduleItem
+
+
+# 用户标识只允许出现在文件名中安全的字符
+_USER_RE = re.compile(r"^[A-Za-z0-9_.@-]{1,64}$")
+
+
+def is_valid_user(user_id: str) -> bool:
+    """用户标识能否作为目录名"""
+    return bool(_USER_RE.match(user_id)) and user_id not in ('.', '..')
+
+
+class ScheduleStore:
+    """按用户和日期保存日程"""
+    
+    def __init__(self, directory: str = "~/.pilot/schedules"):
+        self.directory = Path(directory).expanduser()
+    
+    def save_day(self, user_id: str, target_date: date, schedule: List[ScheduleItem]):
+        """保存某天的日程（覆盖）"""
+        path = self._day_path(user_id, target_date)
+        previous = self.version(user_id)
+        data = json.dumps([item.model_dump(mode='json') for item in schedule], ensure_ascii=False)
+        with atomic_write(path) as f:
+            f.write(data.encode('utf-8'))
+        self._bump(path.parent, previous)
+    
+    def remove_day(self, user_id: str, target_date: date) -> bool:
+        """删除某天的日程"""
+        path = self._day_path(user_id, target_date)
+        if not path.exists():
+            return False
+        previous = self.version(user_id)
+        path.unlink()
+        self._bump(path.parent, previous)
+        return True
+    
+    def load_day(self, user_id: str, target_date: date) -> Optional[List[ScheduleItem]]:
+        """读取某天的日程，不存在时返回None"""
+        path = self._day_path(user_id, target_date)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return [ScheduleItem.model_validate(item) for item in json.load(f)]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 日程读取失败 {path}: {str(e)}")
+            return None
+    
+    def iter_range(self, user_id: str, start: date, end: date) -> Iterator[Tuple[date, ScheduleItem]]:
+        """按日期顺序列出 [start, end] 内已保存的全部条目"""
+        for target_date in self.dates(user_id, start, end):
+            for item in self.load_day(user_id, target_date) or []:
+                yield target_date, item
+    
+    def dates(self, user_id: str, start: date, end: date) -> List[date]:
+        """[start, end] 内有日程的日期"""
+        user_dir = self._user_dir(user_id)
+        if (end - start).days < 62:
+            # 范围较小时直接按日期检查，不列目录
+            days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+            return [day for day in days if (user_dir / f"{day.isoformat()}.json").exists()]
+        
+        found = []
+        try:
+            names = [entry.name for entry in user_dir.iterdir()]
+        except FileNotFoundError:
+            return []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                day = date.fromisoformat(name[:-5])
+            except ValueError:
+                continue
+            if start <= day <= end:
+                found.append(day)
+        return sorted(found)
+    
+    def users(self) -> List[str]:
+        """有日程的用户"""
+        if not self.directory.exists():
+            return []
+        return sorted(entry.name for entry in self.directory.iterdir() if entry.is_dir() and is_valid_user(entry.name))
+    
+    def version(self, user_id: str) -> int:
+        """用户日程的版本号（目录修改时间，纳秒）；用户不存在时为0"""
+        try:
+            return self._user_dir(user_id).stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+    
+    @staticmethod
+    def _bump(user_dir: Path, previous: int):
+        """保证目录修改时间严格递增（文件系统时间精度较粗时，连续两次写入的修改时间可能相同）"""
+        stamp = max(time.time_ns(), previous + 1)
+        os.utime(user_dir, ns=(stamp, stamp))
+    
+    def _user_dir(self, user_id: str) -> Path:
+        if not is_valid_user(user_id):
+            raise ValueError(f"无效的用户标识: {user_id}")
+        return self.directory / user_id
+    
+    def _day_path(self, user_id: str, target_date: date) -> Path:
+        return self._user_dir(user_id) / f"{target_date.isoformat()}.json"
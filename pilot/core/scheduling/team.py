@@ -0,0 +1,212 @@
+"""
+团队共同空闲时段
+
+汇总多人的忙碌区间、工作窗口和时区，找出所有人都空闲且不短于指定时长的时段，
+用于保护团队的"无会议专注块"或寻找会议时间。
+
+每个成员的不可用区间（忙碌 + 工作窗口之外 + 非工作日）先各自按时间排序，
+再用heapq.merge做k路归并，一次扫描线求并集，复杂度 O(N log k)。
+"""
+
+import heapq
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pytz
+from pydantic import BaseModel, Field
+
+from ..models.plan import TimeSlot
+
+
+# 用UTC分钟数（epoch分钟）表示的区间
+EpochInterval = Tuple[int, int]
+
+
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def _epoch_minutes(value: datetime) -> int:
+    """带时区的时间转换为epoch分钟"""
+    return int(value.timestamp()) // 60
+
+
+@lru_cache(maxsize=8192)
+def _utc_offset_minutes(zone: str, day: date) -> int:
+    """某时区某天（按当天正午）的UTC偏移分钟数，避免对每个时间点调用pytz.localize"""
+    return int(pytz.timezone(zone).localize(datetime.combine(day, time(12))).utcoffset().total_seconds()) // 60
+
+
+def local_epoch_minutes(zone: str, day: date, clock: time) -> int:
+    """某时区的当地日期和时间转换为epoch分钟"""
+    return (day - EPOCH_DATE).days * 1440 + clock.hour * 60 + clock.minute - _utc_offset_minutes(zone, day)
+
+
+class BusyInterval(BaseModel):
+    """忙碌区间（无时区信息时按成员时区解释）"""
+    start: datetime
+    end: datetime
+
+
+class TeamMember(BaseModel):
+    """团队成员"""
+    name: str
+    timezone: str = "Asia/Shanghai"
+    work_window_start: time = time(9, 0)
+    work_window_end: time = time(18, 0)
+    workdays: List[int] = Field(default_factory=lambda: [0, 1, 2, 3, 4], description="工作日（0=周一）")
+    busy: List[BusyInterval] = Field(default_factory=list)
+    
+    def add_slots(self, target_date: date, slots: List[TimeSlot]):
+        """把某天的会议时间段加入忙碌区间（结束早于开始时视为跨午夜，结束在次日）"""
+        for slot in slots:
+            end_date = target_date + timedelta(days=1) if slot.end < slot.start else target_date
+            self.busy.append(BusyInterval(
+                start=datetime.combine(target_date, slot.start),
+                end=datetime.combine(end_date, slot.end)
+            ))
+    
+    def unavailable(self, start_date: date, end_date: date) -> List[EpochInterval]:
+        """日期范围内按时间排序的不可用区间"""
+        def to_epoch(value: datetime) -> int:
+            if value.tzinfo is None:
+                return local_epoch_minutes(self.timezone, value.date(), value.time())
+            return _epoch_minutes(value)
+        
+        intervals = [(to_epoch(item.start), to_epoch(item.end)) for item in self.busy]
+        
+        # 工作窗口之外及非工作日视为不可用（前后各多取一天，覆盖时区偏移）
+        current = start_date - timedelta(days=1)
+        while current <= end_date + timedelta(days=1):
+            day_start = local_epoch_minutes(self.timezone, current, time.min)
+            day_end = day_start + 1440
+            if current.weekday() in self.workdays:
+                work_start = local_epoch_minutes(self.timezone, current, self.work_window_start)
+                work_end = local_epoch_minutes(self.timezone, current, self.work_window_end)
+                intervals.append((day_start, work_start))
+                intervals.append((work_end, day_end))
+            else:
+                intervals.append((day_start, day_end))
+            current += timedelta(days=1)
+        
+        intervals.sort()
+        return intervals
+
+
+class CommonWindow(BaseModel):
+    """共同空闲时段"""
+    start: datetime
+    end: datetime
+    duration_min: int
+    suggested_start: datetime = Field(description="窗口内居中放置所需时长时的开始时间")
+    suggested_end: datetime
+    margin_min: int = Field(description="建议时段距任一成员工作窗口边缘的最小分钟数，越大越不会压到某人的上下班时间")
+    local_times: Dict[str, str] = Field(default_factory=dict, description="各成员当地时间")
+
+
+def merge_busy(sorted_lists: List[List[EpochInterval]]) -> Iterator[EpochInterval]:
+    """k路归并多个已排序的区间列表，产出合并后的忙碌并集"""
+    current_start: Optional[int] = None
+    current_end: Optional[int] = None
+    for start, end in heapq.merge(*sorted_lists):
+        if end <= start:
+            continue
+        if current_start is None:
+            current_start, current_end = start, end
+        elif start <= current_end:
+            current_end = max(current_end, end)
+        else:
+            yield current_start, current_end
+            current_start, current_end = start, end
+    if current_start is not None:
+        yield current_start, current_end
+
+
+class TeamSlotFinder:
+    """团队共同空闲时段查找"""
+    
+    def __init__(self, members: List[TeamMember], timezone: str = "Asia/Shanghai"):
+        self.members = members
+        self.timezone = pytz.timezone(timezone)
+    
+    def find_common_windows(
+        self,
+        start_date: date,
+        end_date: date,
+        duration_min: int,
+        limit: Optional[int] = 10,
+        rank: str = "margin"
+    ) -> List[CommonWindow]:
+        """查找日期范围内所有成员共同空闲、不短于duration_min的时段
+        
+        Args:
+            start_date: 开始日期（含，按团队时区）
+            end_date: 结束日期（含，按团队时区）
+            duration_min: 需要的时长（分钟）
+            limit: 返回数量上限，None表示全部
+            rank: 排序方式——margin优先不压到任何人上下班边缘，length优先更长的时段，earliest按时间先后
+        """
+        if not self.members or end_date < start_date:
+            return []
+        
+        range_start = local_epoch_minutes(self.timezone.zone, start_date, time.min)
+        range_end = local_epoch_minutes(self.timezone.zone, end_date + timedelta(days=1), time.min)
+        
+        busy = merge_busy([member.unavailable(start_date, end_date) for member in self.members])
+        
+        windows = []
+        cursor = range_start
+        for start, end in busy:
+            if end <= cursor:
+                continue
+            if start >= range_end:
+                break
+            if start - cursor >= duration_min:
+                windows.append((cursor, start))
+            cursor = max(cursor, end)
+        if range_end - cursor >= duration_min:
+            windows.append((cursor, range_end))
+        
+        results = [self._build_window(start, end, duration_min) for start, end in windows]
+        if rank == "length":
+            results.sort(key=lambda item: (-item.duration_min, item.start))
+        elif rank == "margin":
+            results.sort(key=lambda item: (-item.margin_min, -item.duration_min, item.start))
+        
+        return results if limit is None else results[:limit]
+    
+    def _build_window(self, start: int, end: int, duration_min: int) -> CommonWindow:
+        """构造结果并计算各成员当地时间和建议时段的边缘余量"""
+        start_utc = datetime.fromtimestamp(start * 60, tz=pytz.utc)
+        end_utc = datetime.fromtimestamp(end * 60, tz=pytz.utc)
+        slot_start = start + (end - start - duration_min) // 2
+        slot_end = slot_start + duration_min
+        
+        margin = None
+        local_times = {}
+        # 同一时区、同一工作窗口的成员结果相同，只计算一次
+        by_profile: Dict[Tuple[str, time, time], Tuple[str, int]] = {}
+        for member in self.members:
+            profile = (member.timezone, member.work_window_start, member.work_window_end)
+            if profile not in by_profile:
+                tz = pytz.timezone(member.timezone)
+                local_start = start_utc.astimezone(tz)
+                local_end = end_utc.astimezone(tz)
+                work_start = local_epoch_minutes(member.timezone, local_start.date(), member.work_window_start)
+                work_end = local_epoch_minutes(member.timezone, local_start.date(), member.work_window_end)
+                by_profile[profile] = (
+                    f"{local_start.strftime('%m-%d %H:%M')}-{local_end.strftime('%H:%M')}",
+                    min(slot_start - work_start, work_end - slot_end)
+                )
+            local_times[member.name], member_margin = by_profile[profile]
+            margin = member_margin if margin is None else min(margin, member_margin)
+        
+        return CommonWindow(
+            start=start_utc.astimezone(self.timezone),
+            end=end_utc.astimezone(self.timezone),
+            duration_min=end - start,
+            suggested_start=datetime.fromtimestamp(slot_start * 60, tz=pytz.utc).astimezone(self.timezone),
+            suggested_end=datetime.fromtimestamp(slot_end * 60, tz=pytz.utc).astimezone(self.timezone),
+            margin_min=max(0, margin or 0),
+            local_times=local_times
+        )
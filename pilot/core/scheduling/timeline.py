@@ -0,0 +1,95 @@
+"""
+整数分钟时间线
+
+调度器内部使用的紧凑条目：起止时间为当天分钟数（跨午夜时结束值大于1440），
+用__slots__存储，不做校验，排序和加减都是整数运算。
+只在调度结果返回给调用方时才转换为Pydantic的ScheduleItem。
+"""
+
+from datetime import time
+from typing import Iterable, List
+
+from ..models.schedule import ScheduleItem, PomodoroType
+from .slots import DAY_MINUTES, to_minutes
+
+
+def clock(minutes: int) -> time:
+    """分钟数转换为时钟时间（超过一天的部分回绕）"""
+    minutes %= DAY_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+class TimelineEntry:
+    """时间线条目"""
+    
+    __slots__ = ('start', 'end', 'kind', 'title', 'slot_id', 'cycle_number', 'task_title', 'subtask', 'focus_content')
+    
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        kind: PomodoroType,
+        title: str,
+        slot_id: str = "",
+        cycle_number: int = 0,
+        task_title: str = "",
+        subtask: str = "",
+        focus_content: str = ""
+    ):
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.title = title
+        self.slot_id = slot_id
+        self.cycle_number = cycle_number
+        self.task_title = task_title
+        self.subtask = subtask
+        self.focus_content = focus_content
+    
+    @property
+    def duration(self) -> int:
+        """时长（分钟）"""
+        return self.end - self.start
+    
+    def moved(self, start: int, end: int) -> "TimelineEntry":
+        """复制到新的起止时间，其余字段不变"""
+        return TimelineEntry(
+            start, end, self.kind, self.title, self.slot_id, self.cycle_number,
+            self.task_title, self.subtask, self.focus_content
+        )
+    
+    def to_item(self) -> ScheduleItem:
+        """转换为ScheduleItem"""
+        return ScheduleItem(
+            title=self.title,
+            start_time=clock(self.start),
+            end_time=clock(self.end),
+            type=self.kind,
+            task_title=self.task_title,
+            subtask=self.subtask,
+            focus_content=self.focus_content,
+            cycle_number=self.cycle_number,
+            slot_id=self.slot_id
+        )
+    
+    @classmethod
+    def from_item(cls, item: ScheduleItem) -> "TimelineEntry":
+        """从ScheduleItem转换，结束早于开始时视为跨午夜"""
+        start = to_minutes(item.start_time)
+        end = to_minutes(item.end_time)
+        if end < start:
+            end += DAY_MINUTES
+        return cls(
+            start, end, item.type, item.title, item.slot_id, item.cycle_number,
+            item.task_title, item.subtask, item.focus_content
+        )
+
+
+def to_items(entries: Iterable[TimelineEntry]) -> List[ScheduleItem]:
+    """按开始时间排序后转换为ScheduleItem列表"""
+    return [entry.to_item() for entry in sorted(entries, key=lambda entry: entry.start)]
+
+
+def from_items(items: Iterable[ScheduleItem]) -> List[TimelineEntry]:
+    """ScheduleItem列表转换为时间线条目"""
+    return [TimelineEntry.from_item(item) for item in items]
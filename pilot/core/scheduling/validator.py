@@ -0,0 +1,182 @@
+"""
+日程校验
+
+检查番茄钟日程的不变量：条目时长为正、互不重叠、专注和休息落在工作窗口内、
+专注不与会议交叉、相邻两轮专注之间有休息、同一天的轮次编号递增且slot_id不重复。
+每天的条目按开始时间排序后线性扫描，会议合并后与专注做双指针比对，整体 O(n log n)，
+多周、上万条的日程也可以在导出前逐条校验。
+"""
+
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..models.plan import PlanInput, TimeSlot
+from ..models.schedule import ScheduleItem, PomodoroType
+from .slots import merge_intervals, to_minutes
+from .timeline import TimelineEntry, clock, from_items
+
+
+# 必须落在工作窗口内的条目类型（午休和临时事项不受窗口限制）
+WINDOWED_TYPES = frozenset([PomodoroType.FOCUS, PomodoroType.SHORT_BREAK, PomodoroType.LONG_BREAK])
+
+
+class ScheduleViolation(BaseModel):
+    """日程违规项"""
+    code: Literal[
+        "invalid_duration", "overlap", "outside_window", "meeting_conflict",
+        "missing_break", "cycle_order", "duplicate_slot"
+    ] = Field(description="违规类型")
+    severity: Literal["error", "warning"] = "error"
+    message: str
+    slot_id: str = Field(default="", description="涉及的条目标识")
+    day: Optional[date] = Field(default=None, description="多天日程中所在的日期")
+    start: Optional[time] = Field(default=None, description="涉及条目的开始时间")
+
+
+class ScheduleValidator:
+    """日程校验器"""
+    
+    def validate(
+        self,
+        schedule: List[ScheduleItem],
+        plan_input: Optional[PlanInput] = None,
+        meetings: Optional[List[TimeSlot]] = None,
+        day: Optional[date] = None
+    ) -> List[ScheduleViolation]:
+        """校验单日日程
+        
+        Args:
+            schedule: 日程条目（无需预先排序）
+            plan_input: 提供工作窗口和会议；缺省时不检查窗口和会议
+            meetings: 需要避开的会议，优先于plan_input中的会议
+            day: 写入违规项的日期
+        """
+        window = None
+        if plan_input is not None:
+            window = (to_minutes(plan_input.work_window_start), to_minutes(plan_input.work_window_end))
+            if meetings is None:
+                meetings = plan_input.meetings
+        busy = [(to_minutes(meeting.start), to_minutes(meeting.end)) for meeting in meetings or []]
+        return self._check_day(from_items(schedule), window, merge_intervals(busy), day)
+    
+    def validate_range(
+        self,
+        dated_items: Iterable[Tuple[date, ScheduleItem]],
+        plan_input: Optional[PlanInput] = None,
+        meetings_by_date: Optional[Dict[date, List[TimeSlot]]] = None
+    ) -> List[ScheduleViolation]:
+        """校验多天日程（如schedule_range的产出），按日期分组后逐天检查
+        
+        plan_input的工作窗口作用于每一天，其会议只作用于plan_input.date当天。
+        """
+        by_day: Dict[date, List[TimelineEntry]] = defaultdict(list)
+        for day, item in dated_items:
+            by_day[day].append(TimelineEntry.from_item(item))
+        
+        window = None
+        if plan_input is not None:
+            window = (to_minutes(plan_input.work_window_start), to_minutes(plan_input.work_window_end))
+        
+        violations = []
+        for day in sorted(by_day):
+            if meetings_by_date is not None and day in meetings_by_date:
+                meetings = meetings_by_date[day]
+            elif plan_input is not None and plan_input.date == day:
+                meetings = plan_input.meetings
+            else:
+                meetings = []
+            busy = merge_intervals((to_minutes(meeting.start), to_minutes(meeting.end)) for meeting in meetings)
+            violations.extend(self._check_day(by_day[day], window, busy, day))
+        return violations
+    
+    def _check_day(
+        self,
+        entries: List[TimelineEntry],
+        window: Optional[Tuple[int, int]],
+        busy: List[Tuple[int, int]],
+        day: Optional[date]
+    ) -> List[ScheduleViolation]:
+        """校验一天的条目；busy为已合并、按时间排序的会议区间"""
+        violations: List[ScheduleViolation] = []
+        
+        def report(code: str, entry: TimelineEntry, message: str, severity: str = "error"):
+            violations.append(ScheduleViolation(
+                code=code,
+                severity=severity,
+                message=message,
+                slot_id=entry.slot_id,
+                day=day,
+                start=clock(entry.start)
+            ))
+        
+        entries.sort(key=lambda entry: (entry.start, entry.end))
+        
+        seen_slots = set()
+        latest: Optional[TimelineEntry] = None  # 已扫描条目中结束最晚的
+        previous_focus: Optional[TimelineEntry] = None
+        rest_since_focus = False  # 上一轮专注之后是否出现过休息、午休或其他条目
+        meeting_index = 0
+        
+        for entry in entries:
+            label = entry.title or entry.slot_id
+            
+            if entry.end <= entry.start:
+                report("invalid_duration", entry, f"{label} 的结束时间不晚于开始时间")
+                continue
+            
+            if entry.slot_id:
+                if entry.slot_id in seen_slots:
+                    report("duplicate_slot", entry, f"slot_id {entry.slot_id} 重复")
+                seen_slots.add(entry.slot_id)
+            
+            if latest is not None and entry.start < latest.end:
+                report(
+                    "overlap", entry,
+                    f"{label}（{clock(entry.start):%H:%M}）与 {latest.title or latest.slot_id}"
+                    f"（{clock(latest.start):%H:%M}-{clock(latest.end):%H:%M}）重叠"
+                )
+            
+            if window is not None and entry.kind in WINDOWED_TYPES and (entry.start < window[0] or entry.end > window[1]):
+                report(
+                    "outside_window", entry,
+                    f"{label}（{clock(entry.start):%H:%M}-{clock(entry.end):%H:%M}）超出工作窗口"
+                    f" {clock(window[0]):%H:%M}-{clock(window[1]):%H:%M}"
+                )
+            
+            if entry.kind == PomodoroType.FOCUS:
+                # 会议按时间排序，跳过已结束于本轮专注之前的会议
+                while meeting_index < len(busy) and busy[meeting_index][1] <= entry.start:
+                    meeting_index += 1
+                if meeting_index < len(busy) and busy[meeting_index][0] < entry.end:
+                    meeting_start, meeting_end = busy[meeting_index]
+                    report(
+                        "meeting_conflict", entry,
+                        f"{label} 与会议 {clock(meeting_start):%H:%M}-{clock(meeting_end):%H:%M} 交叉"
+                    )
+                
+                if previous_focus is not None:
+                    if entry.cycle_number <= previous_focus.cycle_number:
+                        report(
+                            "cycle_order", entry,
+                            f"轮次编号 #{entry.cycle_number} 未按时间递增（前一轮为 #{previous_focus.cycle_number}）",
+                            severity="warning"
+                        )
+                    if not rest_since_focus and entry.start == previous_focus.end:
+                        report("missing_break", entry, f"{label} 与上一轮专注之间没有休息")
+                previous_focus = entry
+                rest_since_focus = False
+            else:
+                rest_since_focus = True
+            
+            if latest is None or entry.end > latest.end:
+                latest = entry
+        
+        return violations
+
+
+def has_errors(violations: Iterable[ScheduleViolation]) -> bool:
+    """是否存在错误级别的违规"""
+    return any(violation.severity == "error" for violation in violations)
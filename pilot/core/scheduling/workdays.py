@@ -0,0 +1,115 @@
+"""
+工作日日历
+
+按本地数据文件判断某天是否上班：法定节假日休息、调休补班日上班，其余按周末规则。
+数据随包发布并带版本号，可用 ~/.pilot/workdays.json 覆盖或补充（格式相同）。
+节假日和补班日展开为按日期索引的字典，单日查询O(1)。
+"""
+
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..models.config import WorkdayConfig
+
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def _expand_range(start: str, end: str) -> Iterator[date]:
+    """展开闭区间内的每一天"""
+    current = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    while current <= last:
+        yield current
+        current += timedelta(days=1)
+
+
+class WorkdayCalendar:
+    """工作日日历"""
+    
+    def __init__(self, weekend: Optional[List[int]] = None):
+        self.weekend = frozenset(weekend if weekend is not None else [5, 6])
+        self.versions: List[str] = []
+        # 日期 -> (是否上班, 节日名称)
+        self._overrides: Dict[date, Tuple[bool, str]] = {}
+    
+    @classmethod
+    def from_config(cls, config: WorkdayConfig) -> "WorkdayCalendar":
+        """按配置加载内置数据和用户覆盖文件"""
+        calendar = cls(config.weekend)
+        if not config.enabled:
+            return calendar
+        
+        builtin = DATA_DIR / f"workdays_{config.region.lower()}.json"
+        if builtin.exists():
+            calendar.load(builtin)
+        
+        override = Path(config.override_path).expanduser()
+        if override.exists():
+            try:
+                calendar.load(override)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ 工作日覆盖文件读取失败: {e}")
+        return calendar
+    
+    def load(self, path: Path):
+        """加载数据文件，后加载的覆盖先加载的同日期记录"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        for holidays in data.get('years', {}).values():
+            for holiday in holidays:
+                name = holiday.get('name', '')
+                if holiday.get('off'):
+                    start, end = holiday['off']
+                    for day in _expand_range(start, end):
+                        self._overrides[day] = (False, name)
+                for day in holiday.get('work', []):
+                    self._overrides[date.fromisoformat(day)] = (True, f"{name}补班")
+        
+        self.versions.append(f"{data.get('region', '')}@{data.get('version', 'unknown')}")
+    
+    def is_workday(self, day: date) -> bool:
+        """是否上班"""
+        override = self._overrides.get(day)
+        if override is not None:
+            return override[0]
+        return day.weekday() not in self.weekend
+    
+    def describe(self, day: date) -> str:
+        """当天的类型说明（节日名、补班或周末）"""
+        override = self._overrides.get(day)
+        if override is not None:
+            return override[1]
+        return "周末" if day.weekday() in self.weekend else "工作日"
+    
+    def next_workdays(self, start: date, count: int) -> Iterator[date]:
+        """从start（含）起依次产出count个工作日"""
+        current = start
+        # 最长假期加周末不会超过两周，防止数据异常时死循环
+        idle_limit = 30
+        idle = 0
+        while count > 0 and idle < idle_limit:
+            if self.is_workday(current):
+                yield current
+                count -= 1
+                idle = 0
+            else:
+                idle += 1
+            current += timedelta(days=1)
+    
+    def next_workday(self, start: date) -> Optional[date]:
+        """start（含）之后的第一个工作日"""
+        return next(self.next_workdays(start, 1), None)
+    
+    def workdays_between(self, start: date, end: date) -> List[date]:
+        """闭区间内的所有工作日"""
+        days = []
+        current = start
+        while current <= end:
+            if self.is_workday(current):
+                days.append(current)
+            current += timedelta(days=1)
+        return days
@@ -3,7 +3,22 @@
 """
 
 from .ics_manager import ICSCalendarManager
+from .ics_bulk import BulkICSExporter, BulkExportJob, BulkExportResult
+from .feed_server import FeedServer
+from .google_calendar import GoogleCalendarManager
+from .ics_reader import ICSBusyImporter
+from .ics_state import ExportState, event_uid
+from .ics_writer import ICSStreamWriter
 
 __all__ = [
     'ICSCalendarManager',
+    'BulkICSExporter',
+    'BulkExportJob',
+    'BulkExportResult',
+    'ICSBusyImporter',
+    'FeedServer',
+    'GoogleCalendarManager',
+    'ICSStreamWriter',
+    'ExportState',
+    'event_uid',
 ]
@@ -0,0 +1,268 @@
+"""
+ICS日历订阅源
+
+`pilot serve-ics` 启动的本地HTTP服务，日历应用订阅URL即可获取保存在ScheduleStore中的日程，
+不需要生成文件再手动打开，无界面的服务器和手机也能使用：
+    
+    GET /feeds/<用户>.ics                         默认范围：过去past_days天到未来future_days天
+    GET /feeds/<用户>.ics?start=2026-03-01&end=2026-03-31
+    GET /feeds/<用户>.ics?past=0&future=7
+
+订阅源正文只在日程变化时生成一次：以 (用户, 起止日期) 为键缓存正文、gzip压缩后的正文和ETag，
+每个请求只stat一次用户目录比较版本号。客户端带 If-None-Match / If-Modified-Since 轮询时内容未变直接返回304，
+数千个轮询的客户端几乎不产生开销。
+"""
+
+import gzip
+import hashlib
+import hmac
+import io
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pytz
+
+from ...core.models.config import ExportsConfig, FeedConfig
+from ...core.scheduling.store import ScheduleStore, is_valid_user
+from .ics_state import event_uid
+from .ics_writer import ICSStreamWriter
+
+
+FEED_PREFIX = "/feeds/"
+FEED_SUFFIX = ".ics"
+
+
+class FeedEntry:
+    """已生成的订阅源"""
+    __slots__ = ('version', 'body', 'gzipped', 'etag', 'last_modified', 'modified_at', 'count')
+    
+    def __init__(self, version: int, body: bytes, count: int):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.modified_at = version // 1_000_000_000
+        self.last_modified = formatdate(self.modified_at, usegmt=True)
+        self.count = count
+
+
+class FeedCache:
+    """按 (用户, 起止日期) 缓存订阅源，用户日程版本变化时才重新生成"""
+    
+    def __init__(self, store: ScheduleStore, timezone: str, max_entries: int = 256, exports: Optional[ExportsConfig] = None):
+        self.store = store
+        self.timezone = timezone
+        self.max_entries = max_entries
+        self.exports = exports or ExportsConfig()
+        self._entries: "OrderedDict[Tuple[str, date, date], FeedEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_locks: Dict[Tuple[str, date, date], threading.Lock] = {}
+        self.renders = 0
+    
+    def get(self, user_id: str, start: date, end: date) -> FeedEntry:
+        """取订阅源，缓存过期时生成；同一订阅源同时只生成一次"""
+        key = (user_id, start, end)
+        version = self.store.version(user_id)
+        entry = self._lookup(key, version)
+        if entry is not None:
+            return entry
+        
+        with self._lock:
+            render_lock = self._render_locks.setdefault(key, threading.Lock())
+        with render_lock:
+            # 等锁期间其他线程可能已生成
+            entry = self._lookup(key, version)
+            if entry is None:
+                entry = self.render(user_id, start, end, version)
+                with self._lock:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._render_locks.pop(evicted, None)
+        return entry
+    
+    def render(self, user_id: str, start: date, end: date, version: int) -> FeedEntry:
+        """生成订阅源正文
+        
+        版本号在读取日程之前取得：生成期间若有写入，下一个请求会看到更新的版本号并重新生成。
+        DTSTAMP取版本时间，同一版本的正文（以及ETag）在服务重启后保持不变。
+        """
+        stream = io.BytesIO()
+        now = datetime.fromtimestamp(version / 1e9, pytz.utc)
+        calname = f"🍅 P.I.L.O.T. 番茄钟计划 - {user_id}"
+        with ICSStreamWriter(
+            stream, self.timezone, calname, now=now,
+            profile=self.exports.ics_profile, alarm_limits=self.exports.alarm_limits
+        ) as writer:
+            for item_date, item in self.store.iter_range(user_id, start, end):
+                writer.write_event(item_date, item, uid=event_uid(user_id, item_date, item))
+        self.renders += 1
+        return FeedEntry(version, stream.getvalue(), writer.count)
+    
+    def _lookup(self, key: Tuple[str, date, date], version: int) -> Optional[FeedEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    """订阅源请求处理"""
+    protocol_version = "HTTP/1.1"
+    server_version = "PILOT-Feed/1.0"
+    
+    def do_GET(self):
+        self._serve(send_body=True)
+    
+    def do_HEAD(self):
+        self._serve(send_body=False)
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+    
+    def _serve(self, send_body: bool):
+        url = urlsplit(self.path)
+        if not (url.path.startswith(FEED_PREFIX) and url.path.endswith(FEED_SUFFIX)):
+            self._send_error(404, "not found")
+            return
+        user_id = unquote(url.path[len(FEED_PREFIX):-len(FEED_SUFFIX)])
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        
+        config: FeedConfig = self.server.config
+        if config.token and not hmac.compare_digest(query.get('token', ''), config.token):
+            self._send_error(403, "invalid token")
+            return
+        if not is_valid_user(user_id) or not self.server.store.version(user_id):
+            self._send_error(404, "unknown user")
+            return
+        
+        try:
+            start, end = self._resolve_range(query, config)
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        
+        entry = self.server.feeds.get(user_id, start, end)
+        headers = {
+            'ETag': entry.etag,
+            'Last-Modified': entry.last_modified,
+            'Cache-Control': f"max-age={config.max_age_seconds}",
+            'Vary': 'Accept-Encoding',
+        }
+        
+        if self._not_modified(entry):
+            self._send(304, headers, b"", send_body=False)
+            return
+        
+        headers['Content-Type'] = 'text/calendar; charset=utf-8'
+        headers['Content-Disposition'] = f'inline; filename="{user_id}.ics"'
+        if _accepts_gzip(self.headers.get('Accept-Encoding', '')):
+            headers['Content-Encoding'] = 'gzip'
+            body = entry.gzipped
+        else:
+            body = entry.body
+        self._send(200, headers, body, send_body)
+    
+    def _resolve_range(self, query: Dict[str, str], config: FeedConfig) -> Tuple[date, date]:
+        """请求的日期范围：start/end，或相对今天的past/future"""
+        today = datetime.now(pytz.timezone(self.server.timezone)).date()
+        try:
+            if 'start' in query or 'end' in query:
+                start = date.fromisoformat(query['start']) if 'start' in query else today - timedelta(days=config.past_days)
+                end = date.fromisoformat(query['end']) if 'end' in query else start + timedelta(days=config.future_days)
+            else:
+                start = today - timedelta(days=int(query.get('past', config.past_days)))
+                end = today + timedelta(days=int(query.get('future', config.future_days)))
+        except (ValueError, OverflowError):
+            raise ValueError("invalid date range")
+        if end < start:
+            raise ValueError("end is before start")
+        if (end - start).days + 1 > config.max_range_days:
+            raise ValueError(f"range exceeds {config.max_range_days} days")
+        return start, end
+    
+    def _not_modified(self, entry: FeedEntry) -> bool:
+        """条件请求是否命中（If-None-Match优先于If-Modified-Since）"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return any(tag == '*' or tag.removeprefix('W/') == entry.etag for tag in tags)
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return since.timestamp() >= entry.modified_at
+        return False
+    
+    def _send(self, status: int, headers: Dict[str, str], body: bytes, send_body: bool):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+    
+    def _send_error(self, status: int, message: str):
+        body = f"{message}\n".encode()
+        self._send(status, {'Content-Type': 'text/plain; charset=utf-8'}, body, send_body=self.command != 'HEAD')
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding中是否接受gzip（q=0表示拒绝）"""
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+class FeedServer(ThreadingHTTPServer):
+    """日历订阅源HTTP服务"""
+    daemon_threads = True
+    
+    def __init__(
+        self,
+        config: FeedConfig,
+        timezone: str,
+        store: Optional[ScheduleStore] = None,
+        verbose: bool = False,
+        exports: Optional[ExportsConfig] = None
+    ):
+        """exports提供事件内容配置（ics_profile/alarm_limits），与文件导出一致"""
+        self.config = config
+        self.timezone = timezone
+        self.store = store or ScheduleStore(config.store_dir)
+        self.feeds = FeedCache(self.store, timezone, config.cache_entries, exports)
+        self.verbose = verbose
+        super().__init__((config.host, config.port), FeedRequestHandler)
+    
+    def feed_url(self, user_id: str) -> str:
+        """用户的订阅地址"""
+        host, port = self.server_address[:2]
+        if host in ('0.0.0.0', ''):
+            host = '127.0.0.1'
+        token = f"?token={self.config.token}" if self.config.token else ""
+        return f"http://{host}:{port}{FEED_PREFIX}{user_id}{FEED_SUFFIX}{token}"
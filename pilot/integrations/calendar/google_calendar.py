@@ -0,0 +1,403 @@
+"""
+Google Calendar 集成
+
+- 事件ID由 (用户, 日期, 时段标识) 生成（uuid5的十六进制，符合Google对自定义ID的base32hex要求），
+  同一天重新同步时直接按ID对比，只插入、更新、删除有变化的事件
+- 所有写操作通过批量请求发送，每批最多batch_size个子请求，一天的日程通常只需一次HTTP往返；
+  限流（429，或原因为rateLimitExceeded/userRateLimitExceeded的403）和服务端错误（5xx）的子请求按轮次退避重试
+- 事件内容的哈希保存在私有扩展属性中，比较时不需要逐字段解析Google返回的时间格式
+- 番茄钟事件标记为"空闲"（transparency=transparent），查询忙碌时间时不会把自己的计划当成会议
+- 忙碌时间用freebusy一次查询整个日期范围并按天缓存，规划多天时不重复请求
+- 授权后的HTTP会话按令牌文件在进程内复用，令牌刷新后写回文件
+"""
+
+import hashlib
+import json
+import time as clock
+import uuid
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import google_auth_httplib2
+import httplib2
+import pytz
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from pydantic import BaseModel, Field
+
+from ...interfaces.calendar import CalendarInterface
+from ...core.models.config import PilotConfig
+from ...core.models.plan import TimeSlot
+from ...core.models.schedule import ScheduleItem
+from ...core.scheduling.diff import item_key
+from ...core.scheduling.slots import merge_intervals
+from .ics_state import PILOT_NAMESPACE, resolve_user_id
+from .ics_writer import event_description, event_summary, reminder_offsets
+
+
+# 可以重试的HTTP状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 403中表示限流、可以重试的错误原因（其余403如权限不足重试也不会成功）
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# freebusy单次查询的最大天数
+FREEBUSY_MAX_DAYS = 60
+
+
+class GoogleSyncResult(BaseModel):
+    """一次同步的结果"""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    failed: List[str] = Field(default_factory=list, description="最终失败的事件ID")
+    http_requests: int = Field(default=0, description="实际发出的HTTP请求数")
+    
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+    
+    def summary(self) -> str:
+        return (
+            f"新增{self.inserted} / 更新{self.updated} / 删除{self.deleted} / 不变{self.unchanged}"
+            f"（{self.http_requests}次请求）"
+        )
+
+
+def _error_reasons(error: HttpError) -> List[str]:
+    """Google API错误响应中的reason列表"""
+    try:
+        payload = json.loads(error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content)
+    except (ValueError, AttributeError):
+        return []
+    details = payload.get('error', {}) if isinstance(payload, dict) else {}
+    return [item.get('reason', '') for item in details.get('errors', []) if isinstance(item, dict)]
+
+
+def is_retryable(error: Exception) -> bool:
+    """错误是否值得重试：非HTTP错误（连接中断等）、限流和服务端错误"""
+    if not isinstance(error, HttpError):
+        return True
+    status = error.resp.status
+    if status == 403:
+        return any(reason in RATE_LIMIT_REASONS for reason in _error_reasons(error))
+    return status in RETRYABLE_STATUS
+
+
+def google_event_id(user_id: str, target_date: date, item: ScheduleItem) -> str:
+    """稳定的Google事件ID（只含0-9a-f，满足base32hex）"""
+    return uuid.uuid5(PILOT_NAMESPACE, f"{user_id}/{target_date.isoformat()}/{item_key(item)}").hex
+
+
+class GoogleCalendarManager(CalendarInterface):
+    """Google Calendar 管理器"""
+    
+    # 令牌文件 -> 已授权的HTTP会话，进程内复用
+    _sessions: Dict[str, google_auth_httplib2.AuthorizedHttp] = {}
+    
+    def __init__(self, config: PilotConfig, credentials=None):
+        self.config = config
+        self.google = config.google_calendar
+        self.timezone = pytz.timezone(config.timezone)
+        self.user_id = resolve_user_id(config.exports)
+        self._credentials = credentials
+        self._http: Optional[google_auth_httplib2.AuthorizedHttp] = None
+        self._service = None
+        self._busy_cache: Dict[date, List[Tuple[int, int]]] = {}
+        self.http_requests = 0
+    
+    # ---- CalendarInterface ----
+    
+    def export_schedule(self, target_date: date, schedule: List[ScheduleItem]) -> str:
+        """同步日程到Google Calendar，返回日历ID"""
+        result = self.sync_day(target_date, schedule)
+        if not result.ok:
+            raise RuntimeError(f"{len(result.failed)}个事件同步失败")
+        return self.google.calendar_id
+    
+    def import_schedule(self, target_date: date, schedule: List[ScheduleItem]) -> bool:
+        """同步日程到Google Calendar"""
+        try:
+            return self.sync_day(target_date, schedule).ok
+        except Exception as e:
+            print(f"❌ Google Calendar同步失败: {str(e)}")
+            return False
+    
+    def validate_connection(self) -> bool:
+        """检查授权和日历是否可访问"""
+        try:
+            self._execute(self.service.calendars().get(calendarId=self.google.calendar_id, fields='id'))
+            return True
+        except Exception as e:
+            print(f"❌ Google Calendar连接失败: {str(e)}")
+            return False
+    
+    # ---- 同步 ----
+    
+    def sync_day(self, target_date: date, schedule: List[ScheduleItem]) -> GoogleSyncResult:
+        """把一天的日程同步到日历：按事件ID对比，批量插入/更新/删除"""
+        start_requests = self.http_requests
+        existing = self._list_day_events(target_date)
+        desired = {}
+        for item in schedule:
+            body = self._event_body(target_date, item)
+            desired[body['id']] = body
+        
+        result = GoogleSyncResult()
+        operations: List[Tuple[str, str, Optional[dict]]] = []
+        for event_id, body in desired.items():
+            current = existing.get(event_id)
+            if current is None:
+                operations.append(('insert', event_id, body))
+                result.inserted += 1
+            elif current['status'] == 'cancelled' or current['hash'] != body['extendedProperties']['private']['pilotHash']:
+                # 已删除的事件ID仍被占用，只能用update恢复
+                operations.append(('update', event_id, body))
+                result.updated += 1
+            else:
+                result.unchanged += 1
+        for event_id, current in existing.items():
+            if event_id not in desired and current['status'] != 'cancelled':
+                operations.append(('delete', event_id, None))
+                result.deleted += 1
+        
+        result.failed = self._run_batches(operations)
+        result.http_requests = self.http_requests - start_requests
+        return result
+    
+    def _list_day_events(self, target_date: date) -> Dict[str, dict]:
+        """该日期由P.I.L.O.T.创建的事件（含已删除的）：ID -> 状态和内容哈希"""
+        events = {}
+        page_token = None
+        while True:
+            response = self._execute(self.service.events().list(
+                calendarId=self.google.calendar_id,
+                privateExtendedProperty=[f"pilotUser={self.user_id}", f"pilotDate={target_date.isoformat()}"],
+                showDeleted=True,
+                maxResults=2500,
+                pageToken=page_token,
+                fields='items(id,status,extendedProperties/private),nextPageToken'
+            ))
+            for event in response.get('items', []):
+                private = event.get('extendedProperties', {}).get('private', {})
+                events[event['id']] = {'status': event.get('status', 'confirmed'), 'hash': private.get('pilotHash', '')}
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return events
+    
+    def _event_body(self, target_date: date, item: ScheduleItem) -> dict:
+        """日程条目对应的Google事件"""
+        end_date = target_date if item.end_time >= item.start_time else target_date + timedelta(days=1)
+        body = {
+            'id': google_event_id(self.user_id, target_date, item),
+            'status': 'confirmed',
+            'summary': event_summary(item),
+            'description': event_description(item),
+            'start': {'dateTime': datetime.combine(target_date, item.start_time).isoformat(), 'timeZone': self.config.timezone},
+            'end': {'dateTime': datetime.combine(end_date, item.end_time).isoformat(), 'timeZone': self.config.timezone},
+            'transparency': 'transparent',
+            'reminders': {
+                'useDefault': False,
+                'overrides': [{'method': 'popup', 'minutes': max(-minutes, 0)} for minutes in reminder_offsets(item.type)],
+            },
+        }
+        digest = hashlib.blake2b(json.dumps(body, sort_keys=True, ensure_ascii=False).encode(), digest_size=12).hexdigest()
+        body['extendedProperties'] = {'private': {
+            'pilot': '1',
+            'pilotUser': self.user_id,
+            'pilotDate': target_date.isoformat(),
+            'pilotSlot': item_key(item),
+            'pilotType': item.type.value,
+            'pilotHash': digest,
+        }}
+        return body
+    
+    def _run_batches(self, operations: List[Tuple[str, str, Optional[dict]]]) -> List[str]:
+        """分批执行写操作，可重试的失败在下一轮重试；返回最终失败的事件ID"""
+        events = self.service.events()
+        calendar_id = self.google.calendar_id
+        pending = operations
+        failed: List[str] = []
+        
+        for attempt in range(self.google.max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                clock.sleep(min(2 ** (attempt - 1), 8))
+            retry: List[Tuple[str, str, Optional[dict]]] = []
+            failed = []
+            
+            for offset in range(0, len(pending), self.google.batch_size):
+                chunk = pending[offset:offset + self.google.batch_size]
+                
+                def callback(request_id, response, exception, chunk=chunk):
+                    if exception is None:
+                        return
+                    kind, event_id, body = chunk[int(request_id)]
+                    status = exception.resp.status if isinstance(exception, HttpError) else 0
+                    if kind == 'delete' and status in (404, 410):
+                        return
+                    if kind == 'insert' and status == 409:
+                        # ID已存在（例如列表之后被其他设备创建），改为更新
+                        retry.append(('update', event_id, body))
+                    elif is_retryable(exception):
+                        retry.append((kind, event_id, body))
+                    else:
+                        print(f"⚠️ 事件 {event_id} {kind} 失败: {exception}")
+                        failed.append(event_id)
+                
+                batch = self._new_batch(callback)
+                for index, (kind, event_id, body) in enumerate(chunk):
+                    if kind == 'insert':
+                        request = events.insert(calendarId=calendar_id, body=body, fields='id')
+                    elif kind == 'update':
+                        request = events.update(calendarId=calendar_id, eventId=event_id, body=body, fields='id')
+                    else:
+                        request = events.delete(calendarId=calendar_id, eventId=event_id)
+                    batch.add(request, request_id=str(index))
+                self.http_requests += 1
+                batch.execute(http=self.http)
+            pending = retry
+        
+        return failed + [event_id for _, event_id, _ in pending]
+    
+    # ---- 忙碌时间 ----
+    
+    def prefetch_busy(self, start_date: date, end_date: date):
+        """用freebusy查询 [start_date, end_date] 的忙碌时间并按天缓存"""
+        calendars = self.google.busy_calendars or [self.google.calendar_id]
+        current = start_date
+        while current <= end_date:
+            chunk_end = min(end_date, current + timedelta(days=FREEBUSY_MAX_DAYS - 1))
+            time_min = self.timezone.localize(datetime.combine(current, time(0, 0)))
+            time_max = self.timezone.localize(datetime.combine(chunk_end + timedelta(days=1), time(0, 0)))
+            response = self._execute(self.service.freebusy().query(body={
+                'timeMin': time_min.isoformat(),
+                'timeMax': time_max.isoformat(),
+                'timeZone': self.config.timezone,
+                'items': [{'id': calendar_id} for calendar_id in calendars],
+            }))
+            
+            days: Dict[date, List[Tuple[int, int]]] = {
+                current + timedelta(days=offset): [] for offset in range((chunk_end - current).days + 1)
+            }
+            for calendar_id, info in response.get('calendars', {}).items():
+                for error in info.get('errors', []):
+                    print(f"⚠️ 无法读取日历 {calendar_id} 的忙碌时间: {error.get('reason')}")
+                for period in info.get('busy', []):
+                    self._add_busy(days, _parse_rfc3339(period['start']), _parse_rfc3339(period['end']))
+            for day, intervals in days.items():
+                self._busy_cache[day] = merge_intervals(intervals)
+            current = chunk_end + timedelta(days=1)
+    
+    def busy_slots(self, target_date: date, window_start: time = time(0, 0), window_end: Optional[time] = None) -> List[TimeSlot]:
+        """某天（可限定在工作窗口内）的忙碌时段；未预取时查询当天"""
+        if target_date not in self._busy_cache:
+            self.prefetch_busy(target_date, target_date)
+        low = window_start.hour * 60 + window_start.minute
+        high = window_end.hour * 60 + window_end.minute if window_end else 24 * 60
+        slots = []
+        for start, end in self._busy_cache[target_date]:
+            start, end = max(start, low), min(end, high)
+            if start < end:
+                slots.append(TimeSlot(start=_minutes_to_time(start), end=_minutes_to_time(end)))
+        return slots
+    
+    def _add_busy(self, days: Dict[date, List[Tuple[int, int]]], start: datetime, end: datetime):
+        """把UTC忙碌区间按本地日期切分为当天的分钟区间"""
+        local_start = start.astimezone(self.timezone)
+        local_end = end.astimezone(self.timezone)
+        day = local_start.date()
+        while day <= local_end.date():
+            low = local_start.hour * 60 + local_start.minute if day == local_start.date() else 0
+            high = local_end.hour * 60 + local_end.minute if day == local_end.date() else 24 * 60
+            if day in days and low < high:
+                days[day].append((low, high))
+            day += timedelta(days=1)
+    
+    # ---- 授权和客户端 ----
+    
+    @property
+    def http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """已授权的HTTP会话（同一令牌文件在进程内复用）"""
+        if self._http is None:
+            if self._credentials is not None:
+                self._http = self._authorized_http(self._credentials)
+            else:
+                token_path = str(Path(self.google.token_path).expanduser())
+                session = self._sessions.get(token_path)
+                if session is None:
+                    session = self._sessions[token_path] = self._authorized_http(self._load_credentials(token_path))
+                self._http = session
+        return self._http
+    
+    @property
+    def service(self):
+        """Calendar v3客户端（使用内置的API描述，不联网下载）"""
+        if self._service is None:
+            options = {'api_endpoint': f"{self.google.api_root.rstrip('/')}/calendar/v3/"} if self.google.api_root else None
+            self._service = build(
+                'calendar', 'v3',
+                http=self.http,
+                client_options=options,
+                cache_discovery=False,
+                static_discovery=True
+            )
+        return self._service
+    
+    def _new_batch(self, callback: Callable) -> BatchHttpRequest:
+        """批量请求（自定义API根地址时批量端点也随之改变）"""
+        if self.google.api_root:
+            return BatchHttpRequest(callback=callback, batch_uri=f"{self.google.api_root.rstrip('/')}/batch/calendar/v3")
+        return self.service.new_batch_http_request(callback=callback)
+    
+    def _execute(self, request) -> dict:
+        """执行单个请求，限流和服务端错误时退避重试"""
+        for attempt in range(self.google.max_retries + 1):
+            self.http_requests += 1
+            try:
+                return request.execute(http=self.http)
+            except HttpError as e:
+                if not is_retryable(e) or attempt == self.google.max_retries:
+                    raise
+                clock.sleep(min(2 ** attempt, 8))
+    
+    def _authorized_http(self, credentials) -> google_auth_httplib2.AuthorizedHttp:
+        return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=self.google.timeout_seconds))
+    
+    def _load_credentials(self, token_path: str) -> Credentials:
+        """读取令牌，过期时刷新，没有令牌时走浏览器授权流程；刷新或新授权后写回令牌文件"""
+        credentials = None
+        if Path(token_path).exists():
+            credentials = Credentials.from_authorized_user_file(token_path, self.google.scopes)
+        if credentials and credentials.valid:
+            return credentials
+        
+        if credentials and credentials.expired and credentials.refresh_token:
+            credentials.refresh(Request())
+        else:
+            secrets_path = Path(self.google.credentials_path).expanduser()
+            if not secrets_path.exists():
+                raise FileNotFoundError(f"未找到Google OAuth客户端密钥: {secrets_path}")
+            flow = InstalledAppFlow.from_client_secrets_file(str(secrets_path), self.google.scopes)
+            credentials = flow.run_local_server(port=0)
+        
+        Path(token_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(token_path).write_text(credentials.to_json(), encoding='utf-8')
+        return credentials
+
+
+def _parse_rfc3339(value: str) -> datetime:
+    """解析freebusy返回的RFC 3339时间"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _minutes_to_time(minutes: int) -> time:
+    """当天分钟数转换为时间，24:00记为23:59"""
+    if minutes >= 24 * 60:
+        return time(23, 59)
+    return time(minutes // 60, minutes % 60)
@@ -0,0 +1,135 @@
+"""
+批量ICS导出
+
+为多个用户、多个日期范围生成ICS文件（团队统一导出、定时任务等）。每个 (用户, 起止日期) 是一个独立的任务，
+在进程池中并行生成：日程从ScheduleStore读取，按导出配置（重复时段压缩、compact配置）写出，
+通过临时文件替换原子写入 <输出目录>/<用户>/pilot_schedule_<开始>_<结束>.ics。
+
+同一次批量导出的所有文件使用相同的DTSTAMP，内容只取决于日程，与进程数无关。
+每个任务返回各自的耗时、事件数和文件大小，单个任务失败不影响其他任务。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
+
+import pytz
+from pydantic import BaseModel
+
+from ...core.models.config import ExportsConfig, PilotConfig
+from ...core.scheduling.store import ScheduleStore, is_valid_user
+from ...utils.atomic import atomic_write
+from .ics_recurrence import write_range
+from .ics_writer import ICSStreamWriter
+
+
+class BulkExportJob(BaseModel):
+    """单个导出任务"""
+    user_id: str
+    start_date: date
+    end_date: date
+
+
+class BulkExportResult(BaseModel):
+    """单个任务的导出结果"""
+    user_id: str
+    start_date: date
+    end_date: date
+    path: str = ""
+    events: int = 0
+    size: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def export_filename(job: BulkExportJob) -> str:
+    """任务输出文件相对输出目录的路径"""
+    return f"{job.user_id}/pilot_schedule_{job.start_date.strftime('%Y%m%d')}_{job.end_date.strftime('%Y%m%d')}.ics"
+
+
+def _export_job(
+    timezone: str,
+    exports: ExportsConfig,
+    store_dir: str,
+    output_dir: str,
+    now: datetime,
+    job: BulkExportJob
+) -> BulkExportResult:
+    """在工作进程中导出一个任务（模块级函数，供进程池序列化调用）"""
+    started = time.perf_counter()
+    result = BulkExportResult(user_id=job.user_id, start_date=job.start_date, end_date=job.end_date)
+    try:
+        if not is_valid_user(job.user_id):
+            raise ValueError(f"无效的用户标识: {job.user_id}")
+        store = ScheduleStore(store_dir)
+        path = Path(output_dir) / export_filename(job)
+        calname = f"🍅 P.I.L.O.T. 番茄钟计划 - {job.user_id} {job.start_date.isoformat()} ~ {job.end_date.isoformat()}"
+        with atomic_write(path, fsync=exports.fsync) as f, ICSStreamWriter(
+            f, timezone, calname, now=now, profile=exports.ics_profile, alarm_limits=exports.alarm_limits
+        ) as writer:
+            write_range(
+                writer,
+                list(store.iter_range(job.user_id, job.start_date, job.end_date)),
+                job.user_id,
+                exports,
+                job.start_date.year,
+                job.end_date.year
+            )
+        result.path = str(path)
+        result.events = writer.count
+        result.size = path.stat().st_size
+    except Exception as e:
+        result.error = str(e) or type(e).__name__
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+class BulkICSExporter:
+    """多用户、多日期范围的并行ICS导出"""
+    
+    def __init__(self, config: PilotConfig, store: Optional[ScheduleStore] = None, output_dir: Optional[str] = None):
+        self.config = config
+        self.store = store or ScheduleStore(config.feed.store_dir)
+        self.output_dir = Path(output_dir or config.exports.ics_dir).expanduser()
+    
+    def jobs_for(self, start_date: date, end_date: date, users: Optional[List[str]] = None) -> List[BulkExportJob]:
+        """为每个用户（默认ScheduleStore中的全部用户）生成同一日期范围的任务"""
+        return [
+            BulkExportJob(user_id=user_id, start_date=start_date, end_date=end_date)
+            for user_id in (users or self.store.users())
+        ]
+    
+    def export(
+        self,
+        jobs: List[BulkExportJob],
+        workers: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[BulkExportResult]:
+        """导出全部任务，结果顺序与jobs一致
+        
+        workers默认取exports.bulk_workers（0为CPU核数）；只有一个任务或一个进程时在当前进程中执行。
+        """
+        workers = workers or self.config.exports.bulk_workers or os.cpu_count() or 1
+        workers = max(1, min(workers, len(jobs)))
+        run = partial(
+            _export_job,
+            self.config.timezone,
+            self.config.exports,
+            str(self.store.directory),
+            str(self.output_dir),
+            now or datetime.now(pytz.utc)
+        )
+        if workers == 1:
+            return [run(job) for job in jobs]
+        
+        # 任务粒度较粗，每次只分发一个任务，避免快慢不均时部分进程空闲
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, jobs))
@@ -5,17 +5,19 @@ ICS日历文件生成和管理
 import os
 import platform
 import subprocess
-from datetime import datetime, date, time, timedelta
+from datetime import date, datetime
 from pathlib import Path
-from typing import List, Optional
-from uuid import uuid4
+from typing import Iterable, List, Optional, Tuple
 
-from icalendar import Calendar, Event, Alarm
 import pytz
 
 from ...interfaces.calendar import CalendarInterface
 from ...core.models.config import PilotConfig
-from ...core.models.schedule import ScheduleItem, CalendarEvent, PomodoroType
+from ...core.models.schedule import ScheduleItem
+from ...utils.atomic import atomic_write
+from .ics_recurrence import write_range
+from .ics_state import ExportState, PendingEvent
+from .ics_writer import ICSStreamWriter, format_utc
 
 
 class ICSCalendarManager(CalendarInterface):
@@ -48,243 +50,121 @@ class ICSCalendarManager(CalendarInterface):
             return False
     
     def export_to_ics_with_reminders(self, target_date: date, schedule: List[ScheduleItem]) -> str:
-        """导出为带提醒的ICS文件"""
+        """导出为带提醒的ICS文件
         
+        事件使用稳定UID，内容变化的事件SEQUENCE加一，上次导出后被移除的时段以STATUS:CANCELLED写出，
+        重新导入时日历应用会更新原事件而不是重复添加。
+        """
+        pending, _, state = self._plan_export(target_date, schedule, incremental=False)
+        path = self._write_pending(
+            f"pilot_schedule_{target_date.strftime('%Y%m%d')}.ics",
+            f'🍅 P.I.L.O.T. 番茄钟计划 - {target_date.strftime("%Y-%m-%d")}',
+            target_date,
+            pending
+        )
+        # 文件写成功后才记录导出状态，写入失败时下次仍会完整导出
+        state.save()
+        return path
+    
+    def export_changes(self, target_date: date, schedule: List[ScheduleItem]) -> Optional[str]:
+        """增量导出：只写出与上次导出相比新增、变更和取消的事件，没有变化时返回None"""
+        pending, stamp, state = self._plan_export(target_date, schedule, incremental=True)
+        if not pending:
+            print("✅ 日程与上次导出一致，无需更新日历")
+            return None
+        path = self._write_pending(
+            f"pilot_changes_{target_date.strftime('%Y%m%d')}_{stamp[9:15]}.ics",
+            f'🍅 P.I.L.O.T. 番茄钟计划 - {target_date.strftime("%Y-%m-%d")}',
+            target_date,
+            pending
+        )
+        state.save()
+        return path
+    
+    def has_exported(self, target_date: date) -> bool:
+        """该日期是否导出过（之后可以使用增量导出）"""
+        return ExportState.load(self.config.exports).has_day(target_date)
+    
+    def export_range_to_ics(
+        self,
+        start_date: date,
+        end_date: date,
+        dated_items: Iterable[Tuple[date, ScheduleItem]]
+    ) -> str:
+        """把多天日程导出为一个ICS文件
+        
+        dated_items通常来自PomodoroScheduler.schedule_range。开启exports.compress_recurring时，
+        每天重复的时段写成按周重复的事件（见ics_recurrence），多周导出的文件和日历导入时间都小一个数量级；
+        其余条目逐条流式写入，使用与单日导出相同的稳定UID。范围导出不记录导出状态。
+        """
+        exports = self.config.exports
+        user_id = ExportState(exports).user_id
+        series_count = 0
+        
+        def write(writer: ICSStreamWriter):
+            nonlocal series_count
+            series_count = write_range(writer, dated_items, user_id, exports, start_date.year, end_date.year)
+        
+        path = self._write_file(
+            f"pilot_schedule_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.ics",
+            f'🍅 P.I.L.O.T. 番茄钟计划 - {start_date.strftime("%Y-%m-%d")} ~ {end_date.strftime("%Y-%m-%d")}',
+            write
+        )
+        if series_count:
+            print(f"🔁 其中{series_count}个重复时段写成了重复事件")
+        return path
+    
+    def _plan_export(
+        self,
+        target_date: date,
+        schedule: List[ScheduleItem],
+        incremental: bool
+    ) -> Tuple[List[PendingEvent], str, ExportState]:
+        """与导出状态对比得到待写出的事件
+        
+        返回 (待写出的事件, 本次导出时间, 更新后的导出状态)；状态尚未保存，由调用方在文件写出成功后保存。
+        """
+        stamp = format_utc(datetime.now(self.timezone))
+        state = ExportState.load(self.config.exports)
+        pending, summary = state.plan_day(target_date, schedule, stamp, incremental=incremental)
+        print(f"🔁 与上次导出相比: {summary}")
+        return pending, stamp, state
+    
+    def _write_pending(self, filename: str, calname: str, target_date: date, pending: List[PendingEvent]) -> str:
+        """写出带UID/SEQUENCE/状态的事件"""
+        def write(writer: ICSStreamWriter):
+            for event in pending:
+                writer.write_event(
+                    target_date,
+                    event.item,
+                    uid=event.uid,
+                    sequence=event.sequence,
+                    status=event.status,
+                    created=event.created,
+                    last_modified=event.last_modified
+                )
+        return self._write_file(filename, calname, write)
+    
+    def _write_file(self, filename: str, calname: str, write) -> str:
+        """调用write(writer)写出事件；先写临时文件再替换，日历应用不会读到写了一半的文件"""
         try:
-            # 创建导出目录
             exports_dir = Path(self.config.exports.ics_dir)
             exports_dir.mkdir(exist_ok=True)
-            
-            # 生成文件名
-            filename = f"pilot_schedule_{target_date.strftime('%Y%m%d')}.ics"
             filepath = exports_dir / filename
             
-            # 创建日历对象
-            cal = Calendar()
-            cal.add('prodid', '-//P.I.L.O.T. v1.0-MVP//pilot.ai//')
-            cal.add('version', '2.0')
-            cal.add('calscale', 'GREGORIAN')
-            cal.add('method', 'PUBLISH')
-            cal.add('x-wr-calname', f'🍅 P.I.L.O.T. 番茄钟计划 - {target_date.strftime("%Y-%m-%d")}')
-            cal.add('x-wr-timezone', self.config.timezone)
-            cal.add('x-wr-caldesc', 'P.I.L.O.T. 智能时间规划与番茄钟管理')
+            exports = self.config.exports
+            with atomic_write(filepath, fsync=exports.fsync) as f, ICSStreamWriter(
+                f, self.config.timezone, calname, profile=exports.ics_profile, alarm_limits=exports.alarm_limits
+            ) as writer:
+                write(writer)
             
-            # 添加每个计划项
-            for item in schedule:
-                event = self._create_ical_event(target_date, item)
-                cal.add_component(event)
-            
-            # 写入文件
-            with open(filepath, 'wb') as f:
-                f.write(cal.to_ical())
-            
-            print(f"📄 ICS文件已生成: {filepath}")
+            print(f"📄 ICS文件已生成: {filepath}（{writer.count}个事件）")
             return str(filepath)
             
         except Exception as e:
             print(f"❌ ICS文件生成失败: {str(e)}")
             raise
     
-    def _create_ical_event(self, target_date: date, item: ScheduleItem) -> Event:
-        """创建单个iCal事件"""
-        event = Event()
-        
-        # 创建datetime对象
-        start_datetime = datetime.combine(target_date, item.start_time)
-        end_datetime = datetime.combine(target_date, item.end_time)
-        
-        # 转换为带时区的datetime
-        start_datetime = self.timezone.localize(start_datetime)
-        end_datetime = self.timezone.localize(end_datetime)
-        
-        # 基本事件信息
-        event.add('uid', str(uuid4()))
-        event.add('summary', self._get_event_summary(item))
-        event.add('description', self._get_event_description(item))
-        event.add('dtstart', start_datetime)
-        event.add('dtend', end_datetime)
-        event.add('dtstamp', datetime.now(self.timezone))
-        event.add('created', datetime.now(self.timezone))
-        event.add('last-modified', datetime.now(self.timezone))
-        
-        # 分类和标签
-        event.add('categories', ['P.I.L.O.T.', '番茄钟', item.type.value])
-        event.add('x-pilot-version', '1.0-MVP')
-        event.add('x-pilot-type', item.type.value)
-        
-        # 添加提醒
-        alarms = self._get_ics_alarms_for_event(item)
-        for alarm in alarms:
-            event.add_component(alarm)
-        
-        return event
-    
-    def _get_event_summary(self, item: ScheduleItem) -> str:
-        """获取事件标题"""
-        emoji_map = {
-            PomodoroType.FOCUS: "🍅",
-            PomodoroType.SHORT_BREAK: "☕",
-            PomodoroType.LONG_BREAK: "🛋️",
-            PomodoroType.LUNCH: "🍽️",
-            PomodoroType.TASK: "📋"
-        }
-        
-        emoji = emoji_map.get(item.type, "📅")
-        
-        if item.type == PomodoroType.FOCUS:
-            cycle_num = getattr(item, 'cycle_number', 1)
-            if item.task_title and item.subtask:
-                return f"{emoji} 番茄钟 #{cycle_num}: {item.subtask}"
-            else:
-                return f"{emoji} 番茄钟 #{cycle_num} - 专注时间"
-        elif item.type == PomodoroType.SHORT_BREAK:
-            return f"{emoji} 番茄休息"
-        elif item.type == PomodoroType.LONG_BREAK:
-            return f"{emoji} 长休息"
-        elif item.type == PomodoroType.LUNCH:
-            return f"{emoji} 午休时间"
-        elif item.type == PomodoroType.TASK:
-            return f"{emoji} {item.title}"
-        else:
-            return f"{emoji} {item.title}"
-    
-    def _get_event_description(self, item: ScheduleItem) -> str:
-        """获取事件描述"""
-        descriptions = []
-        
-        if item.type == PomodoroType.FOCUS:
-            descriptions.extend([
-                "🎯 专注工作时间",
-                f"⏱️ 持续时间: {item.duration_minutes()}分钟",
-                ""
-            ])
-            
-            # 添加任务相关信息
-            if item.task_title:
-                descriptions.extend([
-                    "📋 本次番茄钟任务:",
-                    f"主任务: {item.task_title}",
-                ])
-                
-                if item.subtask and item.subtask != item.task_title:
-                    descriptions.append(f"具体内容: {item.subtask}")
-                
-                if item.focus_content:
-                    descriptions.extend([
-                        "",
-                        "🎯 专注要点:",
-                        item.focus_content,
-                    ])
-                
-                descriptions.append("")
-            
-            descriptions.extend([
-                "💡 专注提示:",
-                "• 关闭通知和干扰源",
-                "• 专注于当前任务",
-                "• 保持深度工作状态",
-                "• 遇到干扰记录后继续"
-            ])
-            
-        elif item.type == PomodoroType.SHORT_BREAK:
-            descriptions.extend([
-                "☕ 短休息时间",
-                f"⏱️ 持续时间: {item.duration_minutes()}分钟",
-                "",
-                "💡 建议活动:",
-                "• 喝水或伸展身体",
-                "• 眺望远方放松眼睛",
-                "• 做简单的运动",
-                "• 避免查看手机或电脑"
-            ])
-            
-        elif item.type == PomodoroType.LONG_BREAK:
-            descriptions.extend([
-                "🛋️ 长休息时间",
-                f"⏱️ 持续时间: {item.duration_minutes()}分钟",
-                "",
-                "💡 建议活动:",
-                "• 散步或户外活动",
-                "• 吃点心补充能量",
-                "• 与同事聊天放松",
-                "• 回顾前面的工作成果"
-            ])
-            
-        elif item.type == PomodoroType.LUNCH:
-            descriptions.extend([
-                "🍽️ 午餐休息时间",
-                "⏱️ 建议用餐并适当休息",
-                "🕐 14:10 准备恢复工作",
-                "",
-                "💡 午休建议:",
-                "• 营养均衡的午餐",
-                "• 适当的休息或小憩",
-                "• 为下午工作做准备"
-            ])
-            
-        elif item.type == PomodoroType.TASK:
-            descriptions.extend([
-                f"📋 任务: {item.title}",
-                f"⏱️ 预计用时: {item.duration_minutes()}分钟"
-            ])
-            
-            if item.focus_content:
-                descriptions.extend([
-                    "",
-                    "📝 任务详情:",
-                    item.focus_content
-                ])
-        
-        descriptions.extend([
-            "",
-            "---",
-            "📱 由 P.I.L.O.T. v1.0-MVP 生成",
-            "🔗 智能时间规划与番茄钟管理工具"
-        ])
-        
-        return "\n".join(descriptions)
-    
-    def _get_ics_alarms_for_event(self, item: ScheduleItem) -> List[Alarm]:
-        """为事件创建提醒"""
-        alarms = []
-        
-        if item.type == PomodoroType.FOCUS:
-            # 番茄钟开始前5分钟和1分钟提醒
-            alarms.extend([
-                self._create_alarm(timedelta(minutes=-5), "🍅 番茄钟即将开始（5分钟后）"),
-                self._create_alarm(timedelta(minutes=-1), "🍅 番茄钟即将开始（1分钟后）")
-            ])
-        elif item.type == PomodoroType.SHORT_BREAK:
-            # 休息结束前1分钟提醒
-            alarms.append(
-                self._create_alarm(timedelta(minutes=-1), "☕ 番茄休息即将结束，准备继续工作")
-            )
-        elif item.type == PomodoroType.LONG_BREAK:
-            # 长休息结束前5分钟提醒
-            alarms.append(
-                self._create_alarm(timedelta(minutes=-5), "🛋️ 长休息即将结束，准备恢复工作")
-            )
-        elif item.type == PomodoroType.TASK:
-            # 任务开始前10分钟提醒
-            alarms.append(
-                self._create_alarm(timedelta(minutes=-10), f"📋 任务即将开始: {item.title}")
-            )
-        elif item.type == PomodoroType.LUNCH:
-            # 午休开始提醒
-            alarms.append(
-                self._create_alarm(timedelta(minutes=0), "🍽️ 午餐时间，记得14:10恢复工作")
-            )
-        
-        return alarms
-    
-    def _create_alarm(self, trigger: timedelta, description: str) -> Alarm:
-        """创建提醒对象"""
-        alarm = Alarm()
-        alarm.add('action', 'DISPLAY')
-        alarm.add('description', description)
-        alarm.add('trigger', trigger)
-        return alarm
-    
     def auto_open_ics_file(self, ics_path: str) -> bool:
         """自动打开ICS文件"""
         try:
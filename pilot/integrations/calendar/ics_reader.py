@@ -0,0 +1,446 @@
+"""
+ICS忙碌时间导入
+
+从已有日历导出的.ics文件（常见几十MB、包含多年历史）中读取某一天的忙碌时段，作为PlanInput.meetings：
+- 用mmap映射文件，逐个定位 BEGIN:VEVENT ... END:VEVENT，只用正则取出
+  DTSTART/DTEND/DURATION/RRULE/RDATE/EXDATE/RECURRENCE-ID/UID/STATUS/TRANSP，不解析描述、提醒等其余内容
+- 透明（TRANSP:TRANSPARENT）和已取消的事件不算忙碌
+- 单次事件按UTC开始时间排序，查询时二分定位；重复事件只在查询窗口内用dateutil展开，
+  EXDATE和被RECURRENCE-ID改期的实例会被排除
+- 解析结果缓存在 ~/.pilot/ics_cache 下，文件大小和修改时间不变时直接使用缓存；
+  只有修改时间变化而内容哈希相同（例如重新同步了同一份文件）时也沿用缓存
+"""
+
+import bisect
+import hashlib
+import json
+import mmap
+import re
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+from dateutil.rrule import rruleset, rrulestr
+
+from ...core.models.config import ImportConfig
+from ...core.models.plan import TimeSlot
+from ...utils.atomic import atomic_write
+from .ics_writer import utc_offset_minutes
+
+
+# 索引格式变化时递增，旧缓存自动失效
+INDEX_VERSION = 1
+
+_EVENT_BEGIN = b"BEGIN:VEVENT"
+_EVENT_END = b"END:VEVENT"
+_ALARM_BEGIN = b"BEGIN:VALARM"
+_ALARM_END = b"END:VALARM"
+
+# 需要的属性行（含折行的续行）
+_PROPERTY_RE = re.compile(
+    rb"^(DTSTART|DTEND|DURATION|RRULE|RDATE|EXDATE|RECURRENCE-ID|UID|STATUS|TRANSP)"
+    rb"([;:][^\r\n]*(?:\r?\n[ \t][^\r\n]*)*)",
+    re.M
+)
+_FOLD_RE = re.compile(rb"\r?\n[ \t]")
+_DURATION_RE = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+_UNTIL_RE = re.compile(r"UNTIL=(\d{8}(?:T\d{6}Z?)?)")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _split_property(raw: bytes) -> Tuple[Dict[str, str], str]:
+    """把 ;参数=值:值 拆成参数字典和值"""
+    text = _FOLD_RE.sub(b"", raw).decode('utf-8', 'replace')
+    head, _, value = text.partition(':')
+    params = {}
+    for param in head.split(';')[1:]:
+        name, _, param_value = param.partition('=')
+        params[name.upper()] = param_value.strip('"')
+    return params, value.strip()
+
+
+def _parse_duration(value: str) -> Optional[timedelta]:
+    """解析ISO 8601时长（P1DT2H30M等）"""
+    match = _DURATION_RE.match(value)
+    if not match:
+        return None
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+        minutes=int(minutes or 0), seconds=int(seconds or 0)
+    )
+    return -delta if sign == '-' else delta
+
+
+class _TimeResolver:
+    """把iCalendar的日期时间值转换为 (事件时区, 当地时间) 和UTC时间戳"""
+    
+    def __init__(self, default_zone: str):
+        self.default_zone = default_zone
+        self._zones: Dict[str, pytz.BaseTzInfo] = {}
+    
+    def zone(self, tzid: Optional[str]) -> Tuple[str, pytz.BaseTzInfo]:
+        """时区名称和对象；未知的TZID（例如Outlook的Windows时区名）按默认时区处理"""
+        name = tzid or self.default_zone
+        tz = self._zones.get(name)
+        if tz is None:
+            try:
+                tz = pytz.timezone(name)
+            except pytz.UnknownTimeZoneError:
+                name, tz = self.default_zone, pytz.timezone(self.default_zone)
+            self._zones[tzid or self.default_zone] = tz
+        return tz.zone, tz
+    
+    def parse(self, params: Dict[str, str], value: str) -> Tuple[str, datetime, bool]:
+        """返回 (时区名, 当地的naive时间, 是否全天)"""
+        value = value.split(',')[0]
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return self.zone(params.get('TZID'))[0], datetime(int(value[:4]), int(value[4:6]), int(value[6:8])), True
+        local = datetime(
+            int(value[:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[11:13]), int(value[13:15])
+        )
+        if value.endswith('Z'):
+            return 'UTC', local, False
+        return self.zone(params.get('TZID'))[0], local, False
+    
+    def timestamp(self, zone: str, local: datetime) -> int:
+        """当地时间转换为UTC时间戳（秒），时区偏移查切换表，不逐个调用pytz.localize"""
+        offset = 0 if zone == 'UTC' else utc_offset_minutes(zone, local.date(), local.hour)
+        return (
+            (local.toordinal() - _EPOCH_ORDINAL) * 86400 + local.hour * 3600 + local.minute * 60 + local.second
+            - offset * 60
+        )
+    
+    def timestamps(self, params: Dict[str, str], value: str) -> List[int]:
+        """EXDATE/RDATE等多值属性的全部UTC时间戳"""
+        stamps = []
+        for part in value.split(','):
+            if part:
+                zone, local, _ = self.parse(params, part)
+                stamps.append(self.timestamp(zone, local))
+        return stamps
+
+
+class ICSIndex:
+    """单个.ics文件的忙碌时间索引
+    
+    single: 单次事件 [开始, 结束, 是否全天]，按开始时间排序（UTC时间戳）
+    recurring: 重复事件（当地开始时间、时区、时长、规则、排除的实例等），查询时在窗口内展开
+    """
+    
+    def __init__(self, data: dict):
+        self.data = data
+        self.single: List[List[int]] = data['single']
+        self._starts = [event[0] for event in self.single]
+        self.max_span: int = data['max_span']
+        self.recurring: List[dict] = data['recurring']
+        self._zones: Dict[str, pytz.BaseTzInfo] = {}
+        # 按需构造的规则集（cache=True，已生成的实例在后续查询中复用）
+        self._rulesets: Dict[int, rruleset] = {}
+    
+    def __len__(self) -> int:
+        return len(self.single) + len(self.recurring)
+    
+    @classmethod
+    def build(cls, buffer, default_zone: str) -> "ICSIndex":
+        """扫描文件内容建立索引"""
+        resolver = _TimeResolver(default_zone)
+        single: List[List[int]] = []
+        recurring: List[dict] = []
+        # 被单独修改或取消的重复实例：UID -> 原实例的UTC时间戳
+        overridden: Dict[str, set] = {}
+        max_span = 0
+        
+        position = buffer.find(_EVENT_BEGIN)
+        while position != -1:
+            end = buffer.find(_EVENT_END, position)
+            if end == -1:
+                break
+            block = buffer[position:end]
+            position = buffer.find(_EVENT_BEGIN, end)
+            
+            # 去掉嵌套的VALARM，其中的DURATION等属性不属于事件本身
+            alarm = block.find(_ALARM_BEGIN)
+            if alarm != -1:
+                block = block[:alarm] + block[block.rfind(_ALARM_END):]
+            
+            properties: Dict[str, List[Tuple[Dict[str, str], str]]] = {}
+            for match in _PROPERTY_RE.finditer(block):
+                name = match.group(1).decode()
+                properties.setdefault(name, []).append(_split_property(match.group(2)))
+            
+            if 'DTSTART' not in properties:
+                continue
+            uid = properties.get('UID', [({}, '')])[0][1]
+            
+            if 'RECURRENCE-ID' in properties:
+                params, value = properties['RECURRENCE-ID'][0]
+                zone, local, _ = resolver.parse(params, value)
+                overridden.setdefault(uid, set()).add(resolver.timestamp(zone, local))
+            
+            status = properties.get('STATUS', [({}, '')])[0][1].upper()
+            transp = properties.get('TRANSP', [({}, '')])[0][1].upper()
+            if status == 'CANCELLED' or transp == 'TRANSPARENT':
+                continue
+            
+            params, value = properties['DTSTART'][0]
+            zone, local_start, all_day = resolver.parse(params, value)
+            duration = cls._event_duration(resolver, properties, local_start, zone, all_day)
+            start = resolver.timestamp(zone, local_start)
+            
+            if 'RRULE' not in properties and 'RDATE' not in properties:
+                single.append([start, start + duration, int(all_day)])
+                max_span = max(max_span, duration)
+                continue
+            
+            exdates = []
+            for exdate_params, exdate_value in properties.get('EXDATE', []):
+                exdates.extend(resolver.timestamps(exdate_params, exdate_value))
+            rdates = []
+            for rdate_params, rdate_value in properties.get('RDATE', []):
+                if rdate_params.get('VALUE') != 'PERIOD':
+                    rdates.extend(resolver.timestamps(rdate_params, rdate_value))
+            rules = [cls._local_rule(resolver, rule, zone) for _, rule in properties.get('RRULE', [])]
+            event = {
+                'uid': uid,
+                'zone': zone,
+                'start': local_start.isoformat(),
+                'duration': duration,
+                'all_day': int(all_day),
+                'rules': rules,
+                'exdates': exdates,
+                'rdates': rdates,
+            }
+            event['last'] = cls._last_occurrence(event, resolver)
+            recurring.append(event)
+        
+        single.sort()
+        for event in recurring:
+            event['overridden'] = sorted(overridden.get(event['uid'], ()))
+        return cls({
+            'version': INDEX_VERSION,
+            'timezone': default_zone,
+            'single': single,
+            'max_span': max_span,
+            'recurring': recurring,
+        })
+    
+    @staticmethod
+    def _event_duration(resolver: _TimeResolver, properties: dict, local_start: datetime, zone: str, all_day: bool) -> int:
+        """事件时长（秒），优先DTEND，其次DURATION，全天事件缺省一天"""
+        if 'DTEND' in properties:
+            params, value = properties['DTEND'][0]
+            end_zone, local_end, _ = resolver.parse(params, value)
+            return max(resolver.timestamp(end_zone, local_end) - resolver.timestamp(zone, local_start), 0)
+        if 'DURATION' in properties:
+            delta = _parse_duration(properties['DURATION'][0][1])
+            if delta is not None:
+                return max(int(delta.total_seconds()), 0)
+        return 86400 if all_day else 0
+    
+    @staticmethod
+    def _local_rule(resolver: _TimeResolver, rule: str, zone: str) -> str:
+        """把UTC的UNTIL改写为事件时区的当地时间，以便用naive的DTSTART在当地时间展开（夏令时切换后仍保持当地时刻）"""
+        def convert(match) -> str:
+            value = match.group(1)
+            if not value.endswith('Z'):
+                return match.group(0)
+            moment = pytz.utc.localize(datetime.strptime(value, '%Y%m%dT%H%M%SZ'))
+            tz = resolver.zone(zone)[1] if zone != 'UTC' else pytz.utc
+            return f"UNTIL={moment.astimezone(tz).strftime('%Y%m%dT%H%M%S')}"
+        return _UNTIL_RE.sub(convert, rule)
+    
+    @staticmethod
+    def _last_occurrence(event: dict, resolver: _TimeResolver) -> Optional[int]:
+        """最后一个实例的结束时间戳，无限重复时为None"""
+        rules = event['rules']
+        if any('UNTIL=' not in rule and 'COUNT=' not in rule for rule in rules):
+            return None
+        start = datetime.fromisoformat(event['start'])
+        last = max(event['rdates'] + [resolver.timestamp(event['zone'], start)])
+        for rule in rules:
+            occurrence = None
+            for occurrence in rrulestr(rule, dtstart=start):
+                pass
+            if occurrence is not None:
+                stamp = resolver.timestamp(event['zone'], occurrence)
+                last = max(last, stamp)
+        return last + event['duration']
+    
+    def query(self, start: int, end: int, include_all_day: bool = False) -> List[Tuple[int, int]]:
+        """与 [start, end) 相交的忙碌区间（UTC时间戳），未排序、未合并"""
+        intervals = []
+        low = bisect.bisect_left(self._starts, start - self.max_span)
+        high = bisect.bisect_left(self._starts, end)
+        for event_start, event_end, all_day in self.single[low:high]:
+            if event_end > start and (include_all_day or not all_day):
+                intervals.append((event_start, event_end))
+        
+        for position, event in enumerate(self.recurring):
+            if event['all_day'] and not include_all_day:
+                continue
+            if event['last'] is not None and event['last'] <= start:
+                continue
+            intervals.extend(self._expand(position, event, start, end))
+        return intervals
+    
+    def _expand(self, position: int, event: dict, start: int, end: int) -> Iterable[Tuple[int, int]]:
+        """在窗口内展开重复事件"""
+        zone = event['zone']
+        tz = self._zone(zone)
+        duration = event['duration']
+        local_start = datetime.fromisoformat(event['start'])
+        # 窗口换算为事件时区的当地时间，多留一天余量覆盖夏令时和跨天事件
+        window_start = (_EPOCH + timedelta(seconds=start - duration)).astimezone(tz).replace(tzinfo=None) - timedelta(days=1)
+        window_end = (_EPOCH + timedelta(seconds=end)).astimezone(tz).replace(tzinfo=None) + timedelta(days=1)
+        if local_start > window_end:
+            return
+        
+        rules = self._rulesets.get(position)
+        if rules is None:
+            rules = self._rulesets[position] = rruleset(cache=True)
+            for rule in event['rules']:
+                rules.rrule(rrulestr(rule, dtstart=local_start))
+            rules.rdate(local_start)
+        excluded = set(event['exdates']) | set(event['overridden'])
+        
+        occurrences = {
+            int((tz.localize(local) - _EPOCH).total_seconds())
+            for local in rules.between(window_start, window_end, inc=True)
+        }
+        occurrences.update(stamp for stamp in event['rdates'] if start - duration < stamp < end)
+        for stamp in occurrences:
+            if stamp not in excluded and stamp < end and stamp + duration > start:
+                yield stamp, stamp + duration
+    
+    def _zone(self, zone: str) -> pytz.BaseTzInfo:
+        tz = self._zones.get(zone)
+        if tz is None:
+            tz = self._zones[zone] = pytz.timezone(zone)
+        return tz
+
+
+class ICSBusyImporter:
+    """从.ics文件读取忙碌时段"""
+    
+    def __init__(self, config: Optional[ImportConfig] = None, timezone: str = "Asia/Shanghai"):
+        self.config = config or ImportConfig()
+        self.timezone = pytz.timezone(timezone)
+        self.cache_dir = Path(self.config.cache_dir).expanduser()
+        self._indexes: Dict[str, Tuple[Tuple[int, int], ICSIndex]] = {}
+    
+    def load_index(self, path) -> ICSIndex:
+        """加载文件索引：进程内缓存 -> 磁盘缓存（大小和修改时间一致，或内容哈希一致）-> 重新扫描"""
+        path = Path(path).expanduser().resolve()
+        stat = path.stat()
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._indexes.get(str(path))
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        cache_path = self.cache_dir / f"{hashlib.sha1(str(path).encode()).hexdigest()[:16]}.json"
+        meta = self._read_cache(cache_path)
+        
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else _EmptyBuffer() as buffer:
+                if meta and (meta['size'], meta['mtime_ns']) == signature:
+                    index = ICSIndex(meta['index'])
+                else:
+                    digest = hashlib.blake2b(buffer, digest_size=16).hexdigest()
+                    if meta and meta['hash'] == digest:
+                        index = ICSIndex(meta['index'])
+                    else:
+                        index = ICSIndex.build(buffer, self.timezone.zone)
+                    self._write_cache(cache_path, {
+                        'path': str(path),
+                        'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns,
+                        'hash': digest,
+                        'index': index.data,
+                    })
+        
+        self._indexes[str(path)] = (signature, index)
+        return index
+    
+    def busy_intervals(self, start: datetime, end: datetime, sources: Optional[List[str]] = None) -> List[Tuple[datetime, datetime]]:
+        """[start, end) 内合并后的忙碌区间（带时区的datetime，按配置时区表示）"""
+        start_stamp = int((start - _EPOCH).total_seconds())
+        end_stamp = int((end - _EPOCH).total_seconds())
+        intervals: List[Tuple[int, int]] = []
+        for source in sources if sources is not None else self.config.busy_sources:
+            try:
+                index = self.load_index(source)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 无法读取日历文件 {source}: {str(e)}")
+                continue
+            intervals.extend(index.query(start_stamp, end_stamp, self.config.include_all_day))
+        
+        merged: List[List[int]] = []
+        for interval_start, interval_end in sorted(intervals):
+            interval_start, interval_end = max(interval_start, start_stamp), min(interval_end, end_stamp)
+            if interval_end <= interval_start:
+                continue
+            if merged and interval_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], interval_end)
+            else:
+                merged.append([interval_start, interval_end])
+        return [
+            ((_EPOCH + timedelta(seconds=a)).astimezone(self.timezone), (_EPOCH + timedelta(seconds=b)).astimezone(self.timezone))
+            for a, b in merged
+        ]
+    
+    def busy_slots(
+        self,
+        target_date: date,
+        window_start: time = time(0, 0),
+        window_end: Optional[time] = None,
+        sources: Optional[List[str]] = None
+    ) -> List[TimeSlot]:
+        """某一天（可限定在工作窗口内）的忙碌时段，可直接用作PlanInput.meetings"""
+        start = self.timezone.localize(datetime.combine(target_date, window_start))
+        if window_end is None:
+            end = self.timezone.localize(datetime.combine(target_date + timedelta(days=1), time(0, 0)))
+        else:
+            end = self.timezone.localize(datetime.combine(target_date, window_end))
+        
+        slots = []
+        for busy_start, busy_end in self.busy_intervals(start, end, sources):
+            # 延伸到次日零点的时段截止到当天23:59
+            end_time = busy_end.time() if busy_end.date() == target_date else time(23, 59)
+            slots.append(TimeSlot(start=busy_start.time().replace(second=0, microsecond=0), end=end_time.replace(second=0, microsecond=0)))
+        return slots
+    
+    def _read_cache(self, cache_path: Path) -> Optional[dict]:
+        """读取磁盘缓存，版本或时区不符时视为无缓存"""
+        if not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index = meta.get('index', {})
+        if index.get('version') != INDEX_VERSION or index.get('timezone') != self.timezone.zone:
+            return None
+        return meta
+    
+    def _write_cache(self, cache_path: Path, meta: dict):
+        """写入磁盘缓存"""
+        try:
+            with atomic_write(cache_path) as f:
+                f.write(json.dumps(meta, separators=(',', ':')).encode('utf-8'))
+        except OSError as e:
+            print(f"⚠️ 日历索引缓存写入失败: {str(e)}")
+
+
+class _EmptyBuffer(bytes):
+    """空文件无法mmap，用空字节串代替"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        return False
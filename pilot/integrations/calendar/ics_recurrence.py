@@ -0,0 +1,182 @@
+"""
+重复时段压缩
+
+多周导出时，午休、休息和固定时刻的番茄钟每天都在同一时间出现。
+按时段标识把多天的条目分组，能用一条按周重复的事件表示的组写成：
+- RRULE:FREQ=WEEKLY;BYDAY=...;UNTIL=... 覆盖大多数出现的星期
+- EXDATE 删除规则内没有该时段的日期，RDATE 补充规则外出现的日期
+- 内容或时间与主事件不同的日期写成同UID、带RECURRENCE-ID的例外实例
+
+例外过多（超过出现次数的一定比例）或出现次数太少的组仍按单个事件导出。
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from ...core.models.config import ExportsConfig
+from ...core.models.schedule import ScheduleItem
+from ...core.scheduling.diff import item_key
+from .ics_state import event_uid, series_uid
+from .ics_writer import ICSStreamWriter
+
+
+class RecurringSeries:
+    """一组按周重复的事件"""
+    __slots__ = ('uid', 'item', 'first_date', 'until_date', 'weekdays', 'exdates', 'rdates', 'overrides')
+    
+    def __init__(
+        self,
+        uid: str,
+        item: ScheduleItem,
+        first_date: date,
+        until_date: date,
+        weekdays: List[int],
+        exdates: List[date],
+        rdates: List[date],
+        overrides: List[Tuple[date, ScheduleItem]]
+    ):
+        self.uid = uid
+        self.item = item
+        self.first_date = first_date
+        self.until_date = until_date
+        self.weekdays = weekdays
+        self.exdates = exdates
+        self.rdates = rdates
+        self.overrides = overrides
+
+
+def _fingerprint(item: ScheduleItem) -> tuple:
+    """条目写入ICS时的全部内容"""
+    return (
+        item.start_time, item.end_time, item.title, item.description, item.type, item.location,
+        item.task_title, item.subtask, item.focus_content, item.cycle_number,
+    )
+
+
+def _rule_dates(first: date, last: date, weekdays: set) -> List[date]:
+    """[first, last] 内星期属于weekdays的日期"""
+    return [
+        first + timedelta(days=offset)
+        for offset in range((last - first).days + 1)
+        if (first + timedelta(days=offset)).weekday() in weekdays
+    ]
+
+
+def compress_recurring(
+    dated_items: Iterable[Tuple[date, ScheduleItem]],
+    user_id: str,
+    min_occurrences: int = 3,
+    max_exception_ratio: float = 0.5
+) -> Tuple[List[RecurringSeries], List[Tuple[date, ScheduleItem, str]]]:
+    """把多天日程拆成重复事件和单个事件
+    
+    返回 (重复事件列表, 单个事件列表)，单个事件为 (日期, 条目, UID)，UID与逐个导出时相同。
+    同一时段同一天出现多次时无法用一条重复规则表示，整组按单个事件导出。
+    """
+    groups: Dict[str, List[Tuple[date, ScheduleItem]]] = defaultdict(list)
+    for item_date, item in dated_items:
+        groups[item_key(item)].append((item_date, item))
+    
+    series: List[RecurringSeries] = []
+    singles: List[Tuple[date, ScheduleItem, str]] = []
+    for key, entries in groups.items():
+        found = _build_series(key, entries, user_id, min_occurrences, max_exception_ratio)
+        if found is None:
+            singles.extend((item_date, item, event_uid(user_id, item_date, item)) for item_date, item in entries)
+        else:
+            series.append(found)
+    
+    singles.sort(key=lambda entry: (entry[0], entry[1].start_time))
+    series.sort(key=lambda found: (found.first_date, found.item.start_time))
+    return series, singles
+
+
+def _build_series(
+    key: str,
+    entries: List[Tuple[date, ScheduleItem]],
+    user_id: str,
+    min_occurrences: int,
+    max_exception_ratio: float
+):
+    """尝试把同一时段的条目表示为按周重复的事件，不合适时返回None"""
+    by_date = dict(entries)
+    if len(by_date) < max(min_occurrences, 2) or len(by_date) != len(entries):
+        return None
+    
+    # 主事件取出现最多的内容
+    fingerprints = Counter(_fingerprint(item) for item in by_date.values())
+    master_print = fingerprints.most_common(1)[0][0]
+    master = next(item for item in by_date.values() if _fingerprint(item) == master_print)
+    
+    # 某个星期在范围内一半以上的日期出现，才纳入规则
+    first, last = min(by_date), max(by_date)
+    present = Counter(day.weekday() for day in by_date)
+    total = Counter(
+        (first + timedelta(days=offset)).weekday() for offset in range((last - first).days + 1)
+    )
+    weekdays = {day for day, count in present.items() if count * 2 > total[day]}
+    if not weekdays:
+        return None
+    
+    rule_days = _rule_dates(first, last, weekdays)
+    rule_set = set(rule_days)
+    exdates = [day for day in rule_days if day not in by_date]
+    rdates = sorted(day for day in by_date if day not in rule_set)
+    overrides = sorted(
+        ((day, item) for day, item in by_date.items() if _fingerprint(item) != master_print),
+        key=lambda entry: entry[0]
+    )
+    if len(exdates) + len(rdates) + len(overrides) > max_exception_ratio * len(by_date):
+        return None
+    
+    return RecurringSeries(
+        uid=series_uid(user_id, rule_days[0], key),
+        item=master,
+        first_date=rule_days[0],
+        until_date=rule_days[-1],
+        weekdays=sorted(weekdays),
+        exdates=exdates,
+        rdates=rdates,
+        overrides=overrides
+    )
+
+
+def write_compressed(
+    writer: ICSStreamWriter,
+    series: List[RecurringSeries],
+    singles: List[Tuple[date, ScheduleItem, str]],
+    first_year: int,
+    last_year: int
+):
+    """写出compress_recurring的结果：VTIMEZONE、重复事件及其例外实例、单个事件"""
+    if series:
+        writer.write_timezone(first_year, last_year)
+    for found in series:
+        writer.write_series(
+            found.first_date, found.item, found.uid, found.until_date, found.weekdays, found.exdates, found.rdates
+        )
+        for item_date, item in found.overrides:
+            writer.write_event(
+                item_date, item, uid=found.uid, recurrence_id=datetime.combine(item_date, found.item.start_time)
+            )
+    for item_date, item, uid in singles:
+        writer.write_event(item_date, item, uid=uid)
+
+
+def write_range(
+    writer: ICSStreamWriter,
+    dated_items: Iterable[Tuple[date, ScheduleItem]],
+    user_id: str,
+    exports: ExportsConfig,
+    first_year: int,
+    last_year: int
+) -> int:
+    """按导出配置写出多天日程（compress_recurring时压缩重复时段），返回重复事件数"""
+    if not exports.compress_recurring:
+        for item_date, item in dated_items:
+            writer.write_event(item_date, item, uid=event_uid(user_id, item_date, item))
+        return 0
+    series, singles = compress_recurring(dated_items, user_id, min_occurrences=exports.recurring_min_occurrences)
+    write_compressed(writer, series, singles, first_year, last_year)
+    return len(series)
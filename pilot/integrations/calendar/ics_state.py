@@ -0,0 +1,172 @@
+"""
+ICS导出状态与增量对比
+
+事件UID由 (用户, 日期, 时段标识) 通过uuid5生成，同一个番茄钟重复导出时UID不变，日历应用会更新原事件而不是重复添加。
+每次导出后把各事件的UID、SEQUENCE、创建/修改时间和内容保存到状态文件（~/.pilot/ics_state.json），
+下一次导出时按slot_id与上次的内容对比：
+- 新增的时段：SEQUENCE为0
+- 内容变化的时段：SEQUENCE加一，LAST-MODIFIED更新为本次导出时间
+- 不再存在的时段：SEQUENCE加一并标记STATUS:CANCELLED，让已导入的日历删除该事件
+- 未变化的时段：增量导出时不写出
+"""
+
+import getpass
+import json
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ...core.models.config import ExportsConfig
+from ...core.models.schedule import ScheduleItem
+from ...core.scheduling.diff import diff_schedules, item_key
+from ...utils.atomic import atomic_write
+
+
+# 所有P.I.L.O.T.事件UID的命名空间
+PILOT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "pilot.ai")
+UID_DOMAIN = "pilot.ai"
+
+
+def resolve_user_id(config: ExportsConfig) -> str:
+    """导出使用的用户标识：配置的user_id，留空时为系统用户名"""
+    return config.user_id or getpass.getuser()
+
+
+def event_uid(user_id: str, target_date: date, item: ScheduleItem) -> str:
+    """由用户、日期和时段标识生成稳定的事件UID"""
+    name = f"{user_id}/{target_date.isoformat()}/{item_key(item)}"
+    return f"{uuid.uuid5(PILOT_NAMESPACE, name)}@{UID_DOMAIN}"
+
+
+def series_uid(user_id: str, first_date: date, key: str) -> str:
+    """重复事件的UID：由用户、第一个实例的日期和时段标识生成"""
+    name = f"{user_id}/series/{first_date.isoformat()}/{key}"
+    return f"{uuid.uuid5(PILOT_NAMESPACE, name)}@{UID_DOMAIN}"
+
+
+class ExportedEvent(BaseModel):
+    """上次导出的单个事件"""
+    uid: str
+    sequence: int = 0
+    created: str = Field(description="首次导出时间（UTC，YYYYMMDDTHHMMSSZ）")
+    last_modified: str = Field(description="内容最后一次变化的导出时间")
+    cancelled: bool = False
+    item: ScheduleItem
+
+
+class PendingEvent(BaseModel):
+    """本次需要写出的事件"""
+    item: ScheduleItem
+    uid: str
+    sequence: int
+    created: str
+    last_modified: str
+    status: Optional[str] = None
+
+
+class ExportState:
+    """已导出事件的状态（按日期、slot_id索引）"""
+    
+    def __init__(self, config: Optional[ExportsConfig] = None, path: Optional[Path] = None):
+        self.config = config or ExportsConfig()
+        self.path = Path(path or self.config.state_path).expanduser()
+        self.user_id = resolve_user_id(self.config)
+        self._days: Dict[str, Dict[str, ExportedEvent]] = {}
+    
+    @classmethod
+    def load(cls, config: Optional[ExportsConfig] = None, path: Optional[Path] = None) -> "ExportState":
+        """加载状态文件，文件不存在时返回空状态"""
+        state = cls(config, path)
+        if state.path.exists():
+            try:
+                with open(state.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # 用户标识变化后UID全部不同，旧记录不能再用于对比
+                if data.get('user_id') == state.user_id:
+                    for day, events in data.get('days', {}).items():
+                        state._days[day] = {key: ExportedEvent.model_validate(event) for key, event in events.items()}
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 导出状态读取失败，将全量导出: {str(e)}")
+        return state
+    
+    def save(self, today: Optional[date] = None):
+        """清理过期记录后写回文件"""
+        cutoff = ((today or date.today()) - timedelta(days=self.config.state_retention_days)).isoformat()
+        self._days = {day: events for day, events in self._days.items() if day >= cutoff}
+        
+        data = json.dumps({
+            'user_id': self.user_id,
+            'days': {
+                day: {key: event.model_dump(mode='json') for key, event in events.items()}
+                for day, events in sorted(self._days.items())
+            }
+        }, ensure_ascii=False)
+        with atomic_write(self.path, fsync=self.config.fsync) as f:
+            f.write(data.encode('utf-8'))
+    
+    def has_day(self, target_date: date) -> bool:
+        """该日期是否导出过"""
+        return target_date.isoformat() in self._days
+    
+    def plan_day(
+        self,
+        target_date: date,
+        schedule: List[ScheduleItem],
+        now: str,
+        incremental: bool = True
+    ) -> Tuple[List[PendingEvent], str]:
+        """对比上次导出的内容，返回需要写出的事件和差异摘要，并更新状态
+        
+        incremental为False时未变化的事件也一并写出（SEQUENCE不变），用于生成完整的日历文件。
+        now为本次导出时间（UTC，YYYYMMDDTHHMMSSZ）。
+        """
+        previous = self._days.get(target_date.isoformat(), {})
+        live = [event.item for event in previous.values() if not event.cancelled]
+        diff = diff_schedules(live, schedule)
+        changed = {change.slot_id for change in diff.changed}
+        
+        pending: List[PendingEvent] = []
+        events: Dict[str, ExportedEvent] = {}
+        for item in schedule:
+            key = item_key(item)
+            old = previous.get(key)
+            if old is None:
+                event = ExportedEvent(uid=event_uid(self.user_id, target_date, item), created=now, last_modified=now, item=item)
+            elif old.cancelled or key in changed:
+                # 已取消的时段重新出现也视为一次修改，SEQUENCE需要大于取消时的值
+                event = old.model_copy(update={'sequence': old.sequence + 1, 'last_modified': now, 'cancelled': False, 'item': item})
+            else:
+                event = old
+            events[key] = event
+            if incremental and event is old:
+                continue
+            pending.append(PendingEvent(
+                item=item,
+                uid=event.uid,
+                sequence=event.sequence,
+                created=event.created,
+                last_modified=event.last_modified
+            ))
+        
+        for key, old in previous.items():
+            if key in events:
+                continue
+            if old.cancelled:
+                events[key] = old
+                continue
+            event = old.model_copy(update={'sequence': old.sequence + 1, 'last_modified': now, 'cancelled': True})
+            events[key] = event
+            pending.append(PendingEvent(
+                item=event.item,
+                uid=event.uid,
+                sequence=event.sequence,
+                created=event.created,
+                last_modified=now,
+                status="CANCELLED"
+            ))
+        
+        self._days[target_date.isoformat()] = events
+        return pending, diff.summary()
@@ -0,0 +1,572 @@
+"""
+流式ICS写入
+
+不经过icalendar的对象模型，直接把VEVENT/VALARM按RFC 5545写入二进制文件句柄：
+- 文本值按规范转义（\\ ; , 换行），超过75字节的行在UTF-8字符边界处折行
+- 事件时间统一写成UTC（...Z），时区偏移按 (时区, 日期, 小时) 缓存，不对每个事件调用pytz.localize
+- 标题、描述和提醒按条目类型预先生成转义好的模板，只替换时长、任务等可变字段
+- DTSTAMP/CREATED/LAST-MODIFIED 在一次导出中只计算一次
+- 多天重复的时段可写成按周重复的事件（RRULE + EXDATE/RDATE，例外实例用RECURRENCE-ID），
+  带TZID的时间引用由pytz切换表生成的VTIMEZONE
+- compact配置去掉每个事件重复的提示和署名（提示改为日历级描述），只保留时长和任务相关内容，
+  并可按类型限制提醒数量
+
+写出的内容与原先基于icalendar的导出在语义上一致（同样的标题、描述、时间和提醒），
+上万个事件也只占用常量内存。
+"""
+
+import bisect
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import pytz
+
+from ...core.models.schedule import ScheduleItem, PomodoroType
+
+
+PRODID = "-//P.I.L.O.T. v1.0-MVP//pilot.ai//"
+CALENDAR_DESCRIPTION = "P.I.L.O.T. 智能时间规划与番茄钟管理"
+PILOT_VERSION = "1.0-MVP"
+
+# 单行最大字节数（不含CRLF）
+MAX_LINE_OCTETS = 75
+
+# RRULE中的星期代码（0=周一）
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def escape_text(value: str) -> str:
+    """按RFC 5545转义TEXT类型的值"""
+    if '\\' in value:
+        value = value.replace('\\', '\\\\')
+    return value.replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold_line(line: str) -> bytes:
+    """编码为UTF-8并按75字节折行，续行以一个空格开头，返回带CRLF的字节串"""
+    data = line.encode('utf-8')
+    if len(data) <= MAX_LINE_OCTETS:
+        return data + b"\r\n"
+    
+    parts = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        # 不在多字节字符中间断开
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start = end
+        limit = MAX_LINE_OCTETS - 1  # 续行开头的空格占一个字节
+    parts.append(data[start:])
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def text_property(name: str, value: str) -> bytes:
+    """转义并折行的TEXT属性行"""
+    return fold_line(f"{name}:{escape_text(value)}")
+
+
+@lru_cache(maxsize=65536)
+def _hour_offset(zone: str, day: date, hour: int) -> int:
+    """某时区某天某小时的UTC偏移分钟数（逐个调用pytz.localize）"""
+    tz = pytz.timezone(zone)
+    return int(tz.localize(datetime(day.year, day.month, day.day, hour)).utcoffset().total_seconds()) // 60
+
+
+@lru_cache(maxsize=64)
+def _zone_transitions(zone: str) -> Optional[Tuple[List[int], List[int], frozenset]]:
+    """时区的偏移切换表：(切换时刻的UTC分钟序号, 切换后的偏移, 切换发生的当地日期序号±1)
+    
+    固定偏移的时区切换表为空；无法读取切换表的时区返回None，逐小时计算。
+    """
+    tz = pytz.timezone(zone)
+    if isinstance(tz, pytz.tzinfo.StaticTzInfo) or tz is pytz.utc:
+        return [], [int(tz.utcoffset(None).total_seconds()) // 60], frozenset()
+    times = getattr(tz, '_utc_transition_times', None)
+    infos = getattr(tz, '_transition_info', None)
+    if not times or not infos:
+        return None
+    
+    moments = [moment.toordinal() * 1440 + moment.hour * 60 + moment.minute for moment in times]
+    offsets = [int(info[0].total_seconds()) // 60 for info in infos]
+    risky = set()
+    for moment, offset in zip(moments, offsets):
+        local_day = (moment + offset) // 1440
+        risky.update((local_day - 1, local_day, local_day + 1))
+    return moments, offsets, frozenset(risky)
+
+
+def utc_offset_minutes(zone: str, day: date, hour: int) -> int:
+    """某时区当地某天某小时的UTC偏移
+    
+    查切换表二分得到当天偏移；只有切换日前后才逐小时调用pytz.localize（切换都发生在整点）。
+    """
+    table = _zone_transitions(zone)
+    ordinal = day.toordinal()
+    if table is None or ordinal in table[2]:
+        return _hour_offset(zone, day, hour)
+    moments, offsets, _ = table
+    # 非切换日的当地正午与UTC相差不到一天，不会越过任何切换点
+    index = bisect.bisect_right(moments, ordinal * 1440 + 720) - 1
+    return offsets[max(index, 0)]
+
+
+@lru_cache(maxsize=8192)
+def _day_stamp(ordinal: int) -> str:
+    """日期序号对应的YYYYMMDD"""
+    return date.fromordinal(ordinal).strftime('%Y%m%d')
+
+
+def utc_stamp(zone: str, day: date, clock: time) -> str:
+    """当地日期和时间转换为UTC的iCalendar时间串（YYYYMMDDTHHMMSSZ）"""
+    minutes = day.toordinal() * 1440 + clock.hour * 60 + clock.minute - utc_offset_minutes(zone, day, clock.hour)
+    ordinal, minute_of_day = divmod(minutes, 1440)
+    return f"{_day_stamp(ordinal)}T{minute_of_day // 60:02d}{minute_of_day % 60:02d}{clock.second:02d}Z"
+
+
+def local_stamp(value: datetime) -> str:
+    """当地时间的iCalendar时间串（YYYYMMDDTHHMMSS，配合TZID使用）"""
+    return f"{value.year:04d}{value.month:02d}{value.day:02d}T{value.hour:02d}{value.minute:02d}{value.second:02d}"
+
+
+def _format_offset(minutes: int) -> str:
+    sign = '-' if minutes < 0 else '+'
+    return f"{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}"
+
+
+@lru_cache(maxsize=64)
+def vtimezone_block(zone: str, first_year: int, last_year: int) -> bytes:
+    """时区的VTIMEZONE组件，列出 [first_year, last_year] 内的每次偏移切换"""
+    tz = pytz.timezone(zone)
+    lines = [b"BEGIN:VTIMEZONE\r\n", fold_line(f"TZID:{zone}")]
+    
+    def observance(kind: str, start: datetime, offset_from: int, offset_to: int, name: str):
+        lines.append(f"BEGIN:{kind}\r\nDTSTART:{local_stamp(start)}\r\n".encode())
+        lines.append(f"TZOFFSETFROM:{_format_offset(offset_from)}\r\nTZOFFSETTO:{_format_offset(offset_to)}\r\n".encode())
+        lines.append(fold_line(f"TZNAME:{name}"))
+        lines.append(f"END:{kind}\r\n".encode())
+    
+    window_start = datetime(first_year, 1, 1)
+    window_end = datetime(last_year + 1, 1, 1)
+    times = getattr(tz, '_utc_transition_times', None)
+    infos = getattr(tz, '_transition_info', None)
+    if not times or not infos:
+        offset = int(tz.utcoffset(window_start).total_seconds()) // 60
+        observance("STANDARD", datetime(1970, 1, 1), offset, offset, tz.tzname(window_start) or zone)
+    else:
+        # 窗口开始时生效的偏移作为初始时段
+        index = max(bisect.bisect_right(times, window_start) - 1, 0)
+        offset = int(infos[index][0].total_seconds()) // 60
+        kind = "DAYLIGHT" if infos[index][1] else "STANDARD"
+        observance(kind, datetime(1970, 1, 1), offset, offset, infos[index][2])
+        for moment, info in zip(times[index + 1:], infos[index + 1:]):
+            if moment >= window_end:
+                break
+            new_offset = int(info[0].total_seconds()) // 60
+            local_start = moment + timedelta(minutes=offset)
+            observance("DAYLIGHT" if info[1] else "STANDARD", local_start, offset, new_offset, info[2])
+            offset = new_offset
+    lines.append(b"END:VTIMEZONE\r\n")
+    return b"".join(lines)
+
+
+def format_utc(value: datetime) -> str:
+    """带时区的datetime转换为UTC的iCalendar时间串"""
+    return value.astimezone(pytz.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+# 事件标题中的类型图标
+EMOJI_MAP = {
+    PomodoroType.FOCUS: "🍅",
+    PomodoroType.SHORT_BREAK: "☕",
+    PomodoroType.LONG_BREAK: "🛋️",
+    PomodoroType.LUNCH: "🍽️",
+    PomodoroType.TASK: "📋"
+}
+
+# 描述末尾的固定署名
+_DESCRIPTION_FOOTER = ["", "---", "📱 由 P.I.L.O.T. v1.0-MVP 生成", "🔗 智能时间规划与番茄钟管理工具"]
+
+_FOCUS_TIPS = [
+    "💡 专注提示:",
+    "• 关闭通知和干扰源",
+    "• 专注于当前任务",
+    "• 保持深度工作状态",
+    "• 遇到干扰记录后继续"
+]
+
+# 各类型描述模板：{duration} 为时长（分钟）
+_DESCRIPTION_TEMPLATES = {
+    PomodoroType.SHORT_BREAK: "\n".join([
+        "☕ 短休息时间",
+        "⏱️ 持续时间: {duration}分钟",
+        "",
+        "💡 建议活动:",
+        "• 喝水或伸展身体",
+        "• 眺望远方放松眼睛",
+        "• 做简单的运动",
+        "• 避免查看手机或电脑"
+    ] + _DESCRIPTION_FOOTER),
+    PomodoroType.LONG_BREAK: "\n".join([
+        "🛋️ 长休息时间",
+        "⏱️ 持续时间: {duration}分钟",
+        "",
+        "💡 建议活动:",
+        "• 散步或户外活动",
+        "• 吃点心补充能量",
+        "• 与同事聊天放松",
+        "• 回顾前面的工作成果"
+    ] + _DESCRIPTION_FOOTER),
+    PomodoroType.LUNCH: "\n".join([
+        "🍽️ 午餐休息时间",
+        "⏱️ 建议用餐并适当休息",
+        "🕐 14:10 准备恢复工作",
+        "",
+        "💡 午休建议:",
+        "• 营养均衡的午餐",
+        "• 适当的休息或小憩",
+        "• 为下午工作做准备"
+    ] + _DESCRIPTION_FOOTER),
+}
+
+# compact配置下固定模板类型的描述：只保留时长等必要信息
+_COMPACT_DESCRIPTION_TEMPLATES = {
+    PomodoroType.SHORT_BREAK: "⏱️ {duration}分钟",
+    PomodoroType.LONG_BREAK: "⏱️ {duration}分钟",
+    PomodoroType.LUNCH: "🕐 14:10 准备恢复工作",
+}
+
+# 导出配置：full为完整描述和全部提醒，compact去掉重复的提示和署名
+PROFILE_FULL = "full"
+PROFILE_COMPACT = "compact"
+
+# compact配置下默认的提醒数量（未列出的类型保留全部）
+_COMPACT_ALARM_LIMITS = {PomodoroType.FOCUS: 1}
+
+# 提醒：(触发偏移分钟, 文案)，文案中的 {title} 为条目标题
+_ALARM_TEMPLATES: Dict[PomodoroType, List[Tuple[int, str]]] = {
+    PomodoroType.FOCUS: [(-5, "🍅 番茄钟即将开始（5分钟后）"), (-1, "🍅 番茄钟即将开始（1分钟后）")],
+    PomodoroType.SHORT_BREAK: [(-1, "☕ 番茄休息即将结束，准备继续工作")],
+    PomodoroType.LONG_BREAK: [(-5, "🛋️ 长休息即将结束，准备恢复工作")],
+    PomodoroType.TASK: [(-10, "📋 任务即将开始: {title}")],
+    PomodoroType.LUNCH: [(0, "🍽️ 午餐时间，记得14:10恢复工作")],
+}
+
+
+def reminder_offsets(kind: PomodoroType) -> List[int]:
+    """某类型条目的提醒时间（相对开始的分钟数，负数表示提前）"""
+    return [minutes for minutes, _ in _ALARM_TEMPLATES.get(kind, [])]
+
+
+def resolve_alarm_limits(profile: str, overrides: Optional[Dict[str, int]] = None) -> Dict[PomodoroType, int]:
+    """各类型最多写出的提醒数：配置的默认值，再按类型名（如 {"focus": 1}）覆盖
+    
+    类型名在ExportsConfig加载时已校验，这里不再逐次检查。
+    """
+    limits = dict(_COMPACT_ALARM_LIMITS) if profile == PROFILE_COMPACT else {}
+    for name, limit in (overrides or {}).items():
+        limits[PomodoroType(name)] = limit
+    return limits
+
+
+def event_summary(item: ScheduleItem) -> str:
+    """事件标题"""
+    emoji = EMOJI_MAP.get(item.type, "📅")
+    if item.type == PomodoroType.FOCUS:
+        if item.task_title and item.subtask:
+            return f"{emoji} 番茄钟 #{item.cycle_number}: {item.subtask}"
+        return f"{emoji} 番茄钟 #{item.cycle_number} - 专注时间"
+    if item.type == PomodoroType.SHORT_BREAK:
+        return f"{emoji} 番茄休息"
+    if item.type == PomodoroType.LONG_BREAK:
+        return f"{emoji} 长休息"
+    if item.type == PomodoroType.LUNCH:
+        return f"{emoji} 午休时间"
+    return f"{emoji} {item.title}"
+
+
+def event_minutes(item: ScheduleItem) -> int:
+    """事件时长（分钟）；与写出DTEND一致，结束时间早于开始时间时视为跨午夜"""
+    minutes = item.duration_minutes()
+    return minutes + 24 * 60 if minutes < 0 else minutes
+
+
+def event_description(item: ScheduleItem, compact: bool = False) -> str:
+    """事件描述"""
+    template = (_COMPACT_DESCRIPTION_TEMPLATES if compact else _DESCRIPTION_TEMPLATES).get(item.type)
+    if template is not None:
+        return template.format(duration=event_minutes(item))
+    return _build_description(
+        item.type, event_minutes(item), item.title, item.task_title, item.subtask, item.focus_content, compact
+    )
+
+
+def _build_description(
+    kind: PomodoroType,
+    duration: int,
+    title: str,
+    task_title: str,
+    subtask: str,
+    focus_content: str,
+    compact: bool = False
+) -> str:
+    """专注和任务条目的描述（内容随任务变化）"""
+    if compact:
+        return _build_compact_description(kind, duration, task_title, subtask, focus_content)
+    lines = []
+    if kind == PomodoroType.FOCUS:
+        lines.extend(["🎯 专注工作时间", f"⏱️ 持续时间: {duration}分钟", ""])
+        if task_title:
+            lines.extend(["📋 本次番茄钟任务:", f"主任务: {task_title}"])
+            if subtask and subtask != task_title:
+                lines.append(f"具体内容: {subtask}")
+            if focus_content:
+                lines.extend(["", "🎯 专注要点:", focus_content])
+            lines.append("")
+        lines.extend(_FOCUS_TIPS)
+    elif kind == PomodoroType.TASK:
+        lines.extend([f"📋 任务: {title}", f"⏱️ 预计用时: {duration}分钟"])
+        if focus_content:
+            lines.extend(["", "📝 任务详情:", focus_content])
+    return "\n".join(lines + _DESCRIPTION_FOOTER)
+
+
+def _build_compact_description(kind: PomodoroType, duration: int, task_title: str, subtask: str, focus_content: str) -> str:
+    """compact配置的描述：时长和任务相关内容，不含提示和署名（标题已在SUMMARY中）"""
+    if kind == PomodoroType.TASK:
+        lines = [f"⏱️ 预计用时: {duration}分钟"]
+    else:
+        lines = [f"⏱️ {duration}分钟"]
+        if task_title:
+            lines.append(f"📋 {task_title}")
+            if subtask and subtask != task_title:
+                lines.append(f"具体内容: {subtask}")
+    if focus_content:
+        lines.append(f"🎯 {focus_content}")
+    return "\n".join(lines)
+
+
+def _format_trigger(minutes: int) -> str:
+    """提醒触发偏移（相对事件开始）"""
+    if minutes == 0:
+        return "PT0S"
+    return f"{'-' if minutes < 0 else ''}PT{abs(minutes)}M"
+
+
+@lru_cache(maxsize=1024)
+def _alarm_block(kind: PomodoroType, title: str, limit: Optional[int] = None) -> bytes:
+    """某类型条目的VALARM（只有任务提醒包含标题，其余类型title传空串以共享缓存）
+    
+    limit限制提醒数量，按模板顺序保留（最早的提醒在前）。
+    """
+    lines = []
+    for minutes, text in _ALARM_TEMPLATES.get(kind, [])[:limit]:
+        lines.append(b"BEGIN:VALARM\r\nACTION:DISPLAY\r\n")
+        lines.append(text_property("DESCRIPTION", text.format(title=title)))
+        lines.append(f"TRIGGER:{_format_trigger(minutes)}\r\n".encode())
+        lines.append(b"END:VALARM\r\n")
+    return b"".join(lines)
+
+
+@lru_cache(maxsize=65536)
+def _description_line(
+    kind: PomodoroType,
+    duration: int,
+    title: str,
+    task_title: str,
+    subtask: str,
+    focus_content: str,
+    compact: bool = False
+) -> bytes:
+    """转义、折行后的DESCRIPTION行（多天日程中大量重复，缓存后只生成一次）"""
+    template = (_COMPACT_DESCRIPTION_TEMPLATES if compact else _DESCRIPTION_TEMPLATES).get(kind)
+    if template is not None:
+        text = template.format(duration=duration)
+    else:
+        text = _build_description(kind, duration, title, task_title, subtask, focus_content, compact)
+    return text_property("DESCRIPTION", text)
+
+
+class ICSStreamWriter:
+    """流式ICS写入器
+    
+    用法：
+        with open(path, 'wb') as f, ICSStreamWriter(f, "Asia/Shanghai", calname) as writer:
+            for day, item in dated_items:
+                writer.write_event(day, item)
+    """
+    
+    def __init__(
+        self,
+        stream: BinaryIO,
+        timezone: str,
+        calname: str,
+        caldesc: str = CALENDAR_DESCRIPTION,
+        method: str = "PUBLISH",
+        now: Optional[datetime] = None,
+        profile: str = PROFILE_FULL,
+        alarm_limits: Optional[Dict[str, int]] = None
+    ):
+        self.stream = stream
+        self.timezone = timezone
+        self.calname = calname
+        self.compact = profile == PROFILE_COMPACT
+        # compact配置下专注提示只在日历描述中出现一次
+        self.caldesc = "\n".join([caldesc, ""] + _FOCUS_TIPS) if self.compact else caldesc
+        self.method = method
+        self.dtstamp = format_utc(now or datetime.now(pytz.utc))
+        self.alarm_limits = resolve_alarm_limits(profile, alarm_limits)
+        self.count = 0
+    
+    def __enter__(self) -> "ICSStreamWriter":
+        self.write_header()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.write_footer()
+    
+    def write_header(self):
+        """写出VCALENDAR头部属性"""
+        self.stream.write(b"".join([
+            b"BEGIN:VCALENDAR\r\n",
+            fold_line(f"PRODID:{PRODID}"),
+            b"VERSION:2.0\r\n",
+            b"CALSCALE:GREGORIAN\r\n",
+            fold_line(f"METHOD:{self.method}"),
+            text_property("X-WR-CALNAME", self.calname),
+            fold_line(f"X-WR-TIMEZONE:{self.timezone}"),
+            text_property("X-WR-CALDESC", self.caldesc),
+        ]))
+    
+    def write_footer(self):
+        """写出VCALENDAR结尾"""
+        self.stream.write(b"END:VCALENDAR\r\n")
+    
+    def write_event(
+        self,
+        target_date: date,
+        item: ScheduleItem,
+        uid: Optional[str] = None,
+        sequence: int = 0,
+        status: Optional[str] = None,
+        created: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        recurrence_id: Optional[datetime] = None
+    ):
+        """写出单个事件及其提醒；结束时间早于开始时间时视为跨午夜
+        
+        sequence/status/created/last_modified用于增量导出：同一UID的事件每次内容变化SEQUENCE加一，
+        status为CANCELLED时不写提醒。时间参数为format_utc格式的字符串，缺省取本次导出时间。
+        recurrence_id为重复事件中被替换实例的原开始时间（当地时间），用于写出例外实例。
+        """
+        zone = self.timezone
+        start = utc_stamp(zone, target_date, item.start_time)
+        end_date = target_date if item.end_time >= item.start_time else date.fromordinal(target_date.toordinal() + 1)
+        end = utc_stamp(zone, end_date, item.end_time)
+        times = f"DTSTART:{start}\r\nDTEND:{end}\r\n"
+        if recurrence_id is not None:
+            times += f"RECURRENCE-ID;TZID={zone}:{local_stamp(recurrence_id)}\r\n"
+        self._write_vevent(item, times.encode(), uid, sequence, status, created, last_modified)
+    
+    def write_series(
+        self,
+        first_date: date,
+        item: ScheduleItem,
+        uid: str,
+        until_date: date,
+        weekdays: List[int],
+        exdates: List[date],
+        rdates: List[date]
+    ):
+        """写出按周重复的事件（当地时间重复，夏令时切换后时刻不变；需先调用write_timezone）
+        
+        first_date为第一个实例，weekdays为重复的星期（0=周一），exdates/rdates为规则之外删除/增加的日期，
+        时刻都取item的开始时间。
+        """
+        zone = self.timezone
+        end_date = first_date if item.end_time >= item.start_time else date.fromordinal(first_date.toordinal() + 1)
+        start_time = item.start_time
+        lines = [
+            f"DTSTART;TZID={zone}:{local_stamp(datetime.combine(first_date, start_time))}\r\n"
+            f"DTEND;TZID={zone}:{local_stamp(datetime.combine(end_date, item.end_time))}\r\n".encode(),
+            fold_line(
+                f"RRULE:FREQ=WEEKLY;BYDAY={','.join(WEEKDAY_CODES[day] for day in sorted(weekdays))}"
+                f";UNTIL={utc_stamp(zone, until_date, start_time)}"
+            ),
+        ]
+        if exdates:
+            lines.append(fold_line(
+                f"EXDATE;TZID={zone}:" + ",".join(local_stamp(datetime.combine(day, start_time)) for day in exdates)
+            ))
+        if rdates:
+            lines.append(fold_line(
+                f"RDATE;TZID={zone}:" + ",".join(local_stamp(datetime.combine(day, start_time)) for day in rdates)
+            ))
+        self._write_vevent(item, b"".join(lines), uid, 0, None, None, None)
+    
+    def write_timezone(self, first_year: int, last_year: int):
+        """写出VTIMEZONE（带TZID的时间引用它）"""
+        self.stream.write(vtimezone_block(self.timezone, first_year, last_year))
+    
+    def _write_vevent(
+        self,
+        item: ScheduleItem,
+        times: bytes,
+        uid: Optional[str],
+        sequence: int,
+        status: Optional[str],
+        created: Optional[str],
+        last_modified: Optional[str]
+    ):
+        kind = item.type
+        alarms = b""
+        if status != "CANCELLED":
+            alarms = _alarm_block(kind, item.title if kind == PomodoroType.TASK else "", self.alarm_limits.get(kind))
+        if self.compact:
+            # 省略取默认值的SEQUENCE:0、与DTSTAMP相同的CREATED/LAST-MODIFIED，版本号已在PRODID中
+            self.stream.write(b"".join([
+                b"BEGIN:VEVENT\r\n",
+                text_property("SUMMARY", event_summary(item)),
+                times,
+                f"DTSTAMP:{self.dtstamp}\r\n".encode(),
+                fold_line(f"UID:{uid or uuid4()}"),
+                f"SEQUENCE:{sequence}\r\n".encode() if sequence else b"",
+                f"STATUS:{status}\r\n".encode() if status else b"",
+                f"CREATED:{created}\r\n".encode() if created and created != self.dtstamp else b"",
+                f"LAST-MODIFIED:{last_modified}\r\n".encode() if last_modified and last_modified != self.dtstamp else b"",
+                f"CATEGORIES:P.I.L.O.T.,番茄钟,{kind.value}\r\nX-PILOT-TYPE:{kind.value}\r\n".encode(),
+                self._description(item),
+                alarms,
+                b"END:VEVENT\r\n",
+            ]))
+            self.count += 1
+            return
+        self.stream.write(b"".join([
+            b"BEGIN:VEVENT\r\n",
+            text_property("SUMMARY", event_summary(item)),
+            times,
+            f"DTSTAMP:{self.dtstamp}\r\n".encode(),
+            fold_line(f"UID:{uid or uuid4()}"),
+            f"SEQUENCE:{sequence}\r\n".encode(),
+            f"STATUS:{status}\r\n".encode() if status else b"",
+            f"CATEGORIES:P.I.L.O.T.,番茄钟,{kind.value}\r\nCREATED:{created or self.dtstamp}\r\n".encode(),
+            self._description(item),
+            f"LAST-MODIFIED:{last_modified or self.dtstamp}\r\n"
+            f"X-PILOT-VERSION:{PILOT_VERSION}\r\nX-PILOT-TYPE:{kind.value}\r\n".encode(),
+            alarms,
+            b"END:VEVENT\r\n",
+        ]))
+        self.count += 1
+    
+    def _description(self, item: ScheduleItem) -> bytes:
+        """DESCRIPTION行；固定模板的类型只按时长缓存"""
+        if item.type in _DESCRIPTION_TEMPLATES:
+            return _description_line(item.type, event_minutes(item), "", "", "", "", self.compact)
+        return _description_line(
+            item.type, event_minutes(item), item.title, item.task_title, item.subtask, item.focus_content, self.compact
+        )
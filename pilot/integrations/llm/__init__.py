@@ -3,7 +3,11 @@ LLM集成模块
 """
 
 from .openai import OpenAILLM
+from .limiter import AdaptiveConcurrencyLimiter, ThrottledLLM, create_llm
 
 __all__ = [
     'OpenAILLM',
+    'AdaptiveConcurrencyLimiter',
+    'ThrottledLLM',
+    'create_llm',
 ]
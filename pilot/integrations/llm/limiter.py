@@ -0,0 +1,234 @@
+"""
+LLM自适应并发限流
+
+AIMD（加性增、乘性减）限流器：请求延迟与错误率健康时逐步提高并发上限，
+遇到429限流或延迟飙升时按系数快速退避。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+
+from ...interfaces.llm import LLMInterface
+from ...core.models.config import ConcurrencyConfig, PilotConfig
+from .openai import OpenAILLM
+
+
+class LimiterToken:
+    """单次请求的并发令牌"""
+    
+    __slots__ = ('generation', 'started_at')
+    
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.started_at = time.monotonic()
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD自适应并发限流器"""
+    
+    def __init__(self, config: Optional[ConcurrencyConfig] = None):
+        self.config = config or ConcurrencyConfig()
+        self._limit = float(max(self.config.min_limit, min(self.config.max_limit, self.config.initial_limit)))
+        self._in_flight = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+        
+        # 当前调整窗口内的统计
+        self._window_count = 0
+        self._window_saturated = False
+        
+        # 累计指标
+        self._total = 0
+        self._throttled = 0
+        self._errors = 0
+        self._latency_sum_ms = 0.0
+        self._history = deque(maxlen=self.config.history_size)
+        self._record('init')
+    
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+    
+    @property
+    def in_flight(self) -> int:
+        """当前在途请求数"""
+        return self._in_flight
+    
+    def acquire(self, timeout: Optional[float] = None) -> Optional[LimiterToken]:
+        """获取并发令牌，超时返回None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            
+            self._in_flight += 1
+            if self._in_flight >= int(self._limit):
+                self._window_saturated = True
+            return LimiterToken(self._generation)
+    
+    def release(self, token: LimiterToken, throttled: bool = False, error: bool = False):
+        """归还令牌并根据本次请求结果调整并发上限"""
+        latency_ms = (time.monotonic() - token.started_at) * 1000
+        
+        with self._cond:
+            self._in_flight -= 1
+            self._total += 1
+            self._latency_sum_ms += latency_ms
+            if throttled:
+                self._throttled += 1
+            elif error:
+                self._errors += 1
+            
+            latency_spike = latency_ms > self.config.latency_threshold_ms
+            if throttled or latency_spike:
+                # 同一代的请求只触发一次退避，避免一次突发把并发压到最低
+                if token.generation == self._generation:
+                    self._decrease('throttled' if throttled else 'latency_spike')
+            elif not error:
+                self._window_count += 1
+                if self._window_count >= self.config.window_size:
+                    # 只有并发确实打满过才增加，避免空闲时上限无限增长
+                    if self._window_saturated:
+                        self._increase()
+                    self._reset_window()
+            
+            self._cond.notify_all()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """导出当前并发上限及其历史等指标"""
+        with self._cond:
+            return {
+                'current_limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'total_requests': self._total,
+                'throttled_requests': self._throttled,
+                'error_requests': self._errors,
+                'avg_latency_ms': round(self._latency_sum_ms / self._total, 1) if self._total else 0.0,
+                'history': list(self._history),
+            }
+    
+    def _increase(self):
+        """加性增"""
+        new_limit = min(self.config.max_limit, self._limit + self.config.additive_increase)
+        if int(new_limit) != int(self._limit):
+            self._limit = new_limit
+            self._record('increase')
+        else:
+            self._limit = new_limit
+    
+    def _decrease(self, reason: str):
+        """乘性减"""
+        self._limit = max(self.config.min_limit, self._limit * self.config.backoff_factor)
+        self._generation += 1
+        self._reset_window()
+        self._record(reason)
+    
+    def _reset_window(self):
+        """重置调整窗口"""
+        self._window_count = 0
+        self._window_saturated = self._in_flight >= int(self._limit)
+    
+    def _record(self, reason: str):
+        """记录并发上限变化"""
+        self._history.append({
+            'timestamp': time.time(),
+            'limit': int(self._limit),
+            'reason': reason,
+        })
+
+
+class ThrottledLLM(LLMInterface):
+    """带自适应并发限流的LLM包装器
+    
+    放在批量调用方与OpenAILLM之间，所有请求都经过限流器。
+    遇到429时先让限流器退避，再重新排队重试（最多throttle_retries次），
+    因此被包装的客户端不应自行重试429（见create_llm）。
+    """
+    
+    def __init__(self, llm: LLMInterface, limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.llm = llm
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+    
+    def chat_completion(
+        self,
+        messages: list,
+        model: str = None,
+        temperature: float = 0.1,
+        max_tokens: int = 2000,
+        **kwargs
+    ) -> Optional[str]:
+        """聊天补全（受限流控制）"""
+        return self._call(
+            self.llm.chat_completion,
+            messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+    
+    def parse_command(self, user_input: str, context: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """解析用户命令（受限流控制）"""
+        return self._call(self.llm.parse_command, user_input, context)
+    
+    def validate_api_key(self) -> bool:
+        """验证API密钥"""
+        return self.llm.validate_api_key()
+    
+    def map_chat_completions(self, requests: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """批量并发执行聊天补全，结果顺序与输入一致
+        
+        Args:
+            requests: 每项为chat_completion的关键字参数（至少包含messages）
+        """
+        workers = max(1, self.limiter.config.max_limit)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.chat_completion, **request) for request in requests]
+            return [future.result() for future in futures]
+    
+    def metrics(self) -> Dict[str, Any]:
+        """限流指标"""
+        return self.limiter.metrics()
+    
+    @property
+    def last_error(self) -> Optional[Exception]:
+        """被包装LLM在当前线程最近一次调用的异常"""
+        return getattr(self.llm, 'last_error', None)
+    
+    def _call(self, func, *args, **kwargs):
+        """在限流器保护下执行调用，429时退避后重试"""
+        for attempt in range(self.limiter.config.throttle_retries + 1):
+            if attempt:
+                # 不占用令牌地等待，给服务端恢复的时间
+                time.sleep(min(2 ** (attempt - 1), 8))
+            token = self.limiter.acquire()
+            result = None
+            throttled = False
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                throttled = result is None and self._is_throttled(self.last_error)
+                self.limiter.release(token, throttled=throttled, error=result is None)
+            if not throttled:
+                break
+        return result
+    
+    @staticmethod
+    def _is_throttled(error: Optional[Exception]) -> bool:
+        """判断异常是否为429限流"""
+        if error is None:
+            return False
+        status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+        return status == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def create_llm(config: PilotConfig) -> ThrottledLLM:
+    """按配置创建经过并发限流的OpenAI LLM（SDK不重试，429由限流器退避后重试）"""
+    return ThrottledLLM(OpenAILLM(config, max_retries=0), AdaptiveConcurrencyLimiter(config.concurrency))
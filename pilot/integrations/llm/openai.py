@@ -4,6 +4,7 @@ OpenAI LLM集成
 
 import json
 import re
+import threading
 from typing import Optional, Dict, Any
 from openai import OpenAI
 
@@ -14,15 +15,27 @@ from ...core.models.config import PilotConfig
 class OpenAILLM(LLMInterface):
     """OpenAI LLM实现"""
     
-    def __init__(self, config: PilotConfig):
+    def __init__(self, config: PilotConfig, max_retries: Optional[int] = None):
+        """
+        Args:
+            max_retries: SDK内部重试次数，缺省读取配置；由限流器包装时传0，429直接交给限流器处理
+        """
         self.config = config
         if not config.openai.effective_api_key:
             raise ValueError("未设置OpenAI API密钥")
         
         self.client = OpenAI(
             api_key=config.openai.effective_api_key,
-            base_url=config.openai.effective_base_url
+            base_url=config.openai.effective_base_url,
+            max_retries=config.openai.max_retries if max_retries is None else max_retries
         )
+        # 按线程记录最近一次调用的异常，供并发限流器判断429等错误
+        self._local = threading.local()
+    
+    @property
+    def last_error(self) -> Optional[Exception]:
+        """当前线程最近一次调用的异常（成功时为None）"""
+        return getattr(self._local, 'last_error', None)
     
     def chat_completion(
         self, 
@@ -33,6 +46,7 @@ class OpenAILLM(LLMInterface):
         **kwargs
     ) -> Optional[str]:
         """聊天补全"""
+        self._local.last_error = None
         try:
             response = self.client.chat.completions.create(
                 model=model or self.config.openai.effective_model,
@@ -45,14 +59,17 @@ class OpenAILLM(LLMInterface):
             return response.choices[0].message.content.strip()
             
         except Exception as e:
+            self._local.last_error = e
             print(f"❌ OpenAI API调用失败: {str(e)}")
             return None
     
-    def parse_command(self, user_input: str) -> Optional[Dict[str, Any]]:
+    def parse_command(self, user_input: str, context: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """解析用户命令"""
         try:
             system_prompt = self._get_command_parser_prompt()
             user_prompt = f"用户输入: {user_input}"
+            if context:
+                user_prompt = f"会话上下文: {context}\n\n{user_prompt}"
             
             response = self.chat_completion(
                 messages=[
@@ -113,15 +130,22 @@ class OpenAILLM(LLMInterface):
   "pomodoro_start": "HH:MM",
   "calendar": "google|ics|none",
   "dry_run": false,
+  "allow_rest_day": false,
   "task_content": "详细任务内容",
   "focus_tasks": ["任务A", "任务B"],
   "inbox_content": "收集箱内容",
+  "is_followup": false,
+  "replan_only": false,
+  "edit_instruction": "对当前计划的修改要求",
   "confidence": 0.8
 }
 ```
 
 注意：
+- 如果提供了会话上下文且用户输入是在修改已有计划（如"把项目B挪到下午"），is_followup 为 true，并在 edit_instruction 中概括修改要求
+- 追问只改变会议、工作时间窗口或轮数（任务本身不变）时，replan_only 为 true，并给出变化后的完整 meetings/work_window/cycles
 - 如果信息不明确，使用合理默认值
+- 用户明确要在周末或节假日加班时，allow_rest_day 为 true
 - confidence 表示解析置信度 (0-1)
 - 只输出JSON，不要其他内容"""
     
@@ -33,11 +33,12 @@ class LLMInterface(ABC):
         pass
     
     @abstractmethod
-    def parse_command(self, user_input: str) -> Optional[Dict[str, Any]]:
+    def parse_command(self, user_input: str, context: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """解析用户命令
         
         Args:
             user_input: 用户输入
+            context: 会话上下文（紧凑的结构化状态与滚动摘要），用于识别追问
             
         Returns:
             解析结果字典，失败时返回None
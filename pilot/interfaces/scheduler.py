@@ -3,10 +3,9 @@
 """
 
 from abc import ABC, abstractmethod
-from datetime import time
-from typing import List
-import pytz
-from ..core.models.plan import PlanOutput
+from datetime import date
+from typing import List, Optional
+from ..core.models.plan import PlanInput, PlanOutput, TimeSlot
 from ..core.models.schedule import ScheduleItem
 
 
@@ -16,22 +15,18 @@ class SchedulerInterface(ABC):
     @abstractmethod
     def schedule_pomodoros(
         self, 
+        target_date: date,
         plan_output: PlanOutput,
-        start_time: time,
-        work_window_end: time,
-        mode: str,
-        cycles: int,
-        timezone: pytz.BaseTzInfo
+        plan_input: Optional[PlanInput] = None,
+        blackouts: Optional[List[TimeSlot]] = None
     ) -> List[ScheduleItem]:
         """编排番茄钟
         
         Args:
+            target_date: 目标日期
             plan_output: 计划输出
-            start_time: 开始时间
-            work_window_end: 工作窗口结束时间
-            mode: 工作模式 (work/study)
-            cycles: 轮数
-            timezone: 时区
+            plan_input: 计划输入，提供工作窗口、模式、轮数和会议
+            blackouts: 额外需要避开的时段
             
         Returns:
             调度安排列表
@@ -39,11 +34,12 @@ class SchedulerInterface(ABC):
         pass
     
     @abstractmethod
-    def validate_schedule(self, schedule: List[ScheduleItem]) -> bool:
+    def validate_schedule(self, schedule: List[ScheduleItem], plan_input: Optional[PlanInput] = None) -> bool:
         """验证调度安排
         
         Args:
             schedule: 调度安排列表
+            plan_input: 计划输入，给出时同时检查工作窗口和会议
             
         Returns:
             验证是否通过
@@ -0,0 +1,120 @@
+"""
+任务待办池相关的CLI命令
+"""
+
+import click
+from datetime import date, datetime
+from ...core.models.config import PilotConfig
+from ...core.planning.backlog import Backlog, BacklogItem
+
+
+ENERGY_CHOICES = ['高', '中', '低']
+
+
+def _load_backlog() -> Backlog:
+    """加载待办池"""
+    config = PilotConfig.load_from_file()
+    return Backlog.load(config.backlog)
+
+
+def _parse_date(value: str) -> date:
+    """解析YYYY-MM-DD日期"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise click.BadParameter("日期格式应为 YYYY-MM-DD")
+
+
+@click.group()
+def backlog():
+    """任务待办池管理命令"""
+    pass
+
+
+@backlog.command()
+@click.argument('title')
+@click.option('--weight', '-w', type=click.IntRange(1, 10), default=5, help='权重（1-10）')
+@click.option('--type', '-t', 'task_type', type=click.Choice(['deep', 'normal', 'light']), default='normal', help='任务类型')
+@click.option('--energy', '-e', type=click.Choice(ENERGY_CHOICES), default='中', help='所需精力')
+@click.option('--minutes', '-m', type=click.IntRange(1), default=50, help='预计耗时（分钟）')
+@click.option('--deadline', '-d', help='截止日期 (YYYY-MM-DD)')
+def add(title, weight, task_type, energy, minutes, deadline):
+    """添加任务"""
+    store = _load_backlog()
+    item = store.add(BacklogItem(
+        title=title,
+        weight=weight,
+        type=task_type,
+        energy=energy,
+        remaining_min=minutes,
+        deadline=_parse_date(deadline) if deadline else None
+    ))
+    store.save()
+    click.echo(f"✅ 已加入待办池: [{item.id}] {item.title}")
+
+
+@backlog.command('list')
+@click.option('--limit', '-n', type=int, default=20, help='显示条数')
+def list_items(limit):
+    """按优先级列出任务"""
+    store = _load_backlog()
+    if not len(store):
+        click.echo("📭 待办池为空，使用 'backlog add <标题>' 添加任务")
+        return
+    
+    click.echo(f"📋 待办池（共{len(store)}个任务）:")
+    for item, priority in store.ranked()[:limit]:
+        deadline = f" | 截止 {item.deadline.isoformat()}" if item.deadline else ""
+        click.echo(
+            f"  [{item.id}] {item.title} | 优先级 {priority:.1f} | 权重{item.weight} {item.type}/{item.energy}"
+            f" | 剩余{item.remaining_min}分钟{deadline}"
+        )
+
+
+@backlog.command('next')
+@click.option('--capacity', '-c', type=click.IntRange(1), default=360, help='当天可用分钟数')
+@click.option('--date', '-d', 'target_date', help='目标日期 (YYYY-MM-DD)，默认今天')
+def next_candidates(capacity, target_date):
+    """预览当天会交给规划器的候选任务"""
+    store = _load_backlog()
+    candidates = store.select(capacity, _parse_date(target_date) if target_date else date.today())
+    if not candidates:
+        click.echo("📭 没有可安排的候选任务")
+        return
+    
+    click.echo(f"🎯 候选任务（容量 {capacity} 分钟）:")
+    for candidate in candidates:
+        mark = "⏰" if candidate.urgent else "•"
+        click.echo(f"  {mark} [{candidate.item.id}] {candidate.item.title} | {candidate.planned_min}分钟 | 优先级 {candidate.priority:.1f}")
+
+
+@backlog.command()
+@click.argument('item_id')
+@click.option('--minutes', '-m', type=click.IntRange(1), help='本次投入的分钟数，不指定则视为全部完成')
+def done(item_id, minutes):
+    """记录进度或完成任务"""
+    store = _load_backlog()
+    item = store.get(item_id)
+    if item is None:
+        click.echo(f"❌ 任务 '{item_id}' 不存在")
+        return
+    
+    updated = store.record_progress(item_id, minutes or item.remaining_min)
+    store.save()
+    if updated is None:
+        click.echo(f"🎉 已完成: {item.title}")
+    else:
+        click.echo(f"✅ 已记录进度: {item.title}，剩余{updated.remaining_min}分钟")
+
+
+@backlog.command()
+@click.argument('item_id')
+def remove(item_id):
+    """移除任务"""
+    store = _load_backlog()
+    item = store.remove(item_id)
+    if item is None:
+        click.echo(f"❌ 任务 '{item_id}' 不存在")
+        return
+    store.save()
+    click.echo(f"🗑️ 已移除: {item.title}")
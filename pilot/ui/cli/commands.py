@@ -2,12 +2,23 @@
 CLI命令定义
 """
 
+import time
 import click
+from datetime import datetime, timedelta
 from ...core.models.config import PilotConfig
-from ...integrations.llm.openai import OpenAILLM
+from ...integrations.llm.limiter import create_llm
+from ...interfaces.llm import LLMInterface
 from ...core.nlp.parser import CommandParser
+from ...core.nlp.intent import IntentClassifier, IntentLog, train_intent_model
+from ...core.nlp.session import ChatSession
 from ...core.executor import CommandExecutor
+from ...core.scheduling.workdays import WorkdayCalendar
+from ...integrations.calendar.ics_reader import ICSBusyImporter
+from ...integrations.calendar.feed_server import FeedServer
+from ...integrations.calendar.ics_bulk import BulkICSExporter
 from .config_commands import config
+from .template_commands import template, WEEKDAY_NAMES
+from .backlog_commands import backlog
 
 
 def create_cli():
@@ -22,23 +33,26 @@ def create_cli():
     @cli.command()
     @click.argument('input_text', nargs=-1)
     @click.option('--interactive', '-i', is_flag=True, help='交互模式')
-    def chat(input_text, interactive):
+    @click.option('--allow-rest-day', is_flag=True, help='工作模式下周末和节假日也照常安排计划')
+    def chat(input_text, interactive, allow_rest_day):
         """自然语言交互模式"""
         try:
             # 加载配置
             config = PilotConfig.load_from_file()
             
             # 初始化LLM、解析器和执行器
-            llm = OpenAILLM(config)
-            parser = CommandParser(llm)
-            executor = CommandExecutor(config)
+            llm = create_llm(config)
+            parser = _create_parser(config, llm)
+            executor = CommandExecutor(config, llm)
             
             if interactive:
                 # 交互模式
                 click.echo("🤖 P.I.L.O.T. 自然语言交互模式")
                 click.echo("💬 直接输入您的需求，例如：")
                 click.echo("   '今天可用480分钟，会议：13:30–14:00。重点推进项目A/项目B。'")
-                click.echo("   输入 'quit' 或 'exit' 退出\n")
+                click.echo("   输入 'quit' 或 'exit' 退出，'reset' 清空会话记忆\n")
+                
+                session = ChatSession(config.chat)
                 
                 while True:
                     user_input = input("👤 您: ").strip()
@@ -49,16 +63,25 @@ def create_cli():
                     if not user_input:
                         continue
                     
-                    # 解析命令
+                    if user_input.lower() == 'reset':
+                        session.reset()
+                        click.echo("🧹 会话记忆已清空")
+                        continue
+                    
+                    # 解析命令（附带紧凑的会话上下文）
                     click.echo("🧠 正在解析指令...")
-                    parsed_params = parser.parse_command(user_input)
+                    parsed_params = parser.parse_command(user_input, session.build_context())
                     if parsed_params:
+                        parsed_params['allow_rest_day'] = parsed_params.get('allow_rest_day') or allow_rest_day
                         click.echo(f"✅ 指令解析完成 (置信度: {parsed_params.get('confidence', 0)*100:.1f}%)")
                         click.echo(f"📋 命令类型: {parsed_params.get('command_type', 'unknown')}")
                         
                         # 执行命令
-                        success = executor.execute_command(parsed_params)
-                        if not success:
+                        success = executor.execute_command(parsed_params, session)
+                        if success:
+                            # 只有本轮生成了计划时才更新会话中的计划
+                            session.record_turn(user_input, parsed_params, *(executor.turn_plan or ()))
+                        else:
                             click.echo("❌ 命令执行失败，请检查输入或重试")
                     else:
                         click.echo("❌ 无法理解您的指令，请重新输入")
@@ -72,6 +95,7 @@ def create_cli():
                 click.echo("🧠 正在解析指令...")
                 parsed_params = parser.parse_command(user_input)
                 if parsed_params:
+                    parsed_params['allow_rest_day'] = parsed_params.get('allow_rest_day') or allow_rest_day
                     click.echo(f"✅ 指令解析完成 (置信度: {parsed_params.get('confidence', 0)*100:.1f}%)")
                     click.echo(f"📋 命令类型: {parsed_params.get('command_type', 'unknown')}")
                     
@@ -85,6 +109,150 @@ def create_cli():
         except Exception as e:
             click.echo(f"❌ 错误: {str(e)}")
 
+    @cli.command('train-intent')
+    @click.option('--test-ratio', default=0.2, type=float, help='留出评估集比例')
+    @click.option('--min-samples', type=int, help='最少训练样本数（默认读取配置）')
+    def train_intent(test_ratio, min_samples):
+        """从解析日志训练本地意图分类器"""
+        config = PilotConfig.load_from_file()
+        intent_config = config.intent
+        min_samples = min_samples if min_samples is not None else intent_config.min_samples
+        
+        samples = IntentLog(intent_config.log_path).load()
+        click.echo(f"📚 读取到 {len(samples)} 条意图样本")
+        if len(samples) < min_samples:
+            click.echo(f"❌ 样本不足，至少需要 {min_samples} 条")
+            return
+        
+        previous = IntentClassifier.load(intent_config.model_path)
+        classifier = train_intent_model(samples, test_ratio=test_ratio, previous=previous)
+        classifier.save(intent_config.model_path)
+        
+        metrics = classifier.metrics
+        click.echo(f"✅ 模型 v{classifier.version} 已保存: {intent_config.model_path}")
+        click.echo(f"📊 样本分布: {metrics['labels']}")
+        click.echo(f"⏱️ 训练耗时: {metrics['train_time_ms']}ms")
+        
+        holdout = metrics.get('holdout')
+        if holdout:
+            click.echo(f"🎯 留出集准确率: {holdout['accuracy']*100:.1f}% ({holdout['samples']}条)")
+            for label, accuracy in holdout['per_class_accuracy'].items():
+                click.echo(f"   {label}: {accuracy*100:.1f}%")
+            click.echo(f"⚡ 预测延迟: p50 {holdout['latency_ms_p50']}ms, p95 {holdout['latency_ms_p95']}ms")
+            click.echo(f"🌡️ 置信度校准温度: {metrics.get('temperature', 1.0)}")
+        
+        if previous and previous.metrics.get('holdout'):
+            click.echo(f"📈 上一版本(v{previous.version})准确率: {previous.metrics['holdout']['accuracy']*100:.1f}%")
+    
+    @cli.command()
+    @click.option('--date', '-d', 'date_str', help='起始日期 (YYYY-MM-DD)，默认今天')
+    @click.option('--count', '-n', default=5, help='列出的工作日数量')
+    def workdays(date_str, count):
+        """查看接下来的工作日（含法定节假日和调休）"""
+        config = PilotConfig.load_from_file()
+        calendar = WorkdayCalendar.from_config(config.workdays)
+        start = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now().date()
+        
+        click.echo(f"📅 {start.isoformat()}: {calendar.describe(start)}")
+        click.echo(f"🗓️ 接下来的{count}个工作日:")
+        for day in calendar.next_workdays(start, count):
+            click.echo(f"  • {day.isoformat()} {WEEKDAY_NAMES[day.weekday()]} {calendar.describe(day)}")
+        if calendar.versions:
+            click.echo(f"📦 数据版本: {', '.join(calendar.versions)}")
+    
+    @cli.command()
+    @click.argument('sources', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--date', '-d', 'date_str', help='日期 (YYYY-MM-DD)，默认今天')
+    def busy(sources, date_str):
+        """查看某天从日历文件读取到的忙碌时段（默认读取配置中的busy_sources）"""
+        config = PilotConfig.load_from_file()
+        sources = list(sources) or config.imports.busy_sources
+        if not sources:
+            click.echo("❌ 请指定.ics文件，或在配置的 imports.busy_sources 中添加")
+            return
+        
+        target_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now().date()
+        importer = ICSBusyImporter(config.imports, config.timezone)
+        slots = importer.busy_slots(target_date, sources=sources)
+        if not slots:
+            click.echo(f"🟢 {target_date.isoformat()} 没有忙碌时段")
+            return
+        
+        click.echo(f"📆 {target_date.isoformat()} 的忙碌时段:")
+        for slot in slots:
+            click.echo(f"  • {slot.start.strftime('%H:%M')}-{slot.end.strftime('%H:%M')}")
+    
+    @cli.command('serve-ics')
+    @click.option('--host', help='监听地址（默认读取配置）')
+    @click.option('--port', '-p', type=int, help='端口（默认读取配置）')
+    @click.option('--verbose', '-v', is_flag=True, help='打印每个请求')
+    def serve_ics(host, port, verbose):
+        """启动本地ICS订阅源，日历应用订阅URL即可同步番茄钟日程"""
+        config = PilotConfig.load_from_file()
+        feed_config = config.feed.model_copy(update={
+            key: value for key, value in (('host', host), ('port', port)) if value is not None
+        })
+        try:
+            server = FeedServer(feed_config, config.timezone, verbose=verbose, exports=config.exports)
+        except OSError as e:
+            click.echo(f"❌ 无法监听 {feed_config.host}:{feed_config.port}: {str(e)}")
+            return
+        
+        click.echo(f"📡 ICS订阅源已启动: http://{feed_config.host}:{server.server_address[1]}/feeds/<用户>.ics")
+        users = server.store.users()
+        for user_id in users:
+            click.echo(f"  • {server.feed_url(user_id)}")
+        if not users:
+            click.echo("📭 还没有保存的日程，生成计划并创建日历后即可订阅")
+        click.echo("💡 可附加 ?start=YYYY-MM-DD&end=YYYY-MM-DD 或 ?past=0&future=7 限定范围；按 Ctrl+C 停止")
+        
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            click.echo("\n👋 订阅源已停止")
+        finally:
+            server.server_close()
+    
+    @cli.command('export-ics')
+    @click.option('--start', '-s', 'start_str', help='开始日期 (YYYY-MM-DD)，默认今天')
+    @click.option('--end', '-e', 'end_str', help='结束日期 (YYYY-MM-DD)，默认开始后6天')
+    @click.option('--user', '-u', 'users', multiple=True, help='导出的用户（可多次指定），默认全部已保存日程的用户')
+    @click.option('--output', '-o', help='输出目录（默认读取配置的exports.ics_dir）')
+    @click.option('--workers', '-w', type=int, help='并行进程数（默认读取配置，0为CPU核数）')
+    @click.option('--fsync', is_flag=True, default=None, help='写入后fsync文件和目录')
+    def export_ics(start_str, end_str, users, output, workers, fsync):
+        """批量导出多个用户的ICS文件（多进程并行，原子写入）"""
+        config = PilotConfig.load_from_file()
+        if fsync:
+            config.exports.fsync = True
+        start = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else datetime.now().date()
+        end = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else start + timedelta(days=6)
+        if end < start:
+            click.echo("❌ 结束日期早于开始日期")
+            return
+        
+        exporter = BulkICSExporter(config, output_dir=output)
+        jobs = exporter.jobs_for(start, end, list(users) or None)
+        if not jobs:
+            click.echo("📭 没有可导出的用户，生成计划并创建日历后再试")
+            return
+        
+        click.echo(f"📤 导出{len(jobs)}个用户 {start.isoformat()} ~ {end.isoformat()} 的日程...")
+        started = time.perf_counter()
+        results = exporter.export(jobs, workers=workers)
+        elapsed = time.perf_counter() - started
+        
+        for result in results:
+            if result.ok:
+                click.echo(f"  ✅ {result.user_id}: {result.events}个事件 {result.size / 1024:.1f} KB "
+                           f"{result.seconds * 1000:.0f} ms → {result.path}")
+            else:
+                click.echo(f"  ❌ {result.user_id}: {result.error}")
+        busy = sum(result.seconds for result in results)
+        failed = sum(1 for result in results if not result.ok)
+        click.echo(f"📦 {len(results) - failed}个文件已生成{f'，{failed}个失败' if failed else ''}，"
+                   f"耗时 {elapsed:.2f} s（各文件合计 {busy:.2f} s，并行 ×{busy / elapsed if elapsed else 1:.1f}）")
+    
     @cli.command()
     def version():
         """显示版本信息"""
@@ -93,5 +261,21 @@ def create_cli():
     
     # 添加配置命令组
     cli.add_command(config)
+    cli.add_command(template)
+    cli.add_command(backlog)
 
     return cli
+
+
+def _create_parser(config: PilotConfig, llm: LLMInterface) -> CommandParser:
+    """创建命令解析器（按配置挂载本地意图分类器）"""
+    intent_config = config.intent
+    if not intent_config.enabled:
+        return CommandParser(llm)
+    
+    return CommandParser(
+        llm,
+        classifier=IntentClassifier.load(intent_config.model_path),
+        intent_log=IntentLog(intent_config.log_path),
+        confidence_threshold=intent_config.confidence_threshold
+    )
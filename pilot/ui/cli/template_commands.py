@@ -0,0 +1,137 @@
+"""
+计划模板相关的CLI命令
+"""
+
+import click
+from datetime import datetime
+from ...core.models.config import PilotConfig
+from ...core.models.plan import PlanInput
+from ...core.planning.templates import (
+    PlanTemplate, TemplateLibrary, is_valid_template_name, load_last_plan, save_last_plan
+)
+
+
+WEEKDAY_NAMES = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+
+
+def _get_library() -> TemplateLibrary:
+    """获取模板库"""
+    config = PilotConfig.load_from_file()
+    return TemplateLibrary(config.templates.directory)
+
+
+def _validate_name(ctx, param, value: str) -> str:
+    """校验模板名称参数"""
+    if not is_valid_template_name(value):
+        raise click.BadParameter("模板名称只能包含字母、数字、下划线和连字符")
+    return value
+
+
+def _parse_weekdays(value: str):
+    """解析星期参数（1-7，逗号分隔，1=周一）"""
+    if not value:
+        return None
+    try:
+        weekdays = sorted({int(part) - 1 for part in value.split(',') if part.strip()})
+    except ValueError:
+        raise click.BadParameter("星期格式应为逗号分隔的数字，如 1,5")
+    if any(day < 0 or day > 6 for day in weekdays):
+        raise click.BadParameter("星期取值范围为 1-7")
+    return weekdays
+
+
+@click.group()
+def template():
+    """计划模板管理命令"""
+    pass
+
+
+@template.command('list')
+def list_templates():
+    """列出所有模板"""
+    templates = _get_library().list_templates()
+    if not templates:
+        click.echo("📭 暂无模板，使用 'template save <名称>' 保存最近一次计划")
+        return
+    
+    click.echo("📐 计划模板:")
+    for item in templates:
+        weekdays = '、'.join(WEEKDAY_NAMES[day] for day in item.weekdays) or '任意'
+        meetings = ', '.join(f"{m.start.strftime('%H:%M')}-{m.end.strftime('%H:%M')}" for m in item.meetings) or '无'
+        click.echo(f"  • {item.name}: {weekdays} | 会议 {meetings} | {len(item.roles)}个任务角色")
+
+
+@template.command()
+@click.argument('name', callback=_validate_name)
+def show(name):
+    """显示模板详情"""
+    item = _get_library().get(name)
+    if not item:
+        click.echo(f"❌ 模板 '{name}' 不存在")
+        return
+    
+    click.echo(f"📐 模板: {item.name} (创建于 {item.created_at})")
+    click.echo(f"⏰ 工作时间: {item.work_window_start.strftime('%H:%M')}-{item.work_window_end.strftime('%H:%M')}")
+    click.echo(f"📅 适用: {'、'.join(WEEKDAY_NAMES[day] for day in item.weekdays) or '任意'}")
+    for role in item.roles:
+        slot = ''
+        if role.scheduled_start and role.scheduled_end:
+            slot = f" {role.scheduled_start.strftime('%H:%M')}-{role.scheduled_end.strftime('%H:%M')}"
+        click.echo(f"  任务{role.index + 1}: {role.type}/{role.energy} 权重{role.weight} {role.est_min}分钟{slot}")
+    click.echo(f"🍅 番茄钟映射: {len(item.mapping)}个")
+
+
+@template.command()
+@click.argument('name', callback=_validate_name)
+@click.option('--weekdays', '-w', help='适用星期，逗号分隔（1=周一），默认为原计划当天')
+def save(name, weekdays):
+    """把最近一次生成的计划保存为模板"""
+    last_plan = load_last_plan()
+    if not last_plan:
+        click.echo("❌ 没有可保存的计划，请先生成一次计划")
+        return
+    
+    plan_input, plan_output = last_plan
+    item = PlanTemplate.capture(name, plan_input, plan_output, _parse_weekdays(weekdays))
+    path = _get_library().save(item)
+    click.echo(f"✅ 模板已保存: {path}")
+
+
+@template.command()
+@click.argument('name', callback=_validate_name)
+def delete(name):
+    """删除模板"""
+    if _get_library().delete(name):
+        click.echo(f"🗑️ 模板 '{name}' 已删除")
+    else:
+        click.echo(f"❌ 模板 '{name}' 不存在")
+
+
+@template.command()
+@click.argument('name', callback=_validate_name)
+@click.option('--tasks', '-t', required=True, help='任务列表，逗号分隔，按模板任务角色顺序填充')
+@click.option('--date', '-d', 'date_str', help='目标日期 (YYYY-MM-DD)，默认今天')
+def apply(name, tasks, date_str):
+    """用模板为新日期实例化计划（本地生成，不调用LLM）"""
+    item = _get_library().get(name)
+    if not item:
+        click.echo(f"❌ 模板 '{name}' 不存在")
+        return
+    
+    target_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now().date()
+    titles = [title.strip() for title in tasks.split(',') if title.strip()]
+    plan_input = PlanInput(
+        date=target_date,
+        work_window_start=item.work_window_start,
+        work_window_end=item.work_window_end,
+        meetings=item.meetings,
+        mode=item.mode,
+        cycles=item.cycles
+    )
+    plan_output = item.instantiate(titles, plan_input)
+    save_last_plan(plan_input, plan_output)
+    
+    click.echo(f"📋 {target_date.isoformat()} 计划（模板 {item.name}）:")
+    for block in plan_output.time_blocks:
+        click.echo(f"  {block.start.strftime('%H:%M')}-{block.end.strftime('%H:%M')}: {block.label}")
+    click.echo(f"📊 可用时间: {plan_output.capacity_min}分钟")
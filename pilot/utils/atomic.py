@@ -0,0 +1,66 @@
+"""
+原子文件写入
+
+先写同目录下的临时文件，写完后用os.replace替换目标文件：并发读取的一方只会看到旧文件或完整的新文件，
+写入中途出错时目标文件保持不变。fsync=True时在替换前同步文件内容、替换后同步目录，断电后也不会留下空文件。
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Union
+
+
+# 新建文件的权限（mkstemp默认0600，导出文件需要其他程序可读）
+DEFAULT_FILE_MODE = 0o644
+
+
+@contextmanager
+def atomic_write(path: Union[str, Path], fsync: bool = False) -> Iterator[BinaryIO]:
+    """以二进制方式原子写入文件
+    
+    用法：
+        with atomic_write(path) as f:
+            f.write(data)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = DEFAULT_FILE_MODE
+    
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if hasattr(os, 'fchmod'):
+                os.fchmod(f.fileno(), mode)
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    
+    if fsync:
+        _fsync_directory(path.parent)
+
+
+def _fsync_directory(directory: Path):
+    """同步目录项，让替换在断电后仍然生效（不支持打开目录的平台忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
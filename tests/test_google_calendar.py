@@ -0,0 +1,272 @@
+"""
+Google Calendar 同步测试
+
+在本地启动一个Calendar v3替身服务（事件列表/插入/更新/删除、/batch/calendar/v3 批量请求、freeBusy），
+通过 google_calendar.api_root 和 credentials= 让 GoogleCalendarManager 连接替身服务，
+覆盖增量同步、批量请求数、注入的429/403/409错误和忙碌时间预取。
+
+用法: python -m pytest tests/test_google_calendar.py -q
+"""
+
+import email
+import json
+import re
+import threading
+from datetime import date, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from pilot.core.models.config import PilotConfig
+from pilot.core.models.plan import PlanInput, PlanOutput, Task
+from pilot.core.scheduling.scheduler import PomodoroScheduler
+from pilot.integrations.calendar import google_calendar
+from pilot.integrations.calendar.google_calendar import GoogleCalendarManager, google_event_id
+
+
+EVENTS_PATH = re.compile(r"^/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?$")
+
+
+class FakeCalendar:
+    """Calendar v3 替身：内存中的事件表，可按事件ID注入一次性错误"""
+    
+    def __init__(self):
+        self.events = {}
+        self.busy = []
+        self.failures = {}  # 事件ID -> (状态码, reason)，触发一次后移除
+        self.requests = 0
+        self.batches = 0
+        self.subrequests = 0
+        self.lock = threading.Lock()
+    
+    def fail_once(self, event_id: str, status: int, reason: str = ""):
+        self.failures[event_id] = (status, reason)
+    
+    def handle(self, method: str, path: str, query: dict, body: bytes):
+        """处理单个请求，返回 (状态码, JSON)"""
+        match = EVENTS_PATH.match(path)
+        if match:
+            return self._events(method, match.group(2), query, body)
+        if path == '/calendar/v3/freeBusy' and method == 'POST':
+            request = json.loads(body)
+            return 200, {'calendars': {item['id']: {'busy': self.busy} for item in request['items']}}
+        if path.startswith('/calendar/v3/calendars/') and method == 'GET':
+            return 200, {'id': 'primary'}
+        return 404, _error(404, 'notFound')
+    
+    def _events(self, method: str, event_id, query: dict, body: bytes):
+        if method == 'GET' and event_id is None:
+            filters = [value.split('=', 1) for value in query.get('privateExtendedProperty', [])]
+            show_deleted = query.get('showDeleted') == ['true']
+            items = [
+                {'id': event['id'], 'status': event['status'], 'extendedProperties': event['extendedProperties']}
+                for event in self.events.values()
+                if all(event['extendedProperties']['private'].get(key) == value for key, value in filters)
+                and (show_deleted or event['status'] != 'cancelled')
+            ]
+            return 200, {'items': items}
+        
+        target = event_id or json.loads(body)['id']
+        if target in self.failures:
+            status, reason = self.failures.pop(target)
+            return status, _error(status, reason)
+        
+        if method == 'POST':
+            event = json.loads(body)
+            if event['id'] in self.events:
+                return 409, _error(409, 'duplicate')
+            self.events[event['id']] = event
+            return 200, {'id': event['id']}
+        if method == 'PUT':
+            if event_id not in self.events:
+                return 404, _error(404, 'notFound')
+            self.events[event_id] = json.loads(body)
+            return 200, {'id': event_id}
+        if method == 'DELETE':
+            if event_id not in self.events or self.events[event_id]['status'] == 'cancelled':
+                return 410, _error(410, 'deleted')
+            self.events[event_id]['status'] = 'cancelled'
+            return 204, None
+        return 405, _error(405, 'methodNotAllowed')
+    
+    def handle_batch(self, content_type: str, body: bytes) -> bytes:
+        """multipart/mixed 批量请求：逐个处理子请求并按Content-ID返回"""
+        message = email.message_from_bytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        parts = []
+        for part in message.get_payload():
+            raw = part.get_payload()
+            separator = '\r\n\r\n' if '\r\n\r\n' in raw else '\n\n'
+            head, _, sub_body = raw.partition(separator)
+            method, target, _ = head.splitlines()[0].split(' ')
+            url = urlsplit(target)
+            self.subrequests += 1
+            status, payload = self.handle(method, unquote(url.path), parse_qs(url.query), sub_body.encode())
+            data = '' if payload is None else json.dumps(payload)
+            parts.append(
+                f"--RESP\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n{data}\r\n"
+            )
+        parts.append("--RESP--\r\n")
+        return ''.join(parts).encode()
+
+
+def _error(status: int, reason: str) -> dict:
+    return {'error': {'code': status, 'message': reason, 'errors': [{'reason': reason, 'message': reason}]}}
+
+
+def _handler(calendar: FakeCalendar):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, *args):
+            pass
+        
+        def _reply(self, status: int, data: bytes, content_type: str = 'application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def _any(self):
+            url = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            with calendar.lock:
+                calendar.requests += 1
+                if url.path == '/batch/calendar/v3':
+                    calendar.batches += 1
+                    data = calendar.handle_batch(self.headers['Content-Type'], body)
+                    self._reply(200, data, 'multipart/mixed; boundary=RESP')
+                    return
+                status, payload = calendar.handle(self.command, unquote(url.path), parse_qs(url.query), body)
+            self._reply(status, b'' if payload is None else json.dumps(payload).encode())
+        
+        do_GET = do_POST = do_PUT = do_DELETE = _any
+    
+    return Handler
+
+
+@pytest.fixture
+def fake_calendar():
+    calendar = FakeCalendar()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(calendar))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    calendar.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield calendar
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager(fake_calendar, monkeypatch):
+    # 重试的退避等待不影响测试结果
+    monkeypatch.setattr(google_calendar.clock, 'sleep', lambda seconds: None)
+    config = PilotConfig()
+    config.timezone = 'Asia/Shanghai'
+    config.exports.user_id = 'tester'
+    config.google_calendar.api_root = fake_calendar.url
+    config.google_calendar.batch_size = 5
+    config.google_calendar.max_retries = 2
+    return GoogleCalendarManager(config, credentials=Credentials(token='test-token'))
+
+
+def _schedule(config: PilotConfig, target_date: date, titles):
+    tasks = [Task(title=title, est_min=100, energy='高') for title in titles]
+    plan_input = PlanInput(date=target_date, work_window_start=time(9), work_window_end=time(18), cycles=6)
+    return PomodoroScheduler(config).schedule_pomodoros(target_date, PlanOutput(capacity_min=420, top_tasks=tasks), plan_input)
+
+
+TARGET = date(2026, 11, 3)
+
+
+def test_sync_inserts_then_is_idempotent(manager, fake_calendar):
+    schedule = _schedule(manager.config, TARGET, ['写报告', '评审代码'])
+    
+    first = manager.sync_day(TARGET, schedule)
+    assert first.ok
+    assert first.inserted == len(schedule) and first.updated == first.deleted == 0
+    # 1次列表 + ceil(n / batch_size) 次批量请求
+    assert first.http_requests == 1 + -(-len(schedule) // 5)
+    assert fake_calendar.subrequests == len(schedule)
+    assert all(event['transparency'] == 'transparent' for event in fake_calendar.events.values())
+    
+    second = manager.sync_day(TARGET, schedule)
+    assert second.unchanged == len(schedule)
+    assert second.http_requests == 1
+
+
+def test_sync_updates_and_deletes_changed_slots(manager, fake_calendar):
+    manager.sync_day(TARGET, _schedule(manager.config, TARGET, ['写报告', '评审代码']))
+    
+    changed = _schedule(manager.config, TARGET, ['写报告'])
+    result = manager.sync_day(TARGET, changed)
+    assert result.ok
+    assert result.updated > 0
+    
+    live = {event_id for event_id, event in fake_calendar.events.items() if event['status'] != 'cancelled'}
+    assert live == {google_event_id('tester', TARGET, item) for item in changed}
+    
+    # 删除后恢复：已取消的事件ID只能用update重新启用
+    restored = manager.sync_day(TARGET, _schedule(manager.config, TARGET, ['写报告', '评审代码']))
+    assert restored.ok and restored.inserted == 0
+
+
+def test_rate_limits_are_retried(manager, fake_calendar):
+    schedule = _schedule(manager.config, TARGET, ['写报告'])
+    ids = [google_event_id('tester', TARGET, item) for item in schedule]
+    fake_calendar.fail_once(ids[0], 429, 'rateLimitExceeded')
+    fake_calendar.fail_once(ids[1], 403, 'userRateLimitExceeded')
+    
+    result = manager.sync_day(TARGET, schedule)
+    assert result.ok
+    assert result.inserted == len(schedule)
+    assert set(ids) <= set(fake_calendar.events)
+
+
+def test_forbidden_is_not_retried(manager, fake_calendar):
+    schedule = _schedule(manager.config, TARGET, ['写报告'])
+    event_id = google_event_id('tester', TARGET, schedule[0])
+    fake_calendar.fail_once(event_id, 403, 'forbidden')
+    
+    result = manager.sync_day(TARGET, schedule)
+    assert result.failed == [event_id]
+    assert event_id not in fake_calendar.events
+    # 只有一轮批量请求，没有为403重试
+    assert fake_calendar.subrequests == len(schedule)
+
+
+def test_conflicting_insert_becomes_update(manager, fake_calendar):
+    schedule = _schedule(manager.config, TARGET, ['写报告'])
+    event_id = google_event_id('tester', TARGET, schedule[0])
+    fake_calendar.fail_once(event_id, 409, 'duplicate')
+    fake_calendar.events[event_id] = {
+        'id': event_id, 'status': 'confirmed', 'extendedProperties': {'private': {'pilotUser': 'other'}}
+    }
+    
+    result = manager.sync_day(TARGET, schedule)
+    assert result.ok
+    assert fake_calendar.events[event_id]['extendedProperties']['private']['pilotUser'] == 'tester'
+
+
+def test_freebusy_prefetch_covers_range(manager, fake_calendar):
+    fake_calendar.busy = [
+        {'start': '2026-11-03T02:00:00Z', 'end': '2026-11-03T03:30:00Z'},  # 本地 10:00-11:30
+        {'start': '2026-11-04T15:00:00Z', 'end': '2026-11-04T17:00:00Z'},  # 本地 23:00-次日01:00
+    ]
+    manager.prefetch_busy(date(2026, 11, 3), date(2026, 11, 5))
+    requests = fake_calendar.requests
+    
+    first = manager.busy_slots(date(2026, 11, 3), time(9), time(18))
+    assert [(slot.start, slot.end) for slot in first] == [(time(10), time(11, 30))]
+    assert [(slot.start, slot.end) for slot in manager.busy_slots(date(2026, 11, 5))] == [(time(0), time(1))]
+    assert manager.busy_slots(date(2026, 11, 4), time(9), time(18)) == []
+    # 范围内的查询都来自缓存
+    assert fake_calendar.requests == requests
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, '-q']))